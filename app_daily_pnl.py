@@ -69,6 +69,8 @@ def stem_plot(df, colname="daily_pnl"):
 def _all_files_in_directory(directory):
     return [f for f in os.listdir(directory) if os.path.isfile(os.path.join(directory, f))]
 
+PNL_COLUMNS = ['pnl']     # The pages only plot pnl, don't read the other metric columns
+
 @st.cache_data
 def _get_backtest_dataframes(backtest_dir):
 
@@ -79,9 +81,9 @@ def _get_backtest_dataframes(backtest_dir):
     for df_filename in all_parquet_dfs:
         if df_filename.startswith("df_position") and df_filename.endswith(".parquet"):
             hash_value = df_filename[len("df_position_"):-len(".parquet")]
-            hash2position_dfs[int(hash_value)] = read_parquet_data(os.path.join(backtest_dir, df_filename))
+            hash2position_dfs[int(hash_value)] = read_parquet_data(os.path.join(backtest_dir, df_filename), columns=PNL_COLUMNS)
         elif df_filename == "df_portfolio_metrics.parquet":
-            df_portfolio_metrics = read_parquet_data(os.path.join(backtest_dir, df_filename))
+            df_portfolio_metrics = read_parquet_data(os.path.join(backtest_dir, df_filename), columns=PNL_COLUMNS)
 
     return hash2position_dfs, df_portfolio_metrics
 
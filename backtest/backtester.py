@@ -1,15 +1,18 @@
 from datetime import timedelta
 from pathlib import Path
 from connectors.dbconnector import DBConnector
+from connectors.contract import Contract
 import hashlib
 from typing import Union
 from strategy import Action, Strategy
+from backtest.stoploss import StopLossPath, stoploss_trigger
 import pandas as pd
 from dataclasses import asdict, dataclass
 from tqdm import tqdm
 from collections import defaultdict
 from rich import print
 import numpy as np
+import heapq
 import time
 import os
 import json
@@ -57,13 +60,13 @@ class BackTester:
         self.outstanding_orders = []
         self.hash2position_dfs = {}   # Stores dfs of each position (one for each filled order) with key as the hash of that position
         self.initialized_position_hashes = set()
+        self.data_stats = None    # DBConnector.stats() of the last run, saved with the results
+        self._wake_while_positions_open = True  # From Strategy.wake_up_schedule(), see run()
+        self._stoploss_paths = {}   # Position hash --> StopLossPath of each open stop-loss position, see get_stoploss_actions()
 
     def fetch_position_dict(self, hash: int) -> dict | None:
-        """Fetch the position dict from the strategy's position list using the hash."""
-        for pos_dict in self.strategy.position:
-            if pos_dict['hash'] == hash:
-                return pos_dict
-        return None
+        """Fetch the position dict from the strategy's PositionBook using the hash."""
+        return self.strategy.position.get(hash)
 
     def _initialize_metrics(self, timestamps: pd.DatetimeIndex):
         self.df_portfolio_metrics = pd.DataFrame(index=timestamps)
@@ -80,9 +83,8 @@ class BackTester:
         - If the square_off_id exists, it will return True, meaning a square-off action was generated for an existing position.
         - else raise ERROR : meaning a square-off action was generated for an unfilled or no longer existing position.
         '''
-        for position in self.strategy.position:
-            if square_off_id == position['hash']:
-                return True
+        if square_off_id in self.strategy.position:
+            return True
         raise ValueError(f"{square_off_id} is an invalid hash for a square-off action.")
 
     def validate_actions(self, actions: list[Action]) -> list[Action]:
@@ -133,9 +135,8 @@ class BackTester:
             'stoploss_hit_timestamp': None,   # AP      # The timestamp at which stoploss hits(if it does)
         }
 
-        market_price = self.dbconnector.get_option_price(strike=order.action.strike, option_type=order.action.option_type, expiry_date=order.action.expiry, timestamp=timestamp, field='close')
-        highest_level = self.dbconnector.get_option_price(strike=order.action.strike, option_type=order.action.option_type, expiry_date=order.action.expiry, timestamp=timestamp, field='high')
-        lowest_level = self.dbconnector.get_option_price(strike=order.action.strike, option_type=order.action.option_type, expiry_date=order.action.expiry, timestamp=timestamp, field='low')
+        bar = self.dbconnector.get_option_bar(Contract.from_action(order.action, ticker=self.dbconnector.ticker), timestamp)   # One lookup for close, high and low
+        market_price, highest_level, lowest_level = float(bar['close']), float(bar['high']), float(bar['low'])
         if order.action.order_type == "market":
             order.update_status("filled")
             order_stats['price'] = market_price
@@ -181,10 +182,9 @@ class BackTester:
         opening_action = tally_dict['opened']['action']
         end_timestamp = tally_dict['closed']['timestamp']
         subset_timestamps = valid_timestamps[(valid_timestamps >= start_timestamp) & (valid_timestamps <= end_timestamp)]
-        df_position = self.dbconnector.get_option_df(option_type=opening_action.option_type, strike=opening_action.strike, expiry_date=opening_action.expiry)
-        df_position = df_position.loc[subset_timestamps]
-        df_position = df_position[['close']]    # choose only the 'close' price
-        df_position = df_position.rename(columns={'close': 'price'})    # rename it to price
+        df_position = self.dbconnector.get_option_df(option_type=opening_action.option_type, strike=opening_action.strike, expiry_date=opening_action.expiry,
+                                                     columns=['close'], start=start_timestamp, end=end_timestamp)   # Only the 'close' price of [opened, closed]
+        df_position = df_position.loc[subset_timestamps].rename(columns={'close': 'price'})
 
         if opening_action.order_type in ["market_stoploss", "market_stoploss_trail"]:
             assert tally_dict['opened']['stoploss_price_level'] is not None, "Stoploss order_type must have a stoploss_price_level"
@@ -230,13 +230,19 @@ class BackTester:
         self._update_final_portfolio_metrics()
 
     def _update_final_portfolio_metrics(self):
-
-        for timestamp in tqdm(self.df_portfolio_metrics.index, desc="Updating Portfolio Metrics", unit="timestamp"):
-            total = 0
-            for hash, df_position in self.hash2position_dfs.items():
-                if timestamp in df_position.index:
-                    total += df_position.loc[timestamp, 'interval_pnl']
-            self.df_portfolio_metrics.at[timestamp, 'interval_pnl'] = total
+        # Portfolio interval_pnl = sum of the positions' interval_pnl at each timestamp, one scatter-add over every position row.
+        # np.add.at adds sequentially in position order, so sums (and the NaN of each position's first bar) are exactly those of a per-timestamp loop
+        rows, values = [], []
+        for hash, df_position in self.hash2position_dfs.items():
+            if df_position is not None:
+                position_rows = self.df_portfolio_metrics.index.get_indexer(df_position.index)
+                found = position_rows >= 0
+                rows.append(position_rows[found])
+                values.append(df_position['interval_pnl'].to_numpy(dtype=np.float64)[found])
+        total = np.zeros(len(self.df_portfolio_metrics), dtype=np.float64)
+        if rows:
+            np.add.at(total, np.concatenate(rows), np.concatenate(values))
+        self.df_portfolio_metrics['interval_pnl'] = total
         
         self.df_portfolio_metrics['pnl'] = self.df_portfolio_metrics['interval_pnl'].cumsum()
 
@@ -257,26 +263,29 @@ class BackTester:
         if hasattr(self.strategy, "about") and callable(getattr(self.strategy, "about")):   # Save about strategy if about() function implemented
             with open(os.path.join(save_dir, "about_strategy.txt"), "w") as f:
                 f.write(self.strategy.about())
+        if self.data_stats is not None:     # Data-access counters of the run, to compare runs and catch data-layer regressions
+            with open(os.path.join(save_dir, "data_stats.json"), "w") as f:
+                json.dump(self.data_stats, f, indent=4)
         print(f"Backtest results saved to {save_dir}")
 
         # Position tally data
         for hash, position_dict in self.strategy.position_tally.items():
             position_dict['opened']['action'].save(savedir=save_dir, filename=f"action_{hash}.json")
 
-    def update_stoploss_price_level(self, pos, timestamp):
-        # Update the stoploss price level for the given position
+    def update_stoploss_price_level(self, pos, bar):
+        # Update the stoploss price level for the given position using the contract's current OHLC bar
         action = pos['action']
         if action.order_type == "market_stoploss":
             pass
         elif action.order_type == "market_stoploss_trail":
             if action.trade_type == "long":
-                current_highest_level = self.dbconnector.get_option_price(strike=action.strike, option_type=action.option_type, expiry_date=action.expiry, timestamp=timestamp, field='high')
+                current_highest_level = float(bar['high'])
                 if current_highest_level > pos['previous_highest_level']:
                     gap_up = current_highest_level - pos['previous_highest_level']
                     pos['stoploss_price_level'] += gap_up
                     pos['previous_highest_level'] = current_highest_level
             elif action.trade_type == "short":
-                current_lowest_level = self.dbconnector.get_option_price(strike=action.strike, option_type=action.option_type, expiry_date=action.expiry, timestamp=timestamp, field='low')
+                current_lowest_level = float(bar['low'])
                 if current_lowest_level < pos['previous_lowest_level']:
                     gap_down = pos['previous_lowest_level'] - current_lowest_level
                     pos['stoploss_price_level'] -= gap_down
@@ -305,16 +314,28 @@ class BackTester:
         """
 
         square_off_ids = set()
-        for pos in self.strategy.position:
+        i = int(self.valid_timestamps.searchsorted(timestamp))
+        for pos in self.strategy.position.by_order_type("market_stoploss", "market_stoploss_trail"):
             action = pos['action']
-            if action.order_type in ["market_stoploss", "market_stoploss_trail"]:
-                self.update_stoploss_price_level(pos, timestamp)
-                ohlc = self.dbconnector.get_option_df(option_type=action.option_type, strike=action.strike, expiry_date=action.expiry).loc[timestamp, ['open', 'high', 'low', 'close']].values
+            path = self._stoploss_paths.get(pos['hash'])
+            k = path.step(i) if path is not None else -1
+            if k >= 0:
+                # On the precomputed path: no data access, the level (and trail extreme) are the ones the minute-by-minute update reaches at i
+                self._apply_stoploss_path(pos, path, k)
+                stoploss_check = bool(path.hits[k])
+            else:
+                # Past the path (the contract has no bar here, or is past its expiry): evaluate this bar the old way (KeyError on a missing bar), then re-plan from it
+                if path is not None and len(path.minutes):
+                    self._apply_stoploss_path(pos, path, len(path.minutes) - 1)
+                bar = self.dbconnector.get_option_bar(Contract.from_action(action, ticker=self.dbconnector.ticker), timestamp)
+                self.update_stoploss_price_level(pos, bar)
+                ohlc = (bar['open'], bar['high'], bar['low'], bar['close'])
                 stoploss_check = self.check_stoploss_condition(stoploss_price_level=pos['stoploss_price_level'], ohlc_list=ohlc, trade_type=action.trade_type)
-                if stoploss_check:
-                    square_off_ids.add(pos['hash'])
-                    # print(f"Stoploss hit for position: {pos['hash']} at {timestamp}")
-                    pos['stoploss_hit_timestamp'] = timestamp
+                self._stoploss_paths[pos['hash']] = self._plan_stoploss(pos, i)
+            if stoploss_check:
+                square_off_ids.add(pos['hash'])
+                # print(f"Stoploss hit for position: {pos['hash']} at {timestamp}")
+                pos['stoploss_hit_timestamp'] = timestamp
 
         stoploss_actions = self.strategy.square_off_actions(square_off_ids=square_off_ids)
 
@@ -331,15 +352,116 @@ class BackTester:
                     # generate opposite_action()
         # pass
 
+    def _plan_stoploss(self, pos: dict, i: int) -> StopLossPath:
+        '''
+        Precompute an open stop-loss position from its state at clock position i onwards: the stop is evaluated on every covered minute after i,
+        up to the first one where the contract has no bar (or past its expiry day), in one stoploss_trigger() pass over the contract's high/low arrays.
+        '''
+        action = pos['action']
+        horizon = int(self.valid_timestamps.searchsorted(pd.Timestamp(action.expiry) + timedelta(days=1)))     # No bars after the expiry day
+        minutes = i + 1 + np.flatnonzero(self._covered[i + 1:horizon])
+        (high, low), found = self.dbconnector.get_bar_fields(Contract.from_action(action, ticker=self.dbconnector.ticker), self.valid_timestamps[minutes], fields=('high', 'low'))
+        n_bars = len(found) if found.all() else int(np.argmin(found))
+        if n_bars < len(minutes):
+            end = int(minutes[n_bars])
+        else:
+            later = np.flatnonzero(self._covered[horizon:])
+            end = horizon + int(later[0]) if len(later) else len(self.valid_timestamps)
+
+        trail_from = None
+        if action.order_type == "market_stoploss_trail":
+            trail_from = pos['previous_highest_level'] if action.trade_type == "long" else pos['previous_lowest_level']
+        _, hits, levels, extremes = stoploss_trigger(high[:n_bars], low[:n_bars], pos['stoploss_price_level'], action.trade_type, trail_from=trail_from)
+        return StopLossPath(minutes=minutes[:n_bars], hits=hits, levels=levels, extremes=extremes, end=end)
+
+    @staticmethod
+    def _apply_stoploss_path(pos: dict, path: StopLossPath, k: int):
+        '''Set the position's stop state to the one after the k-th minute of its path'''
+        pos['stoploss_price_level'] = float(path.levels[k])
+        if path.extremes is not None:
+            pos['previous_highest_level' if pos['action'].trade_type == "long" else 'previous_lowest_level'] = float(path.extremes[k])
+
+    def _stoploss_wake_ups(self, i: int) -> list[int]:
+        '''After the step at clock position i: plan the stop-loss positions opened at i, forget closed ones, and return where each open one must be looked at next'''
+        position = self.strategy.position
+        for hash in [hash for hash in self._stoploss_paths if hash not in position]:
+            del self._stoploss_paths[hash]
+        wake_ups = []
+        for pos in position.by_order_type("market_stoploss", "market_stoploss_trail"):
+            path = self._stoploss_paths.get(pos['hash'])
+            if path is None:
+                path = self._stoploss_paths[pos['hash']] = self._plan_stoploss(pos, i)
+            next_event = path.next_event(i, len(self.valid_timestamps))
+            if next_event >= 0:
+                wake_ups.append(next_event)
+        return wake_ups
+
+    def _scheduled_wake_ups(self, calendar) -> np.ndarray:
+        '''Boolean mask over self.valid_timestamps of the minutes the strategy declared (Strategy.wake_up_schedule), every minute if it declared none'''
+        schedule = self.strategy.wake_up_schedule()
+        self._wake_while_positions_open = schedule is None or schedule.while_positions_open
+        if schedule is None:
+            return np.ones(len(self.valid_timestamps), dtype=bool)
+        wake_up = np.isin(calendar.times_of_day(self.valid_timestamps), [calendar.time_of_day(pd.Timestamp(t)) for t in schedule.times])
+        if schedule.every_n_minutes is not None:
+            minutes = calendar.minutes_of_session(self.valid_timestamps)
+            wake_up |= (minutes >= 0) & (minutes % schedule.every_n_minutes == 0)
+        return wake_up
+
+    def _needs_next_minute(self) -> bool:
+        '''True if the next minute must be visited whatever the schedule says: pending orders, or positions the strategy watches (stop-losses schedule their own, see _stoploss_wake_ups)'''
+        position = self.strategy.position
+        if self.outstanding_orders or (self._wake_while_positions_open and position):
+            return True
+        # get_stoploss_actions() asks square_off_actions(square_off_ids=set()) every minute, which some strategies answer with every open position
+        return bool(position) and bool(self.strategy.square_off_actions(square_off_ids=set()))
+
     def run(self) -> dict:
     
+        self.dbconnector.reset_stats()  # Data-access counters of this run only, see DBConnector.stats()
         self.valid_timestamps = self.dbconnector.df_spot.loc[self.config.start_date : self.config.end_date].index
         self.valid_timestamps = self.valid_timestamps.sort_values()
+        calendar = self.dbconnector.calendar
+        self.valid_timestamps = self.valid_timestamps[calendar.in_session(self.valid_timestamps)]  # Clock = spot bars inside a trading session (holidays / off-session bars dropped)
         self._initialize_metrics(timestamps=self.valid_timestamps)
         self.backtest_code = pd.Timestamp.now().strftime("%Y-%m-%d_%H:%M:%S")
 
-        for current_timestamp in tqdm(self.valid_timestamps, desc="Running Backtest", unit="timestamp"):
-            if current_timestamp.date() == pd.Timestamp("2024-11-01").date():
+        # Optional prefetch: while day D runs, warm the contracts around day D+1's opening ATM (see DBConnector.enable_prefetch)
+        prefetcher = self.dbconnector.prefetcher
+        if prefetcher is not None:
+            day_offsets = calendar.day_offsets(self.valid_timestamps)
+            day_opens = np.flatnonzero(np.r_[True, day_offsets[1:] != day_offsets[:-1]]) if len(day_offsets) else day_offsets     # Position of the first bar of each day
+            next_day_open = np.full(len(self.valid_timestamps), -1)
+            next_day_open[day_opens[:-1]] = day_opens[1:]       # At the first bar of a day: position of the next day's first bar
+            prefetcher.resume()
+            if len(day_opens) > 0:
+                prefetcher.schedule_day(self.valid_timestamps[day_opens[0]])
+        covered = self.dbconnector.covered_day_mask(self.valid_timestamps)     # Days without options data (from the manifest) are skipped
+        self._covered = covered
+        self._stoploss_paths = {}
+
+        # Event clock: a priority queue of minute positions. Minutes where neither the strategy nor the backtester has anything to do are never visited
+        wake_up = self._scheduled_wake_ups(calendar)
+        if prefetcher is not None:
+            wake_up[day_opens] = True
+        clock = np.flatnonzero(wake_up).tolist()    # Sorted, hence already a heap
+        last_i = -1
+        progress = tqdm(total=len(self.valid_timestamps), desc="Running Backtest", unit="timestamp")
+
+        while clock:
+            i = heapq.heappop(clock)
+            if i <= last_i:
+                continue    # Scheduled twice
+            progress.update(i - last_i)
+            last_i = i
+            current_timestamp = self.valid_timestamps[i]
+
+            if prefetcher is not None and next_day_open[i] >= 0:
+                prefetcher.schedule_day(self.valid_timestamps[next_day_open[i]])
+
+            if not covered[i]:
+                if self._needs_next_minute() and i + 1 < len(self.valid_timestamps):
+                    heapq.heappush(clock, i + 1)    # Open positions / pending orders are carried over the gap
                 continue  # Skip the timestamp for which we don't have data
 
             strategy_actions = self.strategy.action(current_timestamp)
@@ -365,6 +487,21 @@ class BackTester:
             # 5. Update all the metrics for the time step by calling the update_metrics function.            
             self.update_step_metrics(current_timestamp, metadata, self.valid_timestamps)
 
+            if self._needs_next_minute() and i + 1 < len(self.valid_timestamps):
+                heapq.heappush(clock, i + 1)    # e.g. an order is still pending: retry it on the next minute
+            for wake_up_i in self._stoploss_wake_ups(i):
+                heapq.heappush(clock, wake_up_i)    # The minute a stop-loss triggers (precomputed), not every minute in between
+        progress.update(len(self.valid_timestamps) - 1 - last_i)
+        progress.close()
+
+        if prefetcher is not None:
+            prefetcher.cancel()     # Nothing left to warm
+            self.prefetch_stats = prefetcher.stats()
+            print(f"Prefetch: {self.prefetch_stats['used']}/{self.prefetch_stats['prefetched']} prefetched contracts used, hid {self.prefetch_stats['hidden_seconds']:.2f}s of reads")
+        self.data_stats = self.dbconnector.stats()
+        io = self.data_stats['io']
+        print(f"Data: {io['files_opened']} files opened, {io['bytes_read'] / 2**20:.1f} MiB read in {io['read_seconds']:.2f}s, cache hit rate {self.data_stats['cache']['hit_rate']:.1%}")
+
         # 6. When all the timesteps are done, then compute one-time metrics such as Sharpe ratio, Expectancy and more.        
         self.update_final_metrics()
 
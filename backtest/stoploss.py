@@ -0,0 +1,60 @@
+from dataclasses import dataclass
+import numpy as np
+
+
+def stoploss_trigger(high: np.ndarray, low: np.ndarray, level: float, trade_type: str, trail_from: float | None = None) -> tuple[int, np.ndarray, np.ndarray, np.ndarray | None]:
+    '''
+    Vectorised BackTester.update_stoploss_price_level + check_stoploss_condition over the bars a stop-loss position will see, in order.
+    level is the stop level after the entry bar. trail_from is None for a fixed stop, else the entry bar's high (long) / low (short) that a trailing stop ratchets from.
+    Returns (index of the first bar that hits the stop or -1, hit mask, level after each bar, trail extreme after each bar or None).
+    Bit-identical to the minute-by-minute update: the level moves by the same float gaps, summed left to right by ufunc.accumulate.
+    '''
+    assert trade_type in ["long", "short"], "trade_type must be either 'long' or 'short'"
+    high, low = np.asarray(high, dtype=np.float64), np.asarray(low, dtype=np.float64)
+    long = trade_type == "long"
+
+    if trail_from is None or trail_from != trail_from:  # Fixed stop (a NaN trail seed never moves either: every comparison with it is False)
+        levels = np.full(len(high), level, dtype=np.float64)
+        extremes = None if trail_from is None else np.full(len(high), trail_from, dtype=np.float64)
+    else:
+        # Running max of highs (long) / min of lows (short) seeded with the entry bar; fmax/fmin skip NaN bars like the `>` / `<` tests do
+        extremes = (np.fmax if long else np.fmin).accumulate(np.r_[trail_from, high if long else low])
+        moved = extremes[1:] != extremes[:-1]
+        gaps = np.where(moved, (extremes[1:] - extremes[:-1]) if long else (extremes[:-1] - extremes[1:]), 0.0)
+        levels = (np.add if long else np.subtract).accumulate(np.r_[level, gaps])[1:]   # level += gap_up / level -= gap_down, one bar at a time
+        extremes = extremes[1:]
+
+    hits = (low <= levels) if long else (high >= levels)    # NaN bars / levels never hit
+    trigger = int(np.argmax(hits)) if hits.any() else -1
+    return trigger, hits, levels, extremes
+
+
+@dataclass
+class StopLossPath:
+    '''
+    The precomputed course of one open stop-loss position over the backtest clock (positions in BackTester.valid_timestamps):
+    - minutes           : the clock positions where the stop is evaluated (every covered minute after the fill, while the contract has bars)
+    - hits, levels      : stop hit / stoploss_price_level at each of those minutes
+    - extremes          : previous_highest_level (long) / previous_lowest_level (short) of a trailing stop, None for a fixed stop
+    - end               : first covered clock position past the path (a missing bar, or past the contract's expiry), len(clock) if none
+    '''
+    minutes: np.ndarray
+    hits: np.ndarray
+    levels: np.ndarray
+    extremes: np.ndarray | None
+    end: int
+
+    def __post_init__(self):
+        self._hit_minutes = self.minutes[self.hits]
+
+    def step(self, i: int) -> int:
+        '''Index of clock position i in minutes, -1 if i is not on the path'''
+        k = int(np.searchsorted(self.minutes, i))
+        return k if k < len(self.minutes) and self.minutes[k] == i else -1
+
+    def next_event(self, i: int, clock_length: int) -> int:
+        '''First clock position after i where the backtester must look at the position (the stop hits, or the path ends), -1 if none'''
+        k = int(np.searchsorted(self._hit_minutes, i, side='right'))
+        if k < len(self._hit_minutes):
+            return int(self._hit_minutes[k])
+        return self.end if self.end < clock_length else -1
@@ -0,0 +1,262 @@
+import os
+import json
+from dataclasses import dataclass
+from pathlib import Path
+import numpy as np
+import pandas as pd
+from connectors.contract import Contract
+from utils.data_utils import read_option_data, IO_STATS
+
+NS_PER_MINUTE = 60 * 10**9
+NS_PER_DAY = 24 * 60 * NS_PER_MINUTE
+ARRAY_STORE_VERSION = 1
+
+
+@dataclass
+class ContractArrays:
+    '''
+    One option contract laid out on a dense minute grid: slot = (day - first_day) * minutes_per_day + (minute_of_day - start_minute).
+    Timestamp --> row is integer arithmetic, no hashing or bisecting of Timestamps.
+    - values : float64 (n_slots, n_columns), NaN where the source had no bar
+    - valid  : bool (n_slots,), True where the source had a bar
+    '''
+    first_day: int              # days since epoch of the first session in the grid
+    start_minute: int           # minute of day of the first slot of every session (555 == 09:15)
+    minutes_per_day: int        # slots per session
+    columns: tuple              # column names in the order of values[:, j]
+    dtypes: tuple               # source dtypes (restored by to_frame)
+    index_name: str | None
+    index_unit: str
+    values: np.ndarray
+    valid: np.ndarray
+
+    @property
+    def nbytes(self) -> int:
+        return int(self.values.nbytes + self.valid.nbytes)
+
+    def column_idx(self, field: str) -> int:
+        try:
+            return self.columns.index(field)
+        except ValueError:
+            raise KeyError(field)
+
+    def slot(self, timestamp: pd.Timestamp) -> int:
+        '''Row of timestamp in values. Raises KeyError (like DataFrame.loc) if there is no bar at timestamp.'''
+        ns = timestamp.value if isinstance(timestamp, pd.Timestamp) else pd.Timestamp(timestamp).value
+        day, ns_of_day = divmod(ns, NS_PER_DAY)
+        minute, remainder = divmod(ns_of_day, NS_PER_MINUTE)
+        minute -= self.start_minute
+        slot = (day - self.first_day) * self.minutes_per_day + minute
+        if remainder or not (0 <= minute < self.minutes_per_day) or not (0 <= slot < len(self.valid)) or not self.valid[slot]:
+            raise KeyError(timestamp)
+        return slot
+
+    def slots(self, timestamps) -> np.ndarray:
+        '''Vectorised slot(): rows of every timestamp in values, -1 where there is no bar'''
+        ns = pd.DatetimeIndex(timestamps).as_unit("ns").asi8
+        days, ns_of_day = np.divmod(ns, NS_PER_DAY)
+        minutes, remainder = np.divmod(ns_of_day, NS_PER_MINUTE)
+        minutes -= self.start_minute
+        slots = (days - self.first_day) * self.minutes_per_day + minutes
+        ok = (remainder == 0) & (minutes >= 0) & (minutes < self.minutes_per_day) & (slots >= 0) & (slots < len(self.valid))
+        ok[ok] = self.valid[slots[ok]]
+        return np.where(ok, slots, -1)
+
+    def get(self, timestamp: pd.Timestamp, field: str = 'close') -> float:
+        return float(self.values[self.slot(timestamp), self.column_idx(field)])
+
+    def row(self, timestamp: pd.Timestamp) -> np.ndarray:
+        '''All columns at timestamp (a view into values)'''
+        return self.values[self.slot(timestamp)]
+
+    def index_ns(self, slots: np.ndarray | None = None) -> np.ndarray:
+        '''int64 nanosecond timestamps of the given slots (default: every valid slot)'''
+        if slots is None:
+            slots = np.flatnonzero(self.valid)
+        days, minutes = np.divmod(slots, self.minutes_per_day)
+        return (days + self.first_day) * NS_PER_DAY + (minutes + self.start_minute) * NS_PER_MINUTE
+
+    def to_frame(self, columns: list[str] | None = None, start: pd.Timestamp | str | None = None, end: pd.Timestamp | str | None = None) -> pd.DataFrame:
+        '''Rebuild the (de-duplicated, sorted) DataFrame the arrays were materialised from, optionally only some columns and the rows in [start, end]'''
+        slots = np.flatnonzero(self.valid)
+        index_ns = self.index_ns(slots)
+        if start is not None or end is not None:
+            keep = np.ones(len(slots), dtype=bool)
+            if start is not None:
+                keep &= index_ns >= pd.Timestamp(start).as_unit("ns").value
+            if end is not None:
+                keep &= index_ns <= pd.Timestamp(end).as_unit("ns").value
+            slots, index_ns = slots[keep], index_ns[keep]
+        index = pd.DatetimeIndex(index_ns.astype("datetime64[ns]"), name=self.index_name).as_unit(self.index_unit)
+        columns = self.columns if columns is None else columns
+        data = {column: self.values[slots, self.column_idx(column)].astype(self.dtypes[self.column_idx(column)]) for column in columns}
+        return pd.DataFrame(data, index=index)
+
+    def with_columns(self, df_extra: pd.DataFrame) -> "ContractArrays":
+        '''In-memory copy with the columns of df_extra appended (df_extra is aligned with the rows of to_frame())'''
+        slots = np.flatnonzero(self.valid)
+        assert len(df_extra) == len(slots), "df_extra must have one row per bar"
+        extra = np.full((len(self.valid), len(df_extra.columns)), np.nan, dtype=np.float64)
+        extra[slots] = df_extra.to_numpy(dtype=np.float64, na_value=np.nan)
+        return ContractArrays(
+            first_day=self.first_day,
+            start_minute=self.start_minute,
+            minutes_per_day=self.minutes_per_day,
+            columns=self.columns + tuple(str(c) for c in df_extra.columns),
+            dtypes=self.dtypes + tuple(str(d) for d in df_extra.dtypes),
+            index_name=self.index_name,
+            index_unit=self.index_unit,
+            values=np.hstack([self.values, extra]),
+            valid=self.valid,
+        )
+
+    @classmethod
+    def from_frame(cls, df: pd.DataFrame) -> "ContractArrays":
+        '''Lay out a (de-duplicated) option DataFrame with a tz-naive minute DatetimeIndex on the dense grid'''
+        assert isinstance(df.index, pd.DatetimeIndex), "Option dataframe must have a DatetimeIndex"
+        assert df.index.tz is None, "Array store expects tz-naive timestamps"
+        assert not df.index.has_duplicates, "De-duplicate the dataframe before materialising it"
+        assert len(df) > 0, "Cannot materialise an empty contract"
+
+        ns = df.index.as_unit("ns").asi8
+        days, ns_of_day = np.divmod(ns, NS_PER_DAY)
+        minutes, remainder = np.divmod(ns_of_day, NS_PER_MINUTE)
+        if remainder.any():
+            raise ValueError("Array store only supports minute bars (found timestamps with seconds)")
+
+        first_day, start_minute = int(days.min()), int(minutes.min())
+        minutes_per_day = int(minutes.max()) - start_minute + 1
+        n_slots = (int(days.max()) - first_day + 1) * minutes_per_day
+        slots = (days - first_day) * minutes_per_day + (minutes - start_minute)
+
+        values = np.full((n_slots, len(df.columns)), np.nan, dtype=np.float64)
+        values[slots] = df.to_numpy(dtype=np.float64, na_value=np.nan)
+        valid = np.zeros(n_slots, dtype=bool)
+        valid[slots] = True
+
+        return cls(
+            first_day=first_day,
+            start_minute=start_minute,
+            minutes_per_day=minutes_per_day,
+            columns=tuple(str(c) for c in df.columns),
+            dtypes=tuple(str(d) for d in df.dtypes),
+            index_name=df.index.name,
+            index_unit=df.index.unit,
+            values=values,
+            valid=valid,
+        )
+
+
+class ArrayOptionStore:
+    '''
+    Memory-mapped copy of the database/options tree.
+    database/options/<ticker>/<CE|PE>/expiry__<expiry>/strike__<strike>.parquet is materialised (lazily, on first access, or in bulk via materialise_all)
+    into <array_root>/options/<ticker>/<CE|PE>/expiry__<expiry>/strike__<strike>.{values.npy, valid.npy, json}
+    The copy is rebuilt whenever the source parquet file changes (size or mtime).
+    '''
+    def __init__(self, database_path: str | Path, array_root: str | Path | None = None):
+        self.database_path = Path(database_path)
+        self.array_root = Path(array_root) if array_root else self.database_path / "arrays"
+
+    def _source_path(self, contract: Contract) -> Path:
+        return self.database_path / "options" / contract.ticker / contract.option_type / f"expiry__{contract.expiry}" / f"strike__{contract.strike}.parquet"
+
+    def _array_stem(self, contract: Contract) -> Path:
+        return self.array_root / "options" / contract.ticker / contract.option_type / f"expiry__{contract.expiry}" / f"strike__{contract.strike}"
+
+    def _is_fresh(self, meta: dict, source_path: Path) -> bool:
+        if meta.get("version") != ARRAY_STORE_VERSION:
+            return False
+        if not source_path.exists():  # Only the array copy was shipped, trust it
+            return True
+        stat = source_path.stat()
+        return meta.get("source_size") == stat.st_size and meta.get("source_mtime_ns") == stat.st_mtime_ns
+
+    def load(self, contract: Contract) -> ContractArrays:
+        '''Memory-map the contract's arrays, materialising them from parquet first if missing or stale'''
+        stem = self._array_stem(contract)
+        meta_path = stem.with_suffix(".json")
+        if meta_path.exists():
+            with open(meta_path, "r") as f:
+                meta = json.load(f)
+            if self._is_fresh(meta, self._source_path(contract)):
+                contract_arrays = ContractArrays(
+                    first_day=meta["first_day"],
+                    start_minute=meta["start_minute"],
+                    minutes_per_day=meta["minutes_per_day"],
+                    columns=tuple(meta["columns"]),
+                    dtypes=tuple(meta["dtypes"]),
+                    index_name=meta["index_name"],
+                    index_unit=meta["index_unit"],
+                    values=np.load(f"{stem}.values.npy", mmap_mode="r"),
+                    valid=np.load(f"{stem}.valid.npy", mmap_mode="r"),
+                )
+                IO_STATS.record(files_opened=2, bytes_mapped=contract_arrays.nbytes)
+                return contract_arrays
+        return self.materialise(contract)
+
+    def materialise(self, contract: Contract) -> ContractArrays:
+        '''(Re)build the array copy of a contract from its parquet file and return it'''
+        source_path = self._source_path(contract)
+        df_option = read_option_data(
+            option_type=contract.option_type,
+            strike=contract.strike,
+            expiry_date=contract.expiry,
+            db_folderpath=self.database_path,
+            ticker=contract.ticker,
+            drop_duplicate_indices=True
+        )
+        arrays = ContractArrays.from_frame(df_option)
+
+        stem = self._array_stem(contract)
+        stem.parent.mkdir(parents=True, exist_ok=True)
+        stat = source_path.stat()
+        meta = {
+            "version": ARRAY_STORE_VERSION,
+            "first_day": arrays.first_day,
+            "start_minute": arrays.start_minute,
+            "minutes_per_day": arrays.minutes_per_day,
+            "columns": list(arrays.columns),
+            "dtypes": list(arrays.dtypes),
+            "index_name": arrays.index_name,
+            "index_unit": arrays.index_unit,
+            "source_size": stat.st_size,
+            "source_mtime_ns": stat.st_mtime_ns,
+        }
+        # Write to temporary files and rename so that a crash never leaves a half written contract behind
+        for suffix, array in (("values", arrays.values), ("valid", arrays.valid)):
+            with open(f"{stem}.{suffix}.npy.tmp", "wb") as f:
+                np.save(f, array)
+            os.replace(f"{stem}.{suffix}.npy.tmp", f"{stem}.{suffix}.npy")
+        with open(f"{stem}.json.tmp", "w") as f:
+            json.dump(meta, f, indent=4)
+        os.replace(f"{stem}.json.tmp", stem.with_suffix(".json"))
+
+        return arrays
+
+    def iter_source_contracts(self, ticker: str = "NIFTY"):
+        '''Yield every Contract present in the parquet options tree of a ticker'''
+        ticker_dir = self.database_path / "options" / ticker
+        for option_type in ("CE", "PE"):
+            for expiry_dir in sorted((ticker_dir / option_type).glob("expiry__*")):
+                expiry = expiry_dir.name.split("__", 1)[1]
+                for strike_path in sorted(expiry_dir.glob("strike__*.parquet")):
+                    strike = int(strike_path.stem.split("__", 1)[1])
+                    yield Contract(ticker=ticker, option_type=option_type, strike=strike, expiry=expiry)
+
+    def materialise_all(self, ticker: str = "NIFTY") -> int:
+        '''Materialise (or refresh) every contract of a ticker. Returns the number of contracts processed.'''
+        count = 0
+        for contract in self.iter_source_contracts(ticker):
+            self.load(contract)     # load() only rebuilds stale or missing copies
+            count += 1
+        return count
+
+
+if __name__ == "__main__":
+
+    # Build the array copy of the whole NIFTY options tree once (later runs only refresh changed files)
+    # Run from the project root :: python -m connectors.array_store
+    from constants import GLOBAL_DB_FOLDERPATH, ARRAY_DB_FOLDERPATH
+    store = ArrayOptionStore(GLOBAL_DB_FOLDERPATH, ARRAY_DB_FOLDERPATH)
+    print(f"Materialised {store.materialise_all('NIFTY')} contracts into {store.array_root}")
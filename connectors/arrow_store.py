@@ -0,0 +1,166 @@
+import time
+from dataclasses import dataclass
+from pathlib import Path
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+from connectors.contract import Contract
+from utils.data_utils import COMPACTED_METADATA_KEY, parquet_index_column, parquet_index_name, IO_STATS, chunk_bytes
+
+
+@dataclass
+class ContractTable:
+    '''
+    One option contract as plain NumPy buffers decoded straight from its Arrow table (no pandas objects on the lookup path).
+    Rows keep the file order of the de-duplicated source, exactly like the DataFrame read_option_data returns.
+    Timestamp --> row is a binary search over sorted_ns (order maps it back to the row when the file is not sorted).
+    Same accessors as array_store.ContractArrays (slot, slots, get, row, values, to_frame, with_columns), so DBConnector serves both alike.
+    - values    : float64 (n_rows, n_columns)
+    - sorted_ns : int64 nanosecond timestamps, ascending
+    - order     : rows of sorted_ns in values (None when the file is already sorted)
+    '''
+    columns: tuple              # column names in the order of values[:, j]
+    dtypes: tuple               # pandas dtypes of the columns (restored by to_frame)
+    index_name: str | None
+    index_unit: str
+    values: np.ndarray
+    sorted_ns: np.ndarray
+    order: np.ndarray | None
+
+    @property
+    def nbytes(self) -> int:
+        return int(self.values.nbytes + self.sorted_ns.nbytes + (self.order.nbytes if self.order is not None else 0))
+
+    def column_idx(self, field: str) -> int:
+        try:
+            return self.columns.index(field)
+        except ValueError:
+            raise KeyError(field)
+
+    def slot(self, timestamp: pd.Timestamp) -> int:
+        '''Row of timestamp in values. Raises KeyError (like DataFrame.loc) if there is no bar at timestamp.'''
+        ns = timestamp.value if isinstance(timestamp, pd.Timestamp) else pd.Timestamp(timestamp).value
+        position = int(np.searchsorted(self.sorted_ns, ns))
+        if position == len(self.sorted_ns) or self.sorted_ns[position] != ns:
+            raise KeyError(timestamp)
+        return position if self.order is None else int(self.order[position])
+
+    def slots(self, timestamps) -> np.ndarray:
+        '''Vectorised slot(): rows of every timestamp in values, -1 where there is no bar'''
+        ns = pd.DatetimeIndex(timestamps).as_unit("ns").asi8
+        positions = np.minimum(np.searchsorted(self.sorted_ns, ns), max(len(self.sorted_ns) - 1, 0))
+        found = (self.sorted_ns[positions] == ns) if len(self.sorted_ns) else np.zeros(len(ns), dtype=bool)
+        rows = positions if self.order is None else self.order[positions]
+        return np.where(found, rows, -1)
+
+    def get(self, timestamp: pd.Timestamp, field: str = 'close') -> float:
+        return float(self.values[self.slot(timestamp), self.column_idx(field)])
+
+    def row(self, timestamp: pd.Timestamp) -> np.ndarray:
+        '''All columns at timestamp (a view into values)'''
+        return self.values[self.slot(timestamp)]
+
+    def index_ns(self) -> np.ndarray:
+        '''int64 nanosecond timestamps of every row, in row order'''
+        if self.order is None:
+            return self.sorted_ns
+        index_ns = np.empty_like(self.sorted_ns)
+        index_ns[self.order] = self.sorted_ns
+        return index_ns
+
+    def to_frame(self, columns: list[str] | None = None, start: pd.Timestamp | str | None = None, end: pd.Timestamp | str | None = None) -> pd.DataFrame:
+        '''The de-duplicated DataFrame read_option_data returns (pandas only at this edge), optionally only some columns and the rows in [start, end]'''
+        index_ns = self.index_ns()
+        rows = slice(None)
+        if start is not None or end is not None:
+            keep = np.ones(len(index_ns), dtype=bool)
+            if start is not None:
+                keep &= index_ns >= pd.Timestamp(start).as_unit("ns").value
+            if end is not None:
+                keep &= index_ns <= pd.Timestamp(end).as_unit("ns").value
+            rows = np.flatnonzero(keep)
+        index = pd.DatetimeIndex(index_ns[rows].astype("datetime64[ns]"), name=self.index_name).as_unit(self.index_unit)
+        columns = self.columns if columns is None else columns
+        data = {column: self.values[rows, self.column_idx(column)].astype(self.dtypes[self.column_idx(column)]) for column in columns}
+        return pd.DataFrame(data, index=index)
+
+    def with_columns(self, df_extra: pd.DataFrame) -> "ContractTable":
+        '''Copy with the columns of df_extra appended (df_extra is aligned with the rows of to_frame())'''
+        assert len(df_extra) == len(self.values), "df_extra must have one row per bar"
+        return ContractTable(
+            columns=self.columns + tuple(str(c) for c in df_extra.columns),
+            dtypes=self.dtypes + tuple(str(d) for d in df_extra.dtypes),
+            index_name=self.index_name,
+            index_unit=self.index_unit,
+            values=np.hstack([self.values, df_extra.to_numpy(dtype=np.float64, na_value=np.nan)]),
+            sorted_ns=self.sorted_ns,
+            order=self.order,
+        )
+
+    @classmethod
+    def from_table(cls, table: pa.Table, index_column: str, index_name: str | None = None, drop_duplicate_indices: bool = True) -> "ContractTable":
+        '''
+        Decode an Arrow table (index stored as the timestamp column index_column) without going through pandas.
+        index_name is the name pandas gives that index (None for an unnamed index stored as __index_level_0__, see parquet_index_name).
+        '''
+        index_type = table.schema.field(index_column).type
+        assert pa.types.is_timestamp(index_type) and index_type.tz is None, f"{index_column} must be a tz-naive timestamp column"
+        ns = table.column(index_column).cast(pa.timestamp("ns")).to_numpy().view(np.int64)
+
+        columns, dtypes, arrays = [], [], []
+        for name in table.column_names:
+            if name == index_column:
+                continue
+            column = table.column(name)
+            assert pa.types.is_integer(column.type) or pa.types.is_floating(column.type), f"Unsupported column type {column.type} for {name}"
+            columns.append(name)
+            dtypes.append("float64" if column.null_count else str(np.dtype(column.type.to_pandas_dtype())))     # pandas reads integers with nulls as float64
+            arrays.append(column.to_numpy(zero_copy_only=False).astype(np.float64))
+        values = np.column_stack(arrays) if arrays else np.empty((len(ns), 0), dtype=np.float64)
+
+        if drop_duplicate_indices:  # Keep the first row of every timestamp, in file order (DataFrame.index.duplicated(keep='first'))
+            _, first = np.unique(ns, return_index=True)
+            if len(first) < len(ns):
+                keep = np.sort(first)
+                ns, values = ns[keep], values[keep]
+
+        order = None
+        if len(ns) > 1 and (np.diff(ns) < 0).any():
+            order = np.argsort(ns, kind="stable")
+            ns = ns[order]
+        return cls(
+            columns=tuple(columns),
+            dtypes=tuple(dtypes),
+            index_name=index_name,
+            index_unit=index_type.unit,
+            values=values,
+            sorted_ns=ns,
+            order=order,
+        )
+
+
+class ArrowOptionStore:
+    '''
+    Reads database/options/<ticker>/<CE|PE>/expiry__<expiry>/strike__<strike>.parquet with pyarrow into ContractTable buffers.
+    Nothing is materialised on disk (unlike ArrayOptionStore), the parquet tree is the only copy.
+    '''
+    def __init__(self, database_path: str | Path):
+        self.database_path = Path(database_path)
+
+    def _source_path(self, contract: Contract) -> Path:
+        return self.database_path / "options" / contract.ticker / contract.option_type / f"expiry__{contract.expiry}" / f"strike__{contract.strike}.parquet"
+
+    def load(self, contract: Contract) -> ContractTable:
+        source_path = self._source_path(contract)
+        read_start = time.perf_counter()
+        with pq.ParquetFile(source_path) as parquet_file:
+            table = parquet_file.read()
+            bytes_read = chunk_bytes(parquet_file.metadata)
+        metadata = table.schema.metadata or {}
+        index_column = parquet_index_column(metadata)
+        assert index_column is not None, f"No named index column in {source_path}"
+        contract_table = ContractTable.from_table(table, index_column, parquet_index_name(metadata, index_column), drop_duplicate_indices=COMPACTED_METADATA_KEY not in metadata)
+        IO_STATS.record(files_opened=1, bytes_read=bytes_read, rows_read=table.num_rows, rows_deduped=table.num_rows - len(contract_table.sorted_ns),
+                        read_seconds=time.perf_counter() - read_start)
+        return contract_table
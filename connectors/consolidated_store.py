@@ -0,0 +1,77 @@
+import threading
+import time
+from pathlib import Path
+import pyarrow as pa
+import pyarrow.parquet as pq
+from connectors.contract import Contract
+from utils.data_utils import consolidated_expiry_path, consolidated_index_column, consolidated_index_name, consolidated_column_types, consolidated_table_to_frame, row_groups_in_range, frames_from_batches, DEFAULT_BATCH_SIZE, IO_STATS, chunk_bytes
+
+
+class ConsolidatedOptionStore:
+    '''
+    Reads contracts from the per-expiry dataset written by utils/consolidate_database.py
+    (<consolidated_root>/options/<ticker>/expiry__<expiry>.parquet, rows sorted by option_type, strike, timestamp).
+    The footer of each expiry file is parsed once, and (option_type, strike) --> row groups is built from its column statistics,
+    so loading a contract reads exactly its row groups: no per-strike file open and no filter evaluation.
+    '''
+    def __init__(self, consolidated_root: str | Path):
+        self.consolidated_root = Path(consolidated_root)
+        self._expiries = {}     # (ticker, expiry) --> (path, FileMetaData, timestamp column, index name, {(option_type, strike): [row group ids]}, consolidated_column_types)
+        self._lock = threading.Lock()   # Prefetch threads may open the same expiry concurrently
+
+    def _open(self, ticker: str, expiry: str) -> tuple:
+        key = (ticker, expiry)
+        with self._lock:
+            if key not in self._expiries:
+                path = consolidated_expiry_path(expiry, self.consolidated_root, ticker)
+                metadata = pq.read_metadata(path)
+                names = [metadata.schema.column(j).name for j in range(metadata.num_columns)]
+                type_col, strike_col = names.index("option_type"), names.index("strike")
+
+                row_groups = {}
+                for i in range(metadata.num_row_groups):
+                    type_stats, strike_stats = metadata.row_group(i).column(type_col).statistics, metadata.row_group(i).column(strike_col).statistics
+                    assert type_stats.min == type_stats.max and strike_stats.min == strike_stats.max, f"Row group {i} of {path} holds more than one contract, re-run utils/consolidate_database.py"
+                    row_groups.setdefault((type_stats.min, int(strike_stats.min)), []).append(i)
+                self._expiries[key] = (path, metadata, consolidated_index_column(metadata.metadata), consolidated_index_name(metadata.metadata), row_groups,
+                                       consolidated_column_types(metadata.metadata))
+            return self._expiries[key]
+
+    def contracts(self, ticker: str, expiry: str) -> list[Contract]:
+        '''Every contract stored for the expiry, in file order'''
+        _, _, _, _, row_groups, _ = self._open(ticker, expiry)
+        return [Contract(ticker=ticker, option_type=option_type, strike=strike, expiry=expiry) for option_type, strike in row_groups]
+
+    def load(self, contract: Contract, columns: list[str] | None = None):
+        '''De-duplicated, sorted DataFrame of one contract (same as read_option_data). FileNotFoundError if the contract is not in the expiry file.'''
+        path, metadata, index_column, index_name, row_groups, column_types = self._open(contract.ticker, contract.expiry)
+        contract_row_groups = row_groups.get((contract.option_type, int(contract.strike)))
+        if not contract_row_groups:
+            raise FileNotFoundError(f"{contract} not found in {path}")
+        read_start = time.perf_counter()
+        read_columns = None if columns is None else [index_column, *columns]
+        with pq.ParquetFile(path, metadata=metadata) as parquet_file:     # Re-uses the parsed footer, one handle per call so threads don't share a reader
+            table = parquet_file.read_row_groups(contract_row_groups, columns=read_columns)
+        df_option = consolidated_table_to_frame(table, index_column, index_name, column_types.get((contract.option_type, int(contract.strike))))
+        IO_STATS.record(files_opened=1, bytes_read=chunk_bytes(metadata, contract_row_groups, read_columns), rows_read=table.num_rows, read_seconds=time.perf_counter() - read_start)
+        return df_option
+
+    def iter_batches(self, contract: Contract, batch_size: int = DEFAULT_BATCH_SIZE, columns: list[str] | None = None, start=None, end=None):
+        '''Streaming load(): DataFrames of at most batch_size rows of the contract within [start, end], only its overlapping row groups are decoded'''
+        path, metadata, index_column, index_name, row_groups, column_types = self._open(contract.ticker, contract.expiry)
+        contract_row_groups = row_groups.get((contract.option_type, int(contract.strike)))
+        if not contract_row_groups:
+            raise FileNotFoundError(f"{contract} not found in {path}")
+        contract_row_groups = row_groups_in_range(metadata, index_column, start, end, row_groups=contract_row_groups)
+        read_columns = None if columns is None else [index_column, *columns]
+        contract_types = column_types.get((contract.option_type, int(contract.strike)))
+        IO_STATS.record(files_opened=1, bytes_read=chunk_bytes(metadata, contract_row_groups, read_columns))
+        with pq.ParquetFile(path, metadata=metadata) as parquet_file:
+            batches = parquet_file.iter_batches(batch_size=batch_size, row_groups=contract_row_groups, columns=read_columns)
+            # Consolidated rows are already sorted and de-duplicated
+            yield from frames_from_batches(batches, False, start, end, to_frame=lambda batch: consolidated_table_to_frame(pa.Table.from_batches([batch]), index_column, index_name, contract_types))
+
+    def clear(self):
+        '''Forget the parsed footers (e.g. after re-running the converter)'''
+        with self._lock:
+            self._expiries.clear()
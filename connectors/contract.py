@@ -0,0 +1,25 @@
+from dataclasses import dataclass
+import numpy as np
+
+BAR_FIELDS = ("open", "high", "low", "close", "volume")
+BAR_DTYPE = np.dtype([(field, np.float64) for field in BAR_FIELDS])   # One OHLCV bar as a numpy record
+
+
+@dataclass(frozen=True)
+class Contract:
+    '''Identifies a single option contract in the database (one parquet file).'''
+    ticker: str                        # e.g. "NIFTY"
+    option_type: str                   # must be "CE" or "PE"
+    strike: int                        # stored as int, same as the strike__<strike>.parquet filename
+    expiry: str                        # 'YYYY-MM-DD'
+
+    def __post_init__(self):
+        assert self.option_type in ("CE", "PE"), "option_type must be 'CE' or 'PE'"
+        object.__setattr__(self, "strike", int(self.strike))    # 22500.0 and 22500 must map to the same contract
+        assert isinstance(self.expiry, str), "expiry must be a string format 'YYYY-MM-DD' "
+
+    @classmethod
+    def from_action(cls, action, ticker: str) -> "Contract":
+        '''Build the contract traded by a strategy.Action (or anything with option_type, strike and expiry) on ticker (an Action carries no ticker: pass the DBConnector's)'''
+        return cls(ticker=ticker, option_type=action.option_type, strike=action.strike, expiry=action.expiry)
+
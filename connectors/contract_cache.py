@@ -0,0 +1,205 @@
+from collections import OrderedDict
+from concurrent.futures import Future
+import threading
+import time
+from typing import Any, Callable, Hashable
+import numpy as np
+import pandas as pd
+
+DEFAULT_CACHE_MAX_BYTES = 1024 ** 3     # 1 GiB
+
+
+def estimate_nbytes(value: Any) -> int:
+    '''Approximate in-memory size of a cached value in bytes'''
+    if isinstance(value, pd.DataFrame):
+        return int(value.memory_usage(index=True, deep=True).sum())
+    if isinstance(value, pd.Series):
+        return int(value.memory_usage(index=True, deep=True))
+    if isinstance(value, np.ndarray):
+        return int(value.nbytes)
+    if hasattr(value, "nbytes"):
+        return int(value.nbytes)
+    raise TypeError(f"Cannot estimate the size of {type(value).__name__}, pass nbytes explicitly.")
+
+
+def key_group(key: Hashable) -> str | None:
+    '''
+    Accounting group of a cache key: the ticker of a Contract key, or of the Contract leading a tuple key such as (contract, timeframe),
+    or the ticker leading a tuple key such as (ticker, expiry, "chain")
+    '''
+    if isinstance(key, tuple) and key:
+        key = key[0]
+    return key if isinstance(key, str) else getattr(key, "ticker", None)
+
+
+class ContractCache:
+    '''
+    Least-recently-used cache of per-contract data, bounded by a memory budget.
+    - Keys are usually connectors.contract.Contract objects, values are whatever the loader returns (DataFrame for the parquet store).
+    - When the budget is exceeded the least recently used entries are evicted first.
+    - Values larger than the whole budget are returned to the caller but never stored.
+    Cached values are shared between callers and must be treated as read-only.
+    The cache is thread-safe: concurrent get_or_load calls for the same key run the loader once, the other callers wait for it.
+    One budget is shared by every ticker, info()['by_ticker'] breaks bytes, hits, misses and evictions down per ticker (see key_group).
+    '''
+    def __init__(self, max_bytes: int | None = DEFAULT_CACHE_MAX_BYTES):
+        assert max_bytes is None or max_bytes >= 0, "max_bytes must be None (unbounded) or non-negative"
+        self.max_bytes = max_bytes
+        self._entries: "OrderedDict[Hashable, tuple[Any, int]]" = OrderedDict()   # key --> (value, nbytes), oldest first
+        self._loading: dict[Hashable, Future] = {}     # key --> Future of a load running in another thread
+        self._lock = threading.RLock()
+        self.current_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.wait_seconds = 0.0     # Time spent waiting for loads started by other threads (e.g. a prefetcher)
+        self._group_counters: dict[str | None, dict] = {}   # key_group --> bytes / entries / hits / misses / evictions
+
+    def _count(self, key: Hashable, counter: str, amount: int = 1):
+        group = key_group(key)
+        if group not in self._group_counters:
+            self._group_counters[group] = {'bytes': 0, 'entries': 0, 'hits': 0, 'misses': 0, 'evictions': 0}
+        self._group_counters[group][counter] += amount
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __contains__(self, key: Hashable) -> bool:
+        return key in self._entries
+
+    def entry_nbytes(self, key: Hashable) -> int:
+        '''Accounted size of a cached entry (0 if not cached). Does not touch the LRU order or the counters.'''
+        with self._lock:
+            entry = self._entries.get(key)
+            return entry[1] if entry is not None else 0
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        '''Return the cached value (marking it most recently used) or default. Counts a hit or a miss.'''
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                self._count(key, 'misses')
+                return default
+            self._entries.move_to_end(key)
+            self.hits += 1
+            self._count(key, 'hits')
+            return entry[0]
+
+    def put(self, key: Hashable, value: Any, nbytes: int | None = None) -> bool:
+        '''Insert (or replace) a value and evict LRU entries until the budget holds. Returns True if the value was stored.'''
+        nbytes = estimate_nbytes(value) if nbytes is None else int(nbytes)
+        with self._lock:
+            self.pop(key)
+            if self.max_bytes is not None and nbytes > self.max_bytes:
+                return False
+            self._entries[key] = (value, nbytes)
+            self.current_bytes += nbytes
+            self._count(key, 'bytes', nbytes)
+            self._count(key, 'entries')
+            self._evict()
+            return True
+
+    def pop(self, key: Hashable) -> Any:
+        '''Remove a single entry without counting it as an eviction'''
+        with self._lock:
+            entry = self._entries.pop(key, None)
+            if entry is None:
+                return None
+            self.current_bytes -= entry[1]
+            self._count(key, 'bytes', -entry[1])
+            self._count(key, 'entries', -1)
+            return entry[0]
+
+    def get_or_load(self, key: Hashable, loader: Callable[[], Any], count: bool = True) -> Any:
+        '''
+        Return the cached value for key, calling loader() and caching its result on a miss.
+        count=False leaves hits, misses and wait_seconds untouched (background warming such as the prefetcher, so the counters only reflect the caller's own lookups).
+        '''
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+                if count:
+                    self.hits += 1
+                    self._count(key, 'hits')
+                return entry[0]
+            pending = self._loading.get(key)
+            if pending is None:     # We are the loading thread
+                if count:
+                    self.misses += 1
+                    self._count(key, 'misses')
+                future = self._loading[key] = Future()
+
+        if pending is not None:     # Another thread is already loading this key, wait for it instead of reading twice
+            start = time.perf_counter()
+            try:
+                value = pending.result()
+            finally:
+                if count:
+                    with self._lock:
+                        self.wait_seconds += time.perf_counter() - start
+            if count:
+                with self._lock:
+                    self.hits += 1
+                    self._count(key, 'hits')
+            return value
+
+        try:
+            value = loader()
+        except BaseException as e:
+            with self._lock:
+                self._loading.pop(key, None)
+            future.set_exception(e)
+            raise
+        with self._lock:    # Store before un-registering the load so that no other thread can miss in between
+            self.put(key, value)
+            self._loading.pop(key, None)
+        future.set_result(value)
+        return value
+
+    def _evict(self):
+        if self.max_bytes is None:
+            return
+        while self.current_bytes > self.max_bytes and self._entries:
+            key, (_, nbytes) = self._entries.popitem(last=False)
+            self.current_bytes -= nbytes
+            self.evictions += 1
+            self._count(key, 'bytes', -nbytes)
+            self._count(key, 'entries', -1)
+            self._count(key, 'evictions')
+
+    def clear(self, reset_counters: bool = False):
+        '''Drop every cached entry (optionally also resetting hit/miss/eviction counters)'''
+        with self._lock:
+            self._entries.clear()
+            self.current_bytes = 0
+            for counters in self._group_counters.values():
+                counters['bytes'] = counters['entries'] = 0
+            if reset_counters:
+                self.hits = self.misses = self.evictions = 0
+                self.wait_seconds = 0.0
+                self._group_counters.clear()
+
+    def reset_counters(self):
+        '''Zero the hit/miss/eviction counters (e.g. at the start of a backtest), keeping the cached entries. wait_seconds is left to the prefetcher.'''
+        with self._lock:
+            self.hits = self.misses = self.evictions = 0
+            for counters in self._group_counters.values():
+                counters['hits'] = counters['misses'] = counters['evictions'] = 0
+
+    def info(self) -> dict:
+        '''Snapshot of the cache counters'''
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'entries': len(self._entries),
+                'current_bytes': self.current_bytes,
+                'max_bytes': self.max_bytes,
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'hit_rate': (self.hits / lookups) if lookups else 0.0,
+                'wait_seconds': self.wait_seconds,
+                'by_ticker': {group: dict(counters) for group, counters in self._group_counters.items()},
+            }
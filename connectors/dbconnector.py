@@ -1,46 +1,490 @@
+from dataclasses import dataclass, field
+import functools
+import threading
+import time
+import numpy as np
 import pandas as pd
-from utils.data_utils import read_parquet_data, read_option_data
-from constants import NIFTY_PARQUET_PATH, GLOBAL_DB_FOLDERPATH, NIFTY_EXPIRIES_JSON_PATH
+from typing import Iterator
+from utils.data_utils import read_parquet_data, read_option_data, iter_option_data, read_timeframe_data, resample_ohlcv, DEFAULT_BATCH_SIZE, IO_STATS
+from utils.black_scholes import option_greeks_frame, GREEK_FIELDS
+from constants import NIFTY_PARQUET_PATH, GLOBAL_DB_FOLDERPATH, NIFTY_EXPIRIES_JSON_PATH, ARRAY_DB_FOLDERPATH, MANIFEST_JSON_PATH, CHAIN_DB_FOLDERPATH, CONSOLIDATED_DB_FOLDERPATH, GREEKS_DB_FOLDERPATH, RISK_FREE_RATE, TIMEFRAMES_DB_FOLDERPATH, TIMEFRAME_MINUTES, STRIKE_STEPS, TICKER_SOURCES, NSE_HOLIDAYS_JSON_PATH
+from connectors.contract import Contract, BAR_FIELDS, BAR_DTYPE
+from connectors.contract_cache import ContractCache, DEFAULT_CACHE_MAX_BYTES
+from connectors.array_store import ArrayOptionStore, ContractArrays
+from connectors.arrow_store import ArrowOptionStore, ContractTable
+from connectors.consolidated_store import ConsolidatedOptionStore
+from connectors.prefetcher import ContractPrefetcher
+from connectors.manifest import DatabaseManifest
+from connectors.option_chain import OptionChainStore, ExpiryChain, ChainSnapshot
+from connectors.greeks_store import GreeksStore
+from connectors.shared_data import SharedMarketData
+from connectors.session_calendar import SessionCalendar
+import os
 import json
 
+STORAGE_ENGINES = ("parquet", "array", "consolidated", "arrow")
+BUFFER_ENGINES = ("array", "arrow")     # Engines whose contracts are NumPy buffers (ContractArrays / ContractTable) rather than DataFrames
+CONTRACT_BUFFERS = (ContractArrays, ContractTable)
+UNCOVERED_DAYS_WITHOUT_MANIFEST = {"2024-11-01"}    # Muhurat trading session, spot exists but there is no options data. Only used where no manifest knows the coverage
+
+def _counted(method):
+    """Count the calls and time of a DBConnector accessor (inclusive: nested accessor calls are counted too), see DBConnector.stats()"""
+    name = method.__name__
+
+    @functools.wraps(method)
+    def wrapper(self, *args, **kwargs):
+        start = time.perf_counter()
+        try:
+            return method(self, *args, **kwargs)
+        finally:
+            with self._stats_lock:      # Prefetch threads call accessors too
+                counters = self._lookup_counters.get(name)
+                if counters is None:
+                    counters = self._lookup_counters[name] = {'calls': 0, 'seconds': 0.0}
+                counters['calls'] += 1
+                counters['seconds'] += time.perf_counter() - start
+    return wrapper
+
+@dataclass
+class TickerData:
+    '''Reference data of one underlying served by DBConnector. df_spot and the expiry calendar are loaded on first use.'''
+    ticker: str
+    spot_parquet_path: str
+    expiries_json_path: str
+    df_spot: pd.DataFrame | None = None
+    expiry_days: np.ndarray | None = None       # Sorted datetime64[D]
+    expiry_strs: list | None = None             # Original expiry strings, aligned with expiry_days
+    closest_expiry_by_day: dict = field(default_factory=dict)  # datetime64[D] --> closest expiry str (or None), memoised per trading date
+    session_calendar: SessionCalendar | None = None     # Trading sessions over the spot's date range, see DBConnector.get_calendar()
+
 class DBConnector:
-    def __init__(self, database_path: str=None, expiries_json_path: str=None, spot_parquet_path: str=None):
+    def __init__(self, database_path: str=None, expiries_json_path: str=None, spot_parquet_path: str=None, cache_max_bytes: int | None = DEFAULT_CACHE_MAX_BYTES,
+                 storage: str = "parquet", array_db_path: str = None, strike_steps: dict = None, manifest_path: str = None, chain_db_path: str = None,
+                 consolidated_db_path: str = None, greeks: bool = False, risk_free_rate: float = RISK_FREE_RATE, greeks_db_path: str = None,
+                 timeframes_db_path: str = None, ticker: str = "NIFTY", tickers: dict = None, shared_data: str | SharedMarketData = None,
+                 holidays_json_path: str = None):
+        assert storage in STORAGE_ENGINES, f"storage must be one of {STORAGE_ENGINES}. Given {storage}"
         self.database_path = database_path if database_path else GLOBAL_DB_FOLDERPATH
-        self.expiries_json_path = expiries_json_path if expiries_json_path else NIFTY_EXPIRIES_JSON_PATH
-        self.spot_parquet_path = spot_parquet_path if spot_parquet_path else NIFTY_PARQUET_PATH
-        self.df_spot = read_parquet_data(self.spot_parquet_path)
+        self.contract_cache = ContractCache(max_bytes=cache_max_bytes)   # LRU cache of per-contract data keyed by Contract, one budget for every ticker. cache_max_bytes=0 disables caching
+        self.strike_steps = {**STRIKE_STEPS, **(strike_steps or {})}    # ticker --> strike step used for ATM rounding
+        self._atm_strike_series = {}    # (ticker, field) --> ATM strike for every row of the ticker's spot, see atm_strikes()
+        self._spot_timeframes = {}      # (ticker, timeframe) --> resampled spot bars
+        self._stats_lock = threading.Lock()
+        self._lookup_counters = {}      # accessor name --> {'calls', 'seconds'}, see stats()
+        self._load_counters = {'contracts': 0, 'seconds': 0.0}     # Contract loads on cache misses (prefetch threads included)
+        self._io_baseline = IO_STATS.snapshot()     # IO_STATS is process-wide, stats() reports what was read since the last reset_stats()
+        self.holidays_json_path = holidays_json_path if holidays_json_path else NSE_HOLIDAYS_JSON_PATH   # NSE holidays / special sessions, see get_calendar()
+
+        # Underlyings served by this connector: TICKER_SOURCES, then tickers={ticker: {"spot_parquet_path": ..., "expiries_json_path": ..., "strike_step": ...}},
+        # then `ticker` with expiries_json_path / spot_parquet_path. self.df_spot, self.expiries_json_path and self.spot_parquet_path are those of `ticker`.
+        self.tickers: dict[str, TickerData] = {}
+        for other_ticker, sources in {**TICKER_SOURCES, **(tickers or {})}.items():
+            self.add_ticker(other_ticker, **sources)
+        default_sources = TICKER_SOURCES.get(ticker, {})
+        self.ticker = ticker
+        self.expiries_json_path = expiries_json_path if expiries_json_path else default_sources.get("expiries_json_path", NIFTY_EXPIRIES_JSON_PATH)
+        self.spot_parquet_path = spot_parquet_path if spot_parquet_path else default_sources.get("spot_parquet_path", NIFTY_PARQUET_PATH)
+        self.add_ticker(ticker, spot_parquet_path=self.spot_parquet_path, expiries_json_path=self.expiries_json_path)
+
+        # Worker of a multi-process backtest: spot and the shared contracts are zero-copy views of the parent's segment (see connectors/shared_data.py)
+        self.shared_data = SharedMarketData.attach(shared_data) if isinstance(shared_data, str) else shared_data
+        if self.shared_data is not None:
+            for shared_ticker, df_spot in self.shared_data.spots.items():
+                if shared_ticker not in self.tickers:
+                    self.add_ticker(shared_ticker, **self.shared_data.ticker_sources[shared_ticker])
+                self.tickers[shared_ticker].df_spot = df_spot
+        self.df_spot = self._spot(ticker)
+
+        # Storage engine for option contracts
+        # "parquet" : contracts are DataFrames read from database/options/...parquet, lookups go through DatetimeIndex
+        # "array"   : contracts are memory-mapped ContractArrays (see connectors/array_store.py), lookups are integer offsets
+        # "consolidated" : contracts are DataFrames read from one parquet file per expiry (see utils/consolidate_database.py)
+        # "arrow"   : contracts are ContractTable NumPy buffers decoded from the parquet files with pyarrow (see connectors/arrow_store.py), no pandas in lookups
+        self.storage = storage
+        self.array_store = None
+        self.consolidated_store = None
+        self.arrow_store = None
+        consolidated_db_path = consolidated_db_path if consolidated_db_path else (CONSOLIDATED_DB_FOLDERPATH if database_path is None else os.path.join(self.database_path, "consolidated"))
+        if storage == "array":
+            array_db_path = array_db_path if array_db_path else (ARRAY_DB_FOLDERPATH if database_path is None else os.path.join(self.database_path, "arrays"))
+            self.array_store = ArrayOptionStore(self.database_path, array_db_path)
+        elif storage == "consolidated":
+            self.consolidated_store = ConsolidatedOptionStore(consolidated_db_path)
+        elif storage == "arrow":
+            self.arrow_store = ArrowOptionStore(self.database_path)
+
+        # Coverage manifest (built by python -m connectors.manifest), loaded once if present and not older than the options tree
+        manifest_path = manifest_path if manifest_path else (MANIFEST_JSON_PATH if database_path is None else os.path.join(self.database_path, "manifest.json"))
+        self.manifest = DatabaseManifest.load_current(manifest_path, self.database_path)
+
+        self.prefetcher = None          # Optional background warming of the contract cache, see enable_prefetch()
+
+        # Optional IV / Greeks columns (utils/black_scholes.GREEK_FIELDS) added to every loaded contract, served like any other field
+        self.greeks_store = None
+        if greeks:
+            greeks_db_path = greeks_db_path if greeks_db_path else (GREEKS_DB_FOLDERPATH if database_path is None else os.path.join(self.database_path, "greeks"))
+            self.greeks_store = GreeksStore(self.database_path, greeks_db_path, spot_close=lambda t: self.get_spot_df(ticker=t)['close'], rate=risk_free_rate)
+
+        # Per-expiry chains for cross-strike queries (see get_chain): memory-mapped if python -m connectors.option_chain built them, else laid out
+        # in memory from the consolidated dataset or the per-strike files. Reading a chain never writes to the database. Loaded chains are kept in
+        # self.contract_cache under (ticker, expiry, "chain"), so they count against the same byte budget and are evicted like contracts
+        chain_db_path = chain_db_path if chain_db_path else (CHAIN_DB_FOLDERPATH if database_path is None else os.path.join(self.database_path, "chains"))
+        self.chain_store = OptionChainStore(self.database_path, chain_db_path, consolidated_db_path)
+
+        # Coarser bars (timeframe= of get_option_df / get_spot_df) come from the pyramid built by utils/build_timeframes.py, else are resampled on first use
+        self.timeframes_db_path = timeframes_db_path if timeframes_db_path else (TIMEFRAMES_DB_FOLDERPATH if database_path is None else os.path.join(self.database_path, "timeframes"))
+
+    def add_ticker(self, ticker: str, spot_parquet_path: str, expiries_json_path: str, strike_step: int = None) -> TickerData:
+        """Register (or replace) an underlying. Its spot and expiry calendar are read on first use, its contracts share self.contract_cache."""
+        # Example :: db.add_ticker("BANKNIFTY", spot_parquet_path=".../BANKNIFTY.parquet", expiries_json_path=".../banknifty_expiries.json", strike_step=100)
+        self.tickers[ticker] = TickerData(ticker=ticker, spot_parquet_path=str(spot_parquet_path), expiries_json_path=str(expiries_json_path))
+        if strike_step is not None:
+            self.strike_steps[ticker] = strike_step
+        for cached in (self._atm_strike_series, self._spot_timeframes):    # Drop what was derived from a replaced spot
+            for key in [k for k in cached if k[0] == ticker]:
+                del cached[key]
+        return self.tickers[ticker]
+
+    def _ticker_data(self, ticker: str) -> TickerData:
+        assert ticker in self.tickers, f"Unknown ticker {ticker}. Register it with add_ticker() or DBConnector(tickers=...). Known: {list(self.tickers)}"
+        return self.tickers[ticker]
+
+    def _spot(self, ticker: str) -> pd.DataFrame:
+        """Minute spot bars of a ticker, read once"""
+        ticker_data = self._ticker_data(ticker)
+        if ticker_data.df_spot is None:
+            ticker_data.df_spot = read_parquet_data(ticker_data.spot_parquet_path)
+        return ticker_data.df_spot
+
+    def get_calendar(self, ticker: str = None) -> SessionCalendar:
+        """
+        Trading-session calendar of a ticker (default: the connector's own) over its spot's date range, built once.
+        Sessions come from the NSE holiday metadata (self.holidays_json_path) when the file exists, else from the days present in the spot.
+        """
+        ticker_data = self._ticker_data(ticker if ticker else self.ticker)
+        if ticker_data.session_calendar is None:
+            expiry_strs = self._load_expiry_calendar(ticker_data.ticker).expiry_strs
+            ticker_data.session_calendar = SessionCalendar.from_spot(self._spot(ticker_data.ticker), self.holidays_json_path, expiries=expiry_strs)
+        return ticker_data.session_calendar
+
+    @property
+    def calendar(self) -> SessionCalendar:
+        return self.get_calendar()
 
-    def get_option_df(self, option_type, strike, expiry_date, ticker="NIFTY", drop_duplicate_indices=True) -> pd.DataFrame:
-        """Method to read option dataframe from the database."""
-        # Example :: self.get_option_df(option_type="CE", strike=22500, expiry_date="2025-05-08")
+    @_counted
+    def get_option_df(self, option_type, strike, expiry_date, ticker: str = None, drop_duplicate_indices=True, columns=None, start=None, end=None, timeframe="1m") -> pd.DataFrame:
+        """
+        Method to read option dataframe from the database. De-duplicated reads are served from self.contract_cache (treat the returned df as read-only).
+        columns / start, end (inclusive) restrict the result. A contract that is not cached yet is then read with column projection and
+        row-group filtering (see read_parquet_data) and the partial frame is not cached.
+        timeframe : one of TIMEFRAME_MINUTES, bars labelled with the start of their session-aligned bin (see utils.data_utils.resample_ohlcv)
+        """
+        # Example :: self.get_option_df(option_type="CE", strike=22500, expiry_date="2025-05-08", columns=["close"], start="2025-05-02 09:15", end="2025-05-02 15:29")
 
+        ticker = ticker if ticker else self.ticker
         assert option_type in ["CE", "PE"], "Option type must be 'CE' or 'PE'"
+        assert timeframe in TIMEFRAME_MINUTES, f"timeframe must be one of {list(TIMEFRAME_MINUTES)}. Given {timeframe}"
+        contract = Contract(ticker=ticker, option_type=option_type, strike=strike, expiry=expiry_date)
+        partial = columns is not None or start is not None or end is not None
+        if timeframe != "1m":
+            assert drop_duplicate_indices, "Timeframe bars are built from de-duplicated minute data"
+            df_bars = self.contract_cache.get_or_load((contract, timeframe), lambda: self._load_contract_timeframe(contract, timeframe))
+            return self._slice_frame(df_bars, columns, start, end) if partial else df_bars
+        if not drop_duplicate_indices:  # Raw reads are rare (debugging), don't let them occupy the cache
+            return self._read_contract(contract, drop_duplicate_indices=False, columns=columns, start=start, end=end)
+        if partial and self.storage == "parquet" and self.greeks_store is None and contract not in self.contract_cache and (self.shared_data is None or contract not in self.shared_data.contracts):
+            if self.manifest is not None:
+                assert contract in self.manifest, f"File not found (not in manifest): {contract}"
+            return self._read_contract(contract, columns=columns, start=start, end=end)
+
+        contract_data = self._load_contract(contract)
+        if isinstance(contract_data, CONTRACT_BUFFERS):
+            return contract_data.to_frame(columns=columns, start=start, end=end)
+        return self._slice_frame(contract_data, columns, start, end) if partial else contract_data
+
+    @_counted
+    def get_spot_df(self, timeframe: str = "1m", columns=None, start=None, end=None, ticker: str = None) -> pd.DataFrame:
+        """Spot bars of ticker (default: self.ticker, i.e. self.df_spot at 1m) at timeframe, treat the returned df as read-only"""
+        assert timeframe in TIMEFRAME_MINUTES, f"timeframe must be one of {list(TIMEFRAME_MINUTES)}. Given {timeframe}"
+        ticker = ticker if ticker else self.ticker
+        if timeframe == "1m":
+            df_bars = self._spot(ticker)
+        else:
+            key = (ticker, timeframe)
+            if key not in self._spot_timeframes:
+                spot_parquet_path = self._ticker_data(ticker).spot_parquet_path
+                df_bars = read_timeframe_data(spot_parquet_path, timeframe, self.database_path, self.timeframes_db_path) if os.path.exists(spot_parquet_path) else None
+                self._spot_timeframes[key] = df_bars if df_bars is not None else resample_ohlcv(self._spot(ticker), TIMEFRAME_MINUTES[timeframe])
+            df_bars = self._spot_timeframes[key]
+        return self._slice_frame(df_bars, columns, start, end) if (columns is not None or start is not None or end is not None) else df_bars
+
+    def iter_bars(self, contract: Contract, start=None, end=None, batch_size: int = DEFAULT_BATCH_SIZE, columns=None) -> Iterator[pd.DataFrame]:
+        """
+        Stream the bars of a contract within [start, end] (inclusive) as DataFrames of at most batch_size rows, which concatenate to
+        get_option_df(..., columns=columns, start=start, end=end). Contracts already in memory (cache or shared segment) are sliced, others are
+        streamed from storage batch by batch without being cached, so 1-second or tick data is consumed with bounded memory.
+        Greek fields are computed per batch when greeks are enabled.
+        """
+        # Example :: for df_bars in db.iter_bars(Contract("NIFTY", "CE", 22500, "2025-05-08"), start="2025-05-02 09:15", batch_size=10_000): ...
+
+        assert batch_size > 0, "batch_size must be positive"
+        if contract in self.contract_cache or (self.shared_data is not None and contract in self.shared_data.contracts):
+            df_bars = self.get_option_df(option_type=contract.option_type, strike=contract.strike, expiry_date=contract.expiry, ticker=contract.ticker,
+                                         columns=columns, start=start, end=end)
+            for i in range(0, len(df_bars), batch_size):
+                yield df_bars.iloc[i:i + batch_size]
+            return
+
+        if self.manifest is not None:
+            assert contract in self.manifest, f"File not found (not in manifest): {contract}"
+        with_greeks = self.greeks_store is not None and (columns is None or any(field in GREEK_FIELDS for field in columns))
+        source_columns = columns if columns is None else [field for field in columns if field not in GREEK_FIELDS]
+        if with_greeks and source_columns is not None and 'close' not in source_columns:    # IV is implied from the close
+            source_columns = source_columns + ['close']
+
+        if self.storage == "consolidated":
+            batches = self.consolidated_store.iter_batches(contract, batch_size, columns=source_columns, start=start, end=end)
+        else:
+            batches = iter_option_data(option_type=contract.option_type, strike=contract.strike, expiry_date=contract.expiry, db_folderpath=self.database_path,
+                                       ticker=contract.ticker, batch_size=batch_size, columns=source_columns, start=start, end=end)
+        for df_bars in batches:
+            if with_greeks:
+                df_bars = df_bars.assign(**option_greeks_frame(df_bars, self.get_spot_df(ticker=contract.ticker)['close'], contract.option_type, contract.strike,
+                                                               contract.expiry, self.greeks_store.rate))
+            yield df_bars if columns is None else df_bars[columns]
+
+    def _load_contract_timeframe(self, contract: Contract, timeframe: str) -> pd.DataFrame:
+        """Precomputed timeframe bars of a contract if they are up to date, else resampled from the (cached) minute data"""
+        source_path = os.path.join(self.database_path, "options", contract.ticker, contract.option_type, f"expiry__{contract.expiry}", f"strike__{contract.strike}.parquet")
+        if os.path.exists(source_path):
+            df_bars = read_timeframe_data(source_path, timeframe, self.database_path, self.timeframes_db_path)
+            if df_bars is not None:
+                return df_bars
+        df_option = self.get_option_df(option_type=contract.option_type, strike=contract.strike, expiry_date=contract.expiry, ticker=contract.ticker)
+        return resample_ohlcv(df_option, TIMEFRAME_MINUTES[timeframe])
+
+    @staticmethod
+    def _slice_frame(df: pd.DataFrame, columns=None, start=None, end=None) -> pd.DataFrame:
+        """In-memory equivalent of the columns / start / end pushdown of read_parquet_data (the index may be unsorted, so no .loc slicing)"""
+        mask = np.ones(len(df), dtype=bool)
+        if start is not None:
+            mask &= df.index >= pd.Timestamp(start)
+        if end is not None:
+            mask &= df.index <= pd.Timestamp(end)
+        return df.loc[mask, list(columns) if columns is not None else df.columns]
+
+    def _load_contract(self, contract: Contract) -> pd.DataFrame | ContractArrays | ContractTable:
+        """Cached per-contract data of the active storage engine (shared contracts are served from the shared segment, outside the cache)"""
+        if self.shared_data is not None:
+            contract_arrays = self.shared_data.contracts.get(contract)
+            if contract_arrays is not None:
+                return contract_arrays
+        if self.prefetcher is not None:
+            self.prefetcher.note_access(contract)
+        return self.contract_cache.get_or_load(contract, self._contract_loader(contract))
+
+    def _contract_loader(self, contract: Contract):
+        """Zero-argument callable reading a contract with the active storage engine (used on cache misses)"""
+        def loader():
+            start = time.perf_counter()
+            contract_data = self._load_from_storage(contract)
+            with self._stats_lock:
+                self._load_counters['contracts'] += 1
+                self._load_counters['seconds'] += time.perf_counter() - start
+            return contract_data
+        return loader
+
+    def _load_from_storage(self, contract: Contract) -> pd.DataFrame | ContractArrays | ContractTable:
+        if self.manifest is not None:
+            assert contract in self.manifest, f"File not found (not in manifest): {contract}"
+        if self.storage == "array":
+            contract_data = self.array_store.load(contract)
+        elif self.storage == "consolidated":
+            contract_data = self.consolidated_store.load(contract)
+        elif self.storage == "arrow":
+            contract_data = self.arrow_store.load(contract)
+        else:
+            contract_data = self._read_contract(contract)
+        if self.greeks_store is not None:
+            contract_data = self._with_greeks(contract, contract_data)
+        return contract_data
+
+    def _with_greeks(self, contract: Contract, contract_data: pd.DataFrame | ContractArrays | ContractTable) -> pd.DataFrame | ContractArrays | ContractTable:
+        """Append the IV / Greeks columns of the greeks store to freshly loaded contract data"""
+        if isinstance(contract_data, CONTRACT_BUFFERS):
+            return contract_data.with_columns(self.greeks_store.load(contract, contract_data.to_frame()))
+        return contract_data.assign(**self.greeks_store.load(contract, contract_data))
+
+    def _read_contract(self, contract: Contract, drop_duplicate_indices: bool = True, columns=None, start=None, end=None) -> pd.DataFrame:
         df_option = read_option_data(
-            option_type=option_type,
-            strike=strike,
-            expiry_date=expiry_date,
+            option_type=contract.option_type,
+            strike=contract.strike,
+            expiry_date=contract.expiry,
             db_folderpath=self.database_path,
-            ticker=ticker,
-            drop_duplicate_indices=drop_duplicate_indices
+            ticker=contract.ticker,
+            drop_duplicate_indices=drop_duplicate_indices,
+            check_exists=self.manifest is None or contract not in self.manifest,
+            columns=columns,
+            start=start,
+            end=end
         )
         return df_option
 
-    def get_ATM_strike(self, timestamp: pd.Timestamp = None, field: str = 'close') -> int:
+    def get_expiry_chain(self, expiry_date: str, ticker: str = None) -> ExpiryChain:
+        """Every strike of an expiry on one minute grid (see OptionChainStore.load), cached in self.contract_cache and sized by ExpiryChain.nbytes"""
+        ticker = ticker if ticker else self.ticker
+        return self.contract_cache.get_or_load((ticker, expiry_date, "chain"), lambda: self.chain_store.load(ticker, expiry_date))
+
+    @_counted
+    def get_chain(self, expiry_date: str, timestamp: pd.Timestamp, fields: tuple = ('close',), ticker: str = None) -> ChainSnapshot:
+        """
+        Option chain snapshot: every strike of the expiry with CE and PE [fields] at timestamp as aligned numpy arrays (NaN where there is no bar).
+        Strikes can then be picked by premium or moneyness without touching the per-strike files.
+        """
+        # Example :: chain = self.get_chain("2025-05-08", pd.Timestamp("2025-05-05 09:20:00"), fields=("close", "volume"))
+        #            short_call_strike = chain.strike_closest_to_premium("CE", 50.0)
+        ticker = ticker if ticker else self.ticker
+        return self.get_expiry_chain(expiry_date, ticker).snapshot(timestamp, tuple(fields))
+
+    def get_strikes(self, expiry_date: str, option_type: str = None, ticker: str = None) -> list[int]:
+        """Sorted strikes available for an expiry (for both CE and PE when option_type is None). Uses the manifest, else lists the directories."""
+        ticker = ticker if ticker else self.ticker
+        if self.manifest is not None:
+            return self.manifest.strikes(expiry_date, option_type=option_type, ticker=ticker)
+
+        strike_sets = []
+        for ot in ([option_type] if option_type else ["CE", "PE"]):
+            expiry_dir = os.path.join(self.database_path, "options", ticker, ot, f"expiry__{expiry_date}")
+            files = os.listdir(expiry_dir) if os.path.isdir(expiry_dir) else []
+            strike_sets.append({int(f[len("strike__"):-len(".parquet")]) for f in files if f.startswith("strike__") and f.endswith(".parquet")})
+        return sorted(set.intersection(*strike_sets))
+
+    def is_tradable(self, contract: Contract, timestamp: pd.Timestamp) -> bool:
+        """True if the contract has a bar at timestamp. Answered from the manifest when available, else by loading the contract."""
+        if self.manifest is not None:
+            return self.manifest.is_tradable(contract, timestamp)
+        try:
+            self._fill_bar(np.empty(1, dtype=BAR_DTYPE), 0, contract, timestamp)
+            return True
+        except (KeyError, AssertionError):
+            return False
+
+    def covered_day_mask(self, timestamps: pd.DatetimeIndex, ticker: str = None) -> np.ndarray:
+        """
+        Boolean mask over timestamps: True where the day has options data. Within the manifest's scanned range these are its covered days,
+        outside it (or without a manifest) coverage is unknown and every day but UNCOVERED_DAYS_WITHOUT_MANIFEST counts as covered.
+        """
+        ticker = ticker if ticker else self.ticker
+        days = pd.DatetimeIndex(timestamps).normalize()
+        covered = ~np.asarray(days.isin(pd.DatetimeIndex(sorted(UNCOVERED_DAYS_WITHOUT_MANIFEST))))
+        scanned_range = self.manifest.scanned_range(ticker) if self.manifest is not None else None
+        if scanned_range is not None:
+            scanned = np.asarray((days >= pd.Timestamp(scanned_range[0])) & (days <= pd.Timestamp(scanned_range[1])))
+            covered = np.where(scanned, np.asarray(days.isin(pd.DatetimeIndex(sorted(self.manifest.covered_days(ticker))))), covered)
+        return covered
+
+    def enable_prefetch(self, max_workers: int = 4, strike_radius: int = 5, max_bytes: int | None = None, ticker: str = None) -> ContractPrefetcher:
+        """
+        Start a background prefetcher. BackTester.run then warms, while day D is simulated, the contracts within +/- strike_radius
+        strikes of day D+1's opening ATM strike (closest expiry). max_bytes bounds what is prefetched per day (default: half the cache budget).
+        """
+        self.disable_prefetch()
+        self.prefetcher = ContractPrefetcher(self, max_workers=max_workers, strike_radius=strike_radius, max_bytes=max_bytes, ticker=ticker if ticker else self.ticker)
+        return self.prefetcher
 
-        timestamp = self.df_spot.index[-1] if timestamp is None else timestamp
+    def disable_prefetch(self, wait: bool = True):
+        """Cancel queued prefetches and stop the prefetch threads"""
+        if self.prefetcher is not None:
+            self.prefetcher.shutdown(wait=wait)
+            self.prefetcher = None
 
-        spot_price = float(self.df_spot.loc[timestamp][field])
-        strike_step = 50
-        floor_price = (spot_price // strike_step) * strike_step
-        ceil_price  = floor_price + strike_step
-        closest_strike =  floor_price if abs(spot_price - floor_price) <= abs(ceil_price - spot_price) else ceil_price
+    def clear_cache(self):
+        """Drop every cached option dataframe and expiry chain (e.g. between independent backtests sharing a connector)."""
+        self.contract_cache.clear()
 
-        return int(closest_strike)
+    def share_data(self, contracts=(), tickers: list[str] = None, name: str = None) -> SharedMarketData:
+        """
+        Pack the spot of tickers (default: self.ticker) and the given contracts into a shared memory segment for worker processes,
+        which attach with DBConnector(shared_data=<returned>.name, ...). Close it (or use it as a context manager) once the workers are done.
+        """
+        return SharedMarketData.create(self, contracts, tickers=tickers, name=name)
 
-    def get_option_price(self, strike, option_type, expiry_date, timestamp=None, field='close', ticker="NIFTY", drop_duplicate_indices=True) -> float:
+    def stats(self) -> dict:
+        """
+        Snapshot of the data-access counters since the connector was created or reset_stats() was called:
+        - lookups  : calls and seconds per accessor (inclusive, e.g. get_option_price also counts the get_option_df it makes)
+        - loads    : contracts read from storage on cache misses and the time spent
+        - io       : files opened, bytes and rows read, duplicate rows dropped, read seconds (utils.data_utils.IO_STATS, process-wide)
+        - cache    : cache_info(), prefetch : prefetcher stats (None without enable_prefetch)
+        """
+        io = IO_STATS.snapshot()
+        with self._stats_lock:
+            lookups = {name: dict(counters) for name, counters in sorted(self._lookup_counters.items())}
+            loads = dict(self._load_counters)
+        return {
+            'storage': self.storage,
+            'lookups': lookups,
+            'loads': loads,
+            'io': {counter: io[counter] - self._io_baseline[counter] for counter in io},
+            'cache': self.cache_info(),
+            'prefetch': self.prefetcher.stats() if self.prefetcher is not None else None,
+        }
+
+    def reset_stats(self):
+        """Start a new stats() window (e.g. per backtest run). Cached data is kept."""
+        with self._stats_lock:
+            self._lookup_counters.clear()
+            self._load_counters.update(contracts=0, seconds=0.0)
+            self._io_baseline = IO_STATS.snapshot()
+        self.contract_cache.reset_counters()
+
+    def cache_info(self) -> dict:
+        """Hit/miss/eviction counters and memory usage of the contract cache ('by_ticker' splits them per underlying)."""
+        return self.contract_cache.info()
+
+    @_counted
+    def get_ATM_strike(self, timestamp: pd.Timestamp = None, field: str = 'close', ticker: str = None) -> int:
+
+        ticker = ticker if ticker else self.ticker
+        timestamp = self._spot(ticker).index[-1] if timestamp is None else timestamp
+        return int(self.atm_strikes(field=field, ticker=ticker).at[timestamp])    # Read from the precomputed series instead of re-deriving
+
+    @_counted
+    def atm_strikes(self, timestamps: pd.DatetimeIndex = None, field: str = 'close', ticker: str = None) -> pd.Series:
+        '''
+        ATM strike for every row of the ticker's spot (computed once per (ticker, field) in a single numpy pass and cached on the connector).
+        If timestamps is given, return the strikes at those timestamps only (KeyError if any timestamp is missing from the spot).
+        '''
+        ticker = ticker if ticker else self.ticker
+        key = (ticker, field)
+        if key not in self._atm_strike_series:
+            assert ticker in self.strike_steps, f"No strike step configured for {ticker}. Pass strike_steps={{'{ticker}': <step>}}"
+            strike_step = self.strike_steps[ticker]
+            df_spot = self._spot(ticker)
+            spot_price = df_spot[field].to_numpy(dtype=np.float64)
+            floor_price = (spot_price // strike_step) * strike_step
+            ceil_price = floor_price + strike_step
+            closest_strike = np.where(np.abs(spot_price - floor_price) <= np.abs(ceil_price - spot_price), floor_price, ceil_price)
+            series = pd.Series(closest_strike, index=df_spot.index, name=f"atm_strike_{field}")
+            self._atm_strike_series[key] = series.astype("Int64" if series.isna().any() else "int64")
+
+        series = self._atm_strike_series[key]
+        if timestamps is None:
+            return series
+        return series.loc[timestamps]
+
+    @_counted
+    def get_option_price(self, strike, option_type, expiry_date, timestamp=None, field='close', ticker: str = None, drop_duplicate_indices=True) -> float:
         '''This method should return the option price [field] at a specific timestamp'''
         # Example  ::  self.get_option_price(strike=22500, option_type="CE", expiry_date="2025-05-08", timestamp=pd.Timestamp("2025-05-08 9:15:00")) 
         
+        ticker = ticker if ticker else self.ticker
+        timestamp = pd.Timestamp(f"{expiry_date} 9:15:00") if timestamp is None else timestamp
+        if drop_duplicate_indices and (self.storage in BUFFER_ENGINES or self.shared_data is not None):
+            contract_data = self._load_contract(Contract(ticker=ticker, option_type=option_type, strike=strike, expiry=expiry_date))
+            if isinstance(contract_data, CONTRACT_BUFFERS):
+                return contract_data.get(timestamp, field)
+
         df_option = self.get_option_df(
             option_type=option_type,
             strike=strike,
@@ -49,28 +493,124 @@ class DBConnector:
             drop_duplicate_indices=drop_duplicate_indices
         )
 
-        timestamp = pd.Timestamp(f"{expiry_date} 9:15:00") if timestamp is None else timestamp
         price = float(df_option.loc[timestamp][field])
 
 
         return price
 
-    def get_expiries(self, timestamp: pd.Timestamp) -> list[str]:
-        # read expiries
-        with open(self.expiries_json_path, 'r') as f:
+    @_counted
+    def get_option_bar(self, contract: Contract, timestamp: pd.Timestamp) -> np.void:
+        '''Return all OHLCV fields of a contract at timestamp as a BAR_DTYPE record (bar['close'], bar['high'], ...) using a single index lookup'''
+        # Example  ::  self.get_option_bar(Contract("NIFTY", "CE", 22500, "2025-05-08"), pd.Timestamp("2025-05-08 9:25:00"))['close']
+
+        bars = np.empty(1, dtype=BAR_DTYPE)
+        self._fill_bar(bars, 0, contract, timestamp)
+        return bars[0]
+
+    @_counted
+    def get_option_bars(self, contracts: list[Contract], timestamp: pd.Timestamp) -> np.ndarray:
+        '''Return a BAR_DTYPE array with one OHLCV record per contract (same order as contracts) at timestamp'''
+        bars = np.empty(len(contracts), dtype=BAR_DTYPE)
+        for i, contract in enumerate(contracts):
+            self._fill_bar(bars, i, contract, timestamp)
+        return bars
+
+    @_counted
+    def get_prices(self, contracts: list[Contract], timestamps, field: str = 'close', fill_missing: bool = False) -> np.ndarray:
+        '''
+        Gather [field] of many contracts at many timestamps in one call: float64 array of shape (len(contracts), len(timestamps)).
+        Missing bars raise KeyError (like .loc) unless fill_missing=True, in which case they are NaN.
+        '''
+        # Example  ::  self.get_prices([Contract("NIFTY", "CE", 22500, "2025-05-08"), Contract("NIFTY", "PE", 22500, "2025-05-08")], [pd.Timestamp("2025-05-08 9:25:00")])
+
+        timestamps = pd.DatetimeIndex(timestamps)
+        prices = np.full((len(contracts), len(timestamps)), np.nan, dtype=np.float64)
+        for i, contract in enumerate(contracts):
+            (prices[i],), found = self._gather(contract, timestamps, (field,))
+            if not fill_missing and not found.all():
+                raise KeyError(f"{contract} has no bar at {list(timestamps[~found][:5])}")
+        return prices
+
+    @_counted
+    def get_bar_fields(self, contract: Contract, timestamps, fields: tuple = ('high', 'low')) -> tuple[np.ndarray, np.ndarray]:
+        '''
+        fields of one contract at many timestamps: (float64 array of shape (len(fields), len(timestamps)), bool array, True where the bar exists).
+        Missing bars are NaN, the mask tells them apart from bars whose values are NaN. Values are the ones get_option_bar() returns.
+        '''
+        return self._gather(contract, pd.DatetimeIndex(timestamps), fields)
+
+    def _gather(self, contract: Contract, timestamps: pd.DatetimeIndex, fields: tuple) -> tuple[np.ndarray, np.ndarray]:
+        contract_data = self._load_contract(contract)
+        if isinstance(contract_data, CONTRACT_BUFFERS):
+            rows = contract_data.slots(timestamps)
+            columns = [contract_data.values[:, contract_data.column_idx(field)] for field in fields]
+        else:
+            rows = contract_data.index.get_indexer(timestamps)
+            columns = [contract_data[field].to_numpy(dtype=np.float64) for field in fields]
+        found = rows >= 0
+        values = np.full((len(fields), len(timestamps)), np.nan, dtype=np.float64)
+        for j, column in enumerate(columns):
+            values[j, found] = column[rows[found]]
+        return values, found
+
+    def _fill_bar(self, bars: np.ndarray, i: int, contract: Contract, timestamp: pd.Timestamp):
+        contract_arrays = self._load_contract(contract) if self.storage in BUFFER_ENGINES or self.shared_data is not None else None
+        if isinstance(contract_arrays, CONTRACT_BUFFERS):
+            row = contract_arrays.row(timestamp)    # KeyError if timestamp is missing, same as .loc
+            for field in BAR_FIELDS:
+                bars[field][i] = row[contract_arrays.columns.index(field)] if field in contract_arrays.columns else np.nan
+            return
+
+        df_option = self.get_option_df(option_type=contract.option_type, strike=contract.strike, expiry_date=contract.expiry, ticker=contract.ticker)
+        row = df_option.index.get_loc(timestamp)    # KeyError if timestamp is missing, same as .loc
+        for field in BAR_FIELDS:
+            bars[field][i] = df_option[field].iat[row] if field in df_option.columns else np.nan
+
+    def _load_expiry_calendar(self, ticker: str = None) -> TickerData:
+        """Read the ticker's expiries json once into a sorted datetime64[D] array (expiry_days) with the original strings alongside"""
+        ticker = ticker if ticker else self.ticker
+        ticker_data = self._ticker_data(ticker)
+        if ticker_data.expiry_days is not None:
+            return ticker_data
+        with open(ticker_data.expiries_json_path, 'r') as f:
             all_expiries = json.load(f)
 
+        expiry_days = np.array([np.datetime64(pd.Timestamp(exp).date(), 'D') for exp in all_expiries], dtype='datetime64[D]')
+        order = np.argsort(expiry_days, kind='stable')
+        ticker_data.expiry_strs = [all_expiries[i] for i in order]
+        ticker_data.expiry_days = expiry_days[order]
+        return ticker_data
+
+    def get_expiries(self, timestamp: pd.Timestamp, ticker: str = None) -> list[str]:
+        ticker = ticker if ticker else self.ticker
+        calendar = self._load_expiry_calendar(ticker)
+
         # Compare only dates so that same-day expiries are also included
-        ts_date = timestamp.normalize()
-        all_expiries = [exp for exp in all_expiries if pd.Timestamp(exp) >= ts_date]
-        all_expiries.sort()
-        
-        return all_expiries
+        first = int(np.searchsorted(calendar.expiry_days, np.datetime64(timestamp.date(), 'D'), side='left'))
+        return calendar.expiry_strs[first:]
+
+    @_counted
+    def get_closest_expiry(self, timestamp: pd.Timestamp, ticker: str = None) -> str:
+        ticker = ticker if ticker else self.ticker
+        calendar = self._load_expiry_calendar(ticker)
+
+        day = np.datetime64(timestamp.date(), 'D')
+        if day not in calendar.closest_expiry_by_day:
+            first = int(np.searchsorted(calendar.expiry_days, day, side='left'))
+            calendar.closest_expiry_by_day[day] = calendar.expiry_strs[first] if first < len(calendar.expiry_strs) else None
+        return calendar.closest_expiry_by_day[day]
 
-    def get_closest_expiry(self, timestamp: pd.Timestamp) -> str:
-        all_expiries = self.get_expiries(timestamp)
-        return all_expiries[0] if all_expiries else None
+    def closest_expiry_for(self, timestamps: pd.DatetimeIndex, ticker: str = None) -> np.ndarray:
+        """Vectorised get_closest_expiry: closest expiry (str, None if past the last expiry) for every timestamp, aligned with timestamps"""
+        ticker = ticker if ticker else self.ticker
+        calendar = self._load_expiry_calendar(ticker)
 
+        days, inverse = np.unique(pd.DatetimeIndex(timestamps).values.astype('datetime64[D]'), return_inverse=True)
+        firsts = np.searchsorted(calendar.expiry_days, days, side='left')
+        expiry_strs = np.array(calendar.expiry_strs + [None], dtype=object)    # index len(expiry_strs) --> None
+        closest = expiry_strs[firsts]
+        calendar.closest_expiry_by_day.update(zip(days, closest))
+        return closest[inverse]
 
 if __name__ == "__main__":
 
@@ -0,0 +1,86 @@
+import os
+import json
+from pathlib import Path
+from typing import Callable
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+from connectors.contract import Contract
+from utils.data_utils import read_option_data, read_parquet_data
+from utils.black_scholes import option_greeks_frame, GREEK_FIELDS
+
+GREEKS_STORE_VERSION = 1
+GREEKS_METADATA_KEY = b"optilab.greeks"
+
+
+class GreeksStore:
+    '''
+    Implied volatility and Greeks (GREEK_FIELDS) of option contracts, computed with utils/black_scholes.py from the contract's close and spot.
+    Results are persisted next to the options tree, in <greeks_root>/options/<ticker>/<CE|PE>/expiry__<expiry>/strike__<strike>.parquet,
+    and recomputed when the source parquet file (size or mtime) or the risk-free rate changes.
+spot_close(ticker) returns the spot close series of the contract's underlying.
+    '''
+    def __init__(self, database_path: str | Path, greeks_root: str | Path | None, spot_close: Callable[[str], pd.Series], rate: float, persist: bool = True):
+        self.database_path = Path(database_path)
+        self.greeks_root = Path(greeks_root) if greeks_root else self.database_path / "greeks"
+        self.spot_close = spot_close
+        self.rate = rate
+        self.persist = persist
+
+    def _source_path(self, contract: Contract) -> Path:
+        return self.database_path / "options" / contract.ticker / contract.option_type / f"expiry__{contract.expiry}" / f"strike__{contract.strike}.parquet"
+
+    def _greeks_path(self, contract: Contract) -> Path:
+        return self.greeks_root / "options" / contract.ticker / contract.option_type / f"expiry__{contract.expiry}" / f"strike__{contract.strike}.parquet"
+
+    def _signature(self, contract: Contract) -> dict:
+        source_path = self._source_path(contract)
+        stat = source_path.stat() if source_path.exists() else None
+        return {
+            'version': GREEKS_STORE_VERSION,
+            'rate': self.rate,
+            'source_size': stat.st_size if stat else None,
+            'source_mtime_ns': stat.st_mtime_ns if stat else None,
+        }
+
+    def load(self, contract: Contract, df_option: pd.DataFrame) -> pd.DataFrame:
+        '''GREEK_FIELDS aligned with df_option (the de-duplicated contract dataframe), read from disk if up to date, else computed (and persisted)'''
+        greeks_path = self._greeks_path(contract)
+        signature = self._signature(contract)
+        if greeks_path.exists():
+            metadata = pq.read_schema(greeks_path).metadata or {}
+            if GREEKS_METADATA_KEY in metadata and json.loads(metadata[GREEKS_METADATA_KEY]) == signature:
+                df_greeks = read_parquet_data(greeks_path, drop_duplicate_indices=False)
+                if len(df_greeks) == len(df_option):
+                    return df_greeks.reindex(df_option.index)
+
+        df_greeks = option_greeks_frame(df_option, self.spot_close(contract.ticker), contract.option_type, contract.strike, contract.expiry, self.rate)
+        if self.persist:
+            greeks_path.parent.mkdir(parents=True, exist_ok=True)
+            table = pa.Table.from_pandas(df_greeks, preserve_index=True)
+            table = table.replace_schema_metadata({**(table.schema.metadata or {}), GREEKS_METADATA_KEY: json.dumps(signature).encode("utf-8")})
+            tmp_path = greeks_path.with_name(greeks_path.name + ".tmp")
+            pq.write_table(table, tmp_path, compression='zstd')
+            os.replace(tmp_path, greeks_path)
+        return df_greeks
+
+    def materialise_all(self, ticker: str = "NIFTY") -> int:
+        '''Compute (or refresh) the Greeks of every contract of a ticker. Returns the number of contracts processed.'''
+        count = 0
+        for option_type in ("CE", "PE"):
+            for strike_path in sorted((self.database_path / "options" / ticker / option_type).glob("expiry__*/strike__*.parquet")):
+                contract = Contract(ticker=ticker, option_type=option_type, strike=int(strike_path.stem.split("__", 1)[1]), expiry=strike_path.parent.name.split("__", 1)[1])
+                df_option = read_option_data(option_type=option_type, strike=contract.strike, expiry_date=contract.expiry, db_folderpath=self.database_path, ticker=ticker)
+                self.load(contract, df_option)
+                count += 1
+        return count
+
+
+if __name__ == "__main__":
+
+    # Precompute the Greeks of the whole NIFTY options tree once (later runs only refresh contracts whose files changed)
+    # Run from the project root :: python -m connectors.greeks_store
+    from constants import GLOBAL_DB_FOLDERPATH, GREEKS_DB_FOLDERPATH, NIFTY_PARQUET_PATH, RISK_FREE_RATE
+    spot_close = read_parquet_data(NIFTY_PARQUET_PATH)['close']
+    store = GreeksStore(GLOBAL_DB_FOLDERPATH, GREEKS_DB_FOLDERPATH, spot_close=lambda ticker: spot_close, rate=RISK_FREE_RATE)
+    print(f"Computed {GREEK_FIELDS} for {store.materialise_all('NIFTY')} contracts into {store.greeks_root}")
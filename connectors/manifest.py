@@ -0,0 +1,218 @@
+import os
+import json
+import argparse
+import warnings
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+import numpy as np
+import pandas as pd
+from constants import GLOBAL_DB_FOLDERPATH, MANIFEST_JSON_PATH, NSE_SESSION_OPEN, NSE_SESSION_MINUTES
+from connectors.contract import Contract
+
+MANIFEST_VERSION = 2    # 2: entries record the file's mtime_ns, so that a manifest older than the tree is detected
+NS_PER_MINUTE = 60 * 10**9
+NS_PER_DAY = 24 * 60 * NS_PER_MINUTE
+SESSION_OPEN_MINUTE = int(pd.Timestamp(NSE_SESSION_OPEN).hour * 60 + pd.Timestamp(NSE_SESSION_OPEN).minute)
+
+
+def contract_key(contract: Contract) -> str:
+    return f"{contract.ticker}/{contract.option_type}/{contract.expiry}/{contract.strike}"
+
+
+def _ns_to_iso(ns: int) -> str:
+    return pd.Timestamp(int(ns)).isoformat()
+
+
+def source_signatures(database_path: str | Path) -> dict:
+    '''contract key --> [file size, mtime_ns] of every option parquet file of the tree (one os.scandir per expiry directory, no file is opened)'''
+    signatures = {}
+    options_path = Path(database_path) / "options"
+    for ticker_dir in (d for d in os.scandir(options_path) if d.is_dir()) if options_path.is_dir() else ():
+        for option_type_dir in (d for d in os.scandir(ticker_dir.path) if d.is_dir()):
+            for expiry_dir in (d for d in os.scandir(option_type_dir.path) if d.is_dir() and d.name.startswith("expiry__")):
+                expiry = expiry_dir.name.split("__", 1)[1]
+                for entry in os.scandir(expiry_dir.path):
+                    if entry.name.startswith("strike__") and entry.name.endswith(".parquet"):
+                        stat = entry.stat()
+                        strike = int(entry.name[len("strike__"):-len(".parquet")])
+                        signatures[f"{ticker_dir.name}/{option_type_dir.name}/{expiry}/{strike}"] = [stat.st_size, stat.st_mtime_ns]
+    return signatures
+
+
+def scan_contract_file(file_path: str) -> dict:
+    '''
+    Coverage statistics of one option parquet file (only the index is read).
+    gaps are [first_missing, last_missing] minute ranges inside the sessions (09:15-15:29) of the days the contract has data for.
+    '''
+    _, ticker, option_type, expiry_dir, strike_file = Path(file_path).parts[-5:]
+    stat = os.stat(file_path)     # Before reading: a file rewritten during the scan then shows up as stale
+    index = pd.read_parquet(file_path, columns=[]).index
+    ns = pd.DatetimeIndex(index).as_unit("ns").asi8
+    unique_ns = np.unique(ns)
+
+    days = unique_ns // NS_PER_DAY
+    minutes = (unique_ns % NS_PER_DAY) // NS_PER_MINUTE - SESSION_OPEN_MINUTE
+    in_session = (unique_ns % NS_PER_MINUTE == 0) & (minutes >= 0) & (minutes < NSE_SESSION_MINUTES)
+    session_days = np.unique(days)
+
+    # Missing minutes: every grid slot of every day present in the file that has no bar
+    present = np.zeros(len(session_days) * NSE_SESSION_MINUTES, dtype=bool)
+    present[np.searchsorted(session_days, days[in_session]) * NSE_SESSION_MINUTES + minutes[in_session]] = True
+    missing_slots = np.flatnonzero(~present)
+    gaps = []
+    if len(missing_slots):
+        starts = np.r_[True, (np.diff(missing_slots) != 1) | (missing_slots[1:] % NSE_SESSION_MINUTES == 0)]   # New gap on a jump or a new day
+        ends = np.r_[starts[1:], True]
+        slot_ns = session_days[missing_slots // NSE_SESSION_MINUTES] * NS_PER_DAY + (missing_slots % NSE_SESSION_MINUTES + SESSION_OPEN_MINUTE) * NS_PER_MINUTE
+        gaps = [[_ns_to_iso(s), _ns_to_iso(e)] for s, e in zip(slot_ns[starts], slot_ns[ends])]
+
+    return {
+        'ticker': ticker,
+        'option_type': option_type,
+        'expiry': expiry_dir.split("__", 1)[1],
+        'strike': int(Path(strike_file).stem.split("__", 1)[1]),
+        'file_size': stat.st_size,
+        'mtime_ns': stat.st_mtime_ns,
+        'rows': int(len(ns)),
+        'duplicates': int(len(ns) - len(unique_ns)),
+        'first': _ns_to_iso(unique_ns[0]) if len(unique_ns) else None,
+        'last': _ns_to_iso(unique_ns[-1]) if len(unique_ns) else None,
+        'days': [str(d) for d in session_days.astype("datetime64[D]")],
+        'missing_minutes': int(len(missing_slots)),
+        'gaps': gaps,
+    }
+
+
+def build_manifest(database_path: str | Path = GLOBAL_DB_FOLDERPATH, manifest_path: str | Path = None, max_workers: int = None) -> dict:
+    '''Scan database/options/<ticker>/<CE|PE>/expiry__*/strike__*.parquet in parallel and write the manifest json'''
+    database_path = Path(database_path)
+    manifest_path = Path(manifest_path) if manifest_path else database_path / "manifest.json"
+    file_paths = sorted(str(p) for p in (database_path / "options").glob("*/*/expiry__*/strike__*.parquet"))
+
+    with ProcessPoolExecutor(max_workers=max_workers) as executor:
+        entries = list(executor.map(scan_contract_file, file_paths, chunksize=32))
+
+    tickers = {}
+    for entry in entries:
+        tickers.setdefault(entry['ticker'], set()).update(entry['days'])
+
+    manifest = {
+        'version': MANIFEST_VERSION,
+        'built_at': pd.Timestamp.now().isoformat(),
+        'session': {'open': NSE_SESSION_OPEN, 'minutes': NSE_SESSION_MINUTES},
+        'tickers': {ticker: {'covered_days': sorted(days)} for ticker, days in tickers.items()},
+        'contracts': {f"{e['ticker']}/{e['option_type']}/{e['expiry']}/{e['strike']}": e for e in entries},
+    }
+    tmp_path = manifest_path.with_name(manifest_path.name + ".tmp")
+    with open(tmp_path, "w") as f:
+        json.dump(manifest, f)
+    os.replace(tmp_path, manifest_path)
+    return manifest
+
+
+class DatabaseManifest:
+    '''
+    Read side of the manifest built by build_manifest(). Loaded once by DBConnector (through load_current, so an outdated manifest is never used)
+    for existence checks (no os.path.exists per read), strike-ladder discovery and tradable-timestamp / covered-day queries.
+    '''
+    def __init__(self, manifest: dict):
+        assert manifest.get('version') == MANIFEST_VERSION, f"Unsupported manifest version {manifest.get('version')}, rebuild it with python -m connectors.manifest"
+        self.manifest = manifest
+        self.contracts = manifest['contracts']
+        self._covered_days = {ticker: set(info['covered_days']) for ticker, info in manifest['tickers'].items()}
+        self._strike_ladders = {}   # (ticker, expiry, option_type) --> sorted strikes
+        for entry in self.contracts.values():
+            self._strike_ladders.setdefault((entry['ticker'], entry['expiry'], entry['option_type']), []).append(entry['strike'])
+        for strikes in self._strike_ladders.values():
+            strikes.sort()
+        self._coverage = {}         # contract key --> (set of days, gap start ns array, gap end ns array), built on first query
+
+    @classmethod
+    def load(cls, manifest_path: str | Path = MANIFEST_JSON_PATH) -> "DatabaseManifest":
+        with open(manifest_path, "r") as f:
+            return cls(json.load(f))
+
+    @classmethod
+    def load_current(cls, manifest_path: str | Path, database_path: str | Path) -> "DatabaseManifest | None":
+        '''
+        The manifest at manifest_path if it still describes the options tree of database_path, else None: missing, built by another
+        MANIFEST_VERSION, or a parquet file was added, removed or changed (size or mtime) since it was built. An unusable manifest is
+        reported with a warning, callers then answer from the filesystem.
+        '''
+        if not os.path.exists(manifest_path):
+            return None
+        with open(manifest_path, "r") as f:
+            manifest = json.load(f)
+        if manifest.get('version') != MANIFEST_VERSION:
+            warnings.warn(f"Ignoring {manifest_path}: manifest version {manifest.get('version')} != {MANIFEST_VERSION}, rebuild it with python -m connectors.manifest")
+            return None
+        manifest = cls(manifest)
+        stale = manifest.stale_contracts(database_path)
+        if stale:
+            warnings.warn(f"Ignoring {manifest_path}: {len(stale)} option files changed since it was built (e.g. {stale[:3]}), rebuild it with python -m connectors.manifest")
+            return None
+        return manifest
+
+    def stale_contracts(self, database_path: str | Path) -> list[str]:
+        '''Keys of the contracts whose parquet file was added, removed or changed (size or mtime) since the manifest was built'''
+        current = source_signatures(database_path)
+        recorded = {key: [entry['file_size'], entry['mtime_ns']] for key, entry in self.contracts.items()}
+        return sorted(key for key in current.keys() | recorded.keys() if current.get(key) != recorded.get(key))
+
+    def __contains__(self, contract: Contract) -> bool:
+        return contract_key(contract) in self.contracts
+
+    def entry(self, contract: Contract) -> dict | None:
+        return self.contracts.get(contract_key(contract))
+
+    def strikes(self, expiry: str, option_type: str = None, ticker: str = "NIFTY") -> list[int]:
+        '''Sorted strikes listed for an expiry (strikes present for both CE and PE if option_type is None)'''
+        if option_type is not None:
+            return list(self._strike_ladders.get((ticker, expiry, option_type), []))
+        ce = set(self._strike_ladders.get((ticker, expiry, "CE"), []))
+        return sorted(ce.intersection(self._strike_ladders.get((ticker, expiry, "PE"), [])))
+
+    def expiries(self, ticker: str = "NIFTY") -> list[str]:
+        return sorted({expiry for (t, expiry, _) in self._strike_ladders if t == ticker})
+
+    def covered_days(self, ticker: str = "NIFTY") -> set[str]:
+        '''Days ('YYYY-MM-DD') on which at least one contract of the ticker has data'''
+        return self._covered_days.get(ticker, set())
+
+    def scanned_range(self, ticker: str = "NIFTY") -> tuple[str, str] | None:
+        '''(first, last) covered day of the ticker: the manifest only knows which days are uncovered between the two, None if it has no data for it'''
+        days = self.covered_days(ticker)
+        return (min(days), max(days)) if days else None
+
+    def is_covered_day(self, day: pd.Timestamp, ticker: str = "NIFTY") -> bool:
+        return str(pd.Timestamp(day).date()) in self.covered_days(ticker)
+
+    def is_tradable(self, contract: Contract, timestamp: pd.Timestamp) -> bool:
+        '''True if the contract has a bar at timestamp (session minutes only)'''
+        key = contract_key(contract)
+        entry = self.contracts.get(key)
+        if entry is None:
+            return False
+        if key not in self._coverage:
+            gaps = np.array([[pd.Timestamp(s).value, pd.Timestamp(e).value] for s, e in entry['gaps']], dtype=np.int64).reshape(-1, 2)
+            self._coverage[key] = (set(entry['days']), gaps[:, 0], gaps[:, 1])
+        days, gap_starts, gap_ends = self._coverage[key]
+
+        timestamp = pd.Timestamp(timestamp)
+        minute = timestamp.hour * 60 + timestamp.minute - SESSION_OPEN_MINUTE
+        if str(timestamp.date()) not in days or timestamp.second or timestamp.microsecond or not (0 <= minute < NSE_SESSION_MINUTES):
+            return False
+        i = int(np.searchsorted(gap_starts, timestamp.value, side='right')) - 1     # Last gap starting at or before timestamp
+        return not (i >= 0 and timestamp.value <= gap_ends[i])
+
+
+if __name__ == "__main__":
+    '''Build the manifest :: python -m connectors.manifest [--database_path ./database]'''
+    parser = argparse.ArgumentParser(description="Scan the options tree and write the coverage manifest")
+    parser.add_argument("--database_path", type=str, default=str(GLOBAL_DB_FOLDERPATH), help="Root of the database tree (contains options/)")
+    parser.add_argument("--manifest_path", type=str, default=None, help="Output json (default: <database_path>/manifest.json)")
+    parser.add_argument("--max_workers", type=int, default=None, help="Scanner processes (default: number of CPUs)")
+    args = parser.parse_args()
+
+    manifest = build_manifest(args.database_path, args.manifest_path, args.max_workers)
+    print(f"Manifest: {len(manifest['contracts'])} contracts, " + ", ".join(f"{t}: {len(i['covered_days'])} covered days" for t, i in manifest['tickers'].items()))
@@ -0,0 +1,277 @@
+import os
+import json
+from dataclasses import dataclass
+from pathlib import Path
+import numpy as np
+import pandas as pd
+import pyarrow.parquet as pq
+from utils.data_utils import read_option_data, consolidated_expiry_path, consolidated_index_column, consolidated_index_name, consolidated_column_types, consolidated_table_to_frame, CONSOLIDATED_METADATA_KEY
+
+NS_PER_MINUTE = 60 * 10**9
+NS_PER_DAY = 24 * 60 * NS_PER_MINUTE
+OPTION_TYPES = ("CE", "PE")
+CHAIN_STORE_VERSION = 1
+
+
+@dataclass
+class ChainSnapshot:
+    '''
+    Every listed strike of one expiry at one timestamp. ce[field] / pe[field] are float64 arrays aligned with strikes,
+    NaN where the strike has no bar at timestamp (valid is False there).
+    '''
+    ticker: str
+    expiry: str
+    timestamp: pd.Timestamp
+    strikes: np.ndarray         # int64, ascending
+    ce: dict
+    pe: dict
+    ce_valid: np.ndarray
+    pe_valid: np.ndarray
+
+    def side(self, option_type: str) -> tuple[dict, np.ndarray]:
+        assert option_type in OPTION_TYPES, "Option type must be 'CE' or 'PE'"
+        return (self.ce, self.ce_valid) if option_type == "CE" else (self.pe, self.pe_valid)
+
+    def strike_closest_to_premium(self, option_type: str, premium: float, field: str = 'close') -> int:
+        '''Strike whose [field] price is closest to premium (ties --> lower strike). Raises KeyError if no strike has a bar.'''
+        prices, valid = self.side(option_type)
+        distance = np.where(valid, np.abs(prices[field] - premium), np.inf)
+        if not np.isfinite(distance).any():
+            raise KeyError(f"No {option_type} bar for expiry {self.expiry} at {self.timestamp}")
+        return int(self.strikes[np.argmin(distance)])
+
+    def strike_closest_to_moneyness(self, option_type: str, spot: float, moneyness: float = 1.0) -> int:
+        '''Quoted strike closest to spot * moneyness (moneyness=1.0 --> ATM, 1.02 --> 2% above spot). Raises KeyError if no strike has a bar.'''
+        _, valid = self.side(option_type)
+        if not valid.any():
+            raise KeyError(f"No {option_type} bar for expiry {self.expiry} at {self.timestamp}")
+        distance = np.where(valid, np.abs(self.strikes - spot * moneyness), np.inf)
+        return int(self.strikes[np.argmin(distance)])
+
+
+@dataclass
+class ExpiryChain:
+    '''
+    Every contract of one (ticker, expiry) on a shared dense minute grid:
+    values[slot, k, s, j] is column j of OPTION_TYPES[k] at strikes[s], slot = day_idx * minutes_per_day + (minute_of_day - start_minute)
+    so a chain snapshot is the contiguous block values[slot] (one read instead of one parquet open per strike).
+    '''
+    ticker: str
+    expiry: str
+    strikes: np.ndarray         # int64, ascending (union of the CE and PE strikes)
+    days: np.ndarray            # int64 days since epoch of every session in the grid, ascending
+    start_minute: int
+    minutes_per_day: int
+    columns: tuple
+    values: np.ndarray          # float64 (n_slots, 2, n_strikes, n_columns), NaN where there is no bar
+    valid: np.ndarray           # bool (n_slots, 2, n_strikes)
+
+    @property
+    def nbytes(self) -> int:
+        return int(self.values.nbytes + self.valid.nbytes)
+
+    def slot(self, timestamp: pd.Timestamp) -> int:
+        '''Row of timestamp in values, -1 if the timestamp is outside the grid'''
+        ns = pd.Timestamp(timestamp).as_unit("ns").value
+        day, ns_of_day = divmod(ns, NS_PER_DAY)
+        minute, remainder = divmod(ns_of_day, NS_PER_MINUTE)
+        minute -= self.start_minute
+        day_idx = int(np.searchsorted(self.days, day))
+        if remainder or not (0 <= minute < self.minutes_per_day) or day_idx == len(self.days) or self.days[day_idx] != day:
+            return -1
+        return day_idx * self.minutes_per_day + minute
+
+    def snapshot(self, timestamp: pd.Timestamp, fields: tuple = ('close',)) -> ChainSnapshot:
+        '''All strikes at timestamp (everything invalid if timestamp is outside the grid)'''
+        column_idx = [self.columns.index(field) for field in fields]
+        slot = self.slot(timestamp)
+        if slot >= 0:
+            block, valid = np.asarray(self.values[slot][:, :, column_idx]), np.asarray(self.valid[slot])
+        else:
+            block = np.full((len(OPTION_TYPES), len(self.strikes), len(fields)), np.nan)
+            valid = np.zeros((len(OPTION_TYPES), len(self.strikes)), dtype=bool)
+        return ChainSnapshot(
+            ticker=self.ticker,
+            expiry=self.expiry,
+            timestamp=pd.Timestamp(timestamp),
+            strikes=self.strikes,
+            ce={field: block[0, :, j] for j, field in enumerate(fields)},
+            pe={field: block[1, :, j] for j, field in enumerate(fields)},
+            ce_valid=valid[0],
+            pe_valid=valid[1],
+        )
+
+    @classmethod
+    def from_frames(cls, ticker: str, expiry: str, frames: dict) -> "ExpiryChain":
+        '''Lay out {(option_type, strike): de-duplicated option DataFrame} on one grid. Columns are the union of the frames' (NaN for a contract without one).'''
+        assert len(frames) > 0, f"No contracts for {ticker} {expiry}"
+        columns = tuple(dict.fromkeys(str(c) for df in frames.values() for c in df.columns))
+        strikes = np.array(sorted({strike for _, strike in frames}), dtype=np.int64)
+
+        stamps = {}
+        for key, df in frames.items():
+            ns = pd.DatetimeIndex(df.index).as_unit("ns").asi8
+            days, ns_of_day = np.divmod(ns, NS_PER_DAY)
+            minutes, remainder = np.divmod(ns_of_day, NS_PER_MINUTE)
+            if remainder.any():
+                raise ValueError("Chain store only supports minute bars (found timestamps with seconds)")
+            stamps[key] = (days, minutes)
+        grid_days = np.unique(np.concatenate([days for days, _ in stamps.values()]))
+        start_minute = int(min(minutes.min() for _, minutes in stamps.values() if len(minutes)))
+        minutes_per_day = int(max(minutes.max() for _, minutes in stamps.values() if len(minutes))) - start_minute + 1
+
+        n_slots = len(grid_days) * minutes_per_day
+        values = np.full((n_slots, len(OPTION_TYPES), len(strikes), len(columns)), np.nan, dtype=np.float64)
+        valid = np.zeros((n_slots, len(OPTION_TYPES), len(strikes)), dtype=bool)
+        for (option_type, strike), df in frames.items():
+            days, minutes = stamps[(option_type, strike)]
+            slots = np.searchsorted(grid_days, days) * minutes_per_day + (minutes - start_minute)
+            k, s = OPTION_TYPES.index(option_type), int(np.searchsorted(strikes, strike))
+            for j, column in enumerate(columns):
+                if column in df.columns:
+                    values[slots, k, s, j] = df[column].to_numpy(dtype=np.float64, na_value=np.nan)
+            valid[slots, k, s] = True
+
+        return cls(ticker=ticker, expiry=expiry, strikes=strikes, days=grid_days.astype(np.int64), start_minute=start_minute,
+                   minutes_per_day=minutes_per_day, columns=columns, values=values, valid=valid)
+
+
+class OptionChainStore:
+    '''
+    Expiry chains for chain queries. load() never writes, it serves the first up-to-date source of:
+    - the memory-mapped chain copy <chain_root>/<ticker>/expiry__<expiry>.{values.npy, valid.npy, strikes.npy, days.npy, json}, an explicit
+      build step (materialise / materialise_all, python -m connectors.option_chain) for trees queried chain-wise a lot
+    - the per-expiry consolidated dataset of utils/consolidate_database.py (one parquet read per expiry), laid out on the grid in memory
+    - the per-strike parquet files of database/options/<ticker>/<CE|PE>/expiry__<expiry>/, laid out on the grid in memory
+    A copy is up to date when the per-strike files it was built from are unchanged (same set, sizes and mtimes).
+    '''
+    def __init__(self, database_path: str | Path, chain_root: str | Path | None = None, consolidated_root: str | Path | None = None):
+        self.database_path = Path(database_path)
+        self.chain_root = Path(chain_root) if chain_root else self.database_path / "chains"
+        self.consolidated_root = Path(consolidated_root) if consolidated_root else self.database_path / "consolidated"
+
+    def _stem(self, ticker: str, expiry: str) -> Path:
+        return self.chain_root / ticker / f"expiry__{expiry}"
+
+    def _sources(self, ticker: str, expiry: str) -> dict:
+        '''"<option_type>/<strike>" --> [size, mtime_ns] of every source file of the expiry'''
+        sources = {}
+        for option_type in OPTION_TYPES:
+            expiry_dir = self.database_path / "options" / ticker / option_type / f"expiry__{expiry}"
+            if not expiry_dir.is_dir():
+                continue
+            for entry in os.scandir(expiry_dir):
+                if entry.name.startswith("strike__") and entry.name.endswith(".parquet"):
+                    stat = entry.stat()
+                    sources[f"{option_type}/{int(entry.name[len('strike__'):-len('.parquet')])}"] = [stat.st_size, stat.st_mtime_ns]
+        return sources
+
+    def _consolidated_path(self, ticker: str, expiry: str, sources: dict) -> str | None:
+        '''The consolidated expiry file if it was built from exactly these sources (or no sources are left to compare with), else None'''
+        path = consolidated_expiry_path(expiry, self.consolidated_root, ticker)
+        if not os.path.exists(path):
+            return None
+        metadata = pq.read_schema(path).metadata or {}
+        if CONSOLIDATED_METADATA_KEY not in metadata:
+            return None
+        return path if not sources or json.loads(metadata[CONSOLIDATED_METADATA_KEY]).get("sources") == sources else None
+
+    def _frames(self, ticker: str, expiry: str, sources: dict) -> dict:
+        '''{(option_type, strike): de-duplicated DataFrame} of every contract of the expiry, from the consolidated file when it is up to date'''
+        consolidated_path = self._consolidated_path(ticker, expiry, sources)
+        if consolidated_path is not None:
+            table = pq.read_table(consolidated_path)
+            index_column, index_name = consolidated_index_column(table.schema.metadata), consolidated_index_name(table.schema.metadata)
+            column_types = consolidated_column_types(table.schema.metadata)
+            option_types, strikes = table.column("option_type").to_numpy(zero_copy_only=False), table.column("strike").to_numpy()
+            bounds = np.flatnonzero(np.r_[True, (option_types[1:] != option_types[:-1]) | (strikes[1:] != strikes[:-1]), True])    # Rows are sorted by contract
+            return {(str(option_types[a]), int(strikes[a])): consolidated_table_to_frame(table.slice(a, b - a), index_column, index_name, column_types.get((str(option_types[a]), int(strikes[a]))))
+                    for a, b in zip(bounds[:-1], bounds[1:])}
+        assert sources, f"No option files for {ticker} expiry {expiry} in {self.database_path}"
+        frames = {}
+        for key in sources:
+            option_type, strike = key.split("/")
+            frames[(option_type, int(strike))] = read_option_data(option_type=option_type, strike=int(strike), expiry_date=expiry,
+                                                                  db_folderpath=self.database_path, ticker=ticker, check_exists=False)
+        return frames
+
+    def load(self, ticker: str, expiry: str) -> ExpiryChain:
+        '''Chain of an expiry: the memory-mapped copy if it is up to date, else built in memory from the consolidated or per-strike files (nothing is written)'''
+        stem = self._stem(ticker, expiry)
+        meta_path = stem.with_suffix(".json")
+        sources = self._sources(ticker, expiry)
+        if meta_path.exists():
+            with open(meta_path, "r") as f:
+                meta = json.load(f)
+            if meta.get("version") == CHAIN_STORE_VERSION and (not sources or meta.get("sources") == sources):  # No sources: only the chain copy was shipped, trust it
+                return ExpiryChain(
+                    ticker=ticker,
+                    expiry=expiry,
+                    strikes=np.load(f"{stem}.strikes.npy"),
+                    days=np.load(f"{stem}.days.npy"),
+                    start_minute=meta["start_minute"],
+                    minutes_per_day=meta["minutes_per_day"],
+                    columns=tuple(meta["columns"]),
+                    values=np.load(f"{stem}.values.npy", mmap_mode="r"),
+                    valid=np.load(f"{stem}.valid.npy", mmap_mode="r"),
+                )
+        return ExpiryChain.from_frames(ticker, expiry, self._frames(ticker, expiry, sources))
+
+    def materialise(self, ticker: str, expiry: str, sources: dict | None = None):
+        '''(Re)build the memory-mapped chain copy of an expiry'''
+        sources = sources if sources is not None else self._sources(ticker, expiry)
+        chain = ExpiryChain.from_frames(ticker, expiry, self._frames(ticker, expiry, sources))
+
+        stem = self._stem(ticker, expiry)
+        stem.parent.mkdir(parents=True, exist_ok=True)
+        meta = {
+            "version": CHAIN_STORE_VERSION,
+            "start_minute": chain.start_minute,
+            "minutes_per_day": chain.minutes_per_day,
+            "columns": list(chain.columns),
+            "sources": sources,
+        }
+        # Write to temporary files and rename so that a crash never leaves a half written chain behind (the json goes last)
+        for suffix, array in (("values", chain.values), ("valid", chain.valid), ("strikes", chain.strikes), ("days", chain.days)):
+            with open(f"{stem}.{suffix}.npy.tmp", "wb") as f:
+                np.save(f, array)
+            os.replace(f"{stem}.{suffix}.npy.tmp", f"{stem}.{suffix}.npy")
+        with open(f"{stem}.json.tmp", "w") as f:
+            json.dump(meta, f)
+        os.replace(f"{stem}.json.tmp", stem.with_suffix(".json"))
+
+    def is_materialised(self, ticker: str, expiry: str, sources: dict | None = None) -> bool:
+        '''True if the chain copy of the expiry exists and is up to date'''
+        meta_path = self._stem(ticker, expiry).with_suffix(".json")
+        if not meta_path.exists():
+            return False
+        with open(meta_path, "r") as f:
+            meta = json.load(f)
+        return meta.get("version") == CHAIN_STORE_VERSION and meta.get("sources") == (sources if sources is not None else self._sources(ticker, expiry))
+
+    def iter_source_expiries(self, ticker: str = "NIFTY"):
+        '''Yield every expiry present in the parquet options tree of a ticker'''
+        expiries = set()
+        for option_type in OPTION_TYPES:
+            expiries.update(p.name.split("__", 1)[1] for p in (self.database_path / "options" / ticker / option_type).glob("expiry__*"))
+        yield from sorted(expiries)
+
+    def materialise_all(self, ticker: str = "NIFTY") -> int:
+        '''Build (or refresh) the chain copy of every expiry of a ticker, skipping the up-to-date ones. Returns the number of expiries built.'''
+        count = 0
+        for expiry in self.iter_source_expiries(ticker):
+            sources = self._sources(ticker, expiry)
+            if not self.is_materialised(ticker, expiry, sources):
+                self.materialise(ticker, expiry, sources)
+                count += 1
+        return count
+
+
+if __name__ == "__main__":
+
+    # Optional build step: memory-mapped chain copy of every NIFTY expiry (later runs only refresh expiries whose files changed).
+    # Without it DBConnector.get_chain builds each expiry's chain in memory, from the consolidated dataset when there is one
+    # Run from the project root :: python -m connectors.option_chain
+    from constants import GLOBAL_DB_FOLDERPATH, CHAIN_DB_FOLDERPATH, CONSOLIDATED_DB_FOLDERPATH
+    store = OptionChainStore(GLOBAL_DB_FOLDERPATH, CHAIN_DB_FOLDERPATH, CONSOLIDATED_DB_FOLDERPATH)
+    print(f"Built {store.materialise_all('NIFTY')} expiry chains into {store.chain_root}")
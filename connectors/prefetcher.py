@@ -0,0 +1,137 @@
+from concurrent.futures import ThreadPoolExecutor, Future
+import threading
+import time
+import pandas as pd
+from connectors.contract import Contract
+
+
+class ContractPrefetcher:
+    '''
+    Warms DBConnector.contract_cache in background threads.
+    schedule_day(timestamp) queues the CE and PE contracts within +/- strike_radius strikes of the ATM strike at timestamp, for the closest expiry.
+    BackTester.run calls it with the opening timestamp of day D+1 while day D is being simulated (see DBConnector.enable_prefetch).
+    - Bounded: stops queueing once max_bytes have been prefetched for a day, and never loads into a cache that is already full (that would evict hot contracts).
+    - Cancellable: cancel() drops every queued load, shutdown() also stops the worker threads.
+    - stats()['hidden_seconds'] is the load time of prefetched contracts that were later used, minus the time the backtest spent waiting for them.
+    '''
+    def __init__(self, dbconnector, max_workers: int = 4, strike_radius: int = 5, max_bytes: int | None = None, ticker: str = None):
+        assert max_workers > 0, "max_workers must be positive"
+        assert strike_radius >= 0, "strike_radius must be non-negative"
+        self.dbconnector = dbconnector
+        self.cache = dbconnector.contract_cache
+        self.strike_radius = strike_radius
+        self.max_bytes = max_bytes if max_bytes is not None else (self.cache.max_bytes // 2 if self.cache.max_bytes is not None else None)
+        self.ticker = ticker if ticker else dbconnector.ticker
+
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="contract-prefetch")
+        self._futures: list[Future] = []
+        self._cancelled = threading.Event()
+        self._lock = threading.Lock()
+        self._load_seconds: dict[Contract, float] = {}   # Prefetched but not yet used contract --> time its load took
+        self._day_bytes = 0
+        self._wait_seconds_at_start = self.cache.wait_seconds
+
+        self.scheduled = 0
+        self.prefetched = 0
+        self.prefetched_bytes = 0
+        self.skipped = 0        # Already cached, missing from the database or over budget
+        self.used = 0
+        self.used_load_seconds = 0.0
+
+    def contracts_around_atm(self, timestamp: pd.Timestamp) -> list[Contract]:
+        '''Contracts within +/- strike_radius strikes of the ATM strike at timestamp, closest strikes first'''
+        atm_strike = self.dbconnector.get_ATM_strike(timestamp, ticker=self.ticker)
+        expiry = self.dbconnector.get_closest_expiry(timestamp, ticker=self.ticker)
+        if expiry is None:
+            return []
+        strike_step = self.dbconnector.strike_steps[self.ticker]
+        offsets = sorted(range(-self.strike_radius, self.strike_radius + 1), key=abs)
+        return [Contract(ticker=self.ticker, option_type=option_type, strike=atm_strike + k * strike_step, expiry=expiry) for k in offsets for option_type in ("CE", "PE")]
+
+    def schedule_day(self, timestamp: pd.Timestamp) -> int:
+        '''Queue the contracts a strategy is likely to trade at timestamp (usually the next session open). Returns the number queued.'''
+        if self._cancelled.is_set():
+            return 0
+        try:
+            contracts = self.contracts_around_atm(timestamp)
+        except KeyError:    # No spot bar at timestamp
+            return 0
+
+        queued = 0
+        with self._lock:
+            self._day_bytes = 0
+            self._futures = [f for f in self._futures if not f.done()]
+            for contract in contracts:
+                if contract in self.cache:
+                    self.skipped += 1
+                    continue
+                self._futures.append(self._executor.submit(self._prefetch, contract))
+                queued += 1
+            self.scheduled += queued
+        return queued
+
+    def _over_budget(self) -> bool:
+        if self.max_bytes is not None and self._day_bytes >= self.max_bytes:
+            return True
+        return self.cache.max_bytes is not None and self.cache.current_bytes >= self.cache.max_bytes
+
+    def _prefetch(self, contract: Contract):
+        if self._cancelled.is_set() or contract in self.cache or self._over_budget():
+            with self._lock:
+                self.skipped += 1
+            return
+
+        start = time.perf_counter()
+        try:
+            self.cache.get_or_load(contract, self.dbconnector._contract_loader(contract), count=False)     # Not a lookup of the backtest: no hit / miss
+        except (AssertionError, FileNotFoundError, OSError, ValueError):   # Strike not listed / file missing: nothing to warm
+            with self._lock:
+                self.skipped += 1
+            return
+        elapsed = time.perf_counter() - start
+
+        nbytes = self.cache.entry_nbytes(contract)
+        with self._lock:
+            self._load_seconds[contract] = elapsed
+            self._day_bytes += nbytes
+            self.prefetched += 1
+            self.prefetched_bytes += nbytes
+
+    def note_access(self, contract: Contract):
+        '''Called by DBConnector on every contract access, credits the load time of prefetched contracts when they are first used'''
+        if contract in self._load_seconds:
+            with self._lock:
+                load_seconds = self._load_seconds.pop(contract, None)
+                if load_seconds is not None:
+                    self.used += 1
+                    self.used_load_seconds += load_seconds
+
+    def cancel(self):
+        '''Drop every queued (not yet running) prefetch and refuse new ones until resume()'''
+        self._cancelled.set()
+        with self._lock:
+            for future in self._futures:
+                future.cancel()
+            self._futures = []
+
+    def resume(self):
+        self._cancelled.clear()
+
+    def shutdown(self, wait: bool = True):
+        self.cancel()
+        self._executor.shutdown(wait=wait, cancel_futures=True)
+
+    def stats(self) -> dict:
+        '''Snapshot of the prefetch counters'''
+        waited = self.cache.wait_seconds - self._wait_seconds_at_start
+        with self._lock:
+            return {
+                'scheduled': self.scheduled,
+                'prefetched': self.prefetched,
+                'prefetched_bytes': self.prefetched_bytes,
+                'skipped': self.skipped,
+                'used': self.used,
+                'used_load_seconds': self.used_load_seconds,
+                'waited_seconds': waited,
+                'hidden_seconds': max(0.0, self.used_load_seconds - waited),
+            }
@@ -0,0 +1,184 @@
+import os
+import json
+from dataclasses import dataclass
+from pathlib import Path
+import numpy as np
+import pandas as pd
+from constants import NSE_SESSION_OPEN, NSE_SESSION_MINUTES
+
+NS_PER_MINUTE = 60 * 10**9
+NS_PER_DAY = 24 * 60 * NS_PER_MINUTE
+
+
+def minute_of_day(hh_mm: str | pd.Timestamp) -> int:
+    '''"09:15" (or a Timestamp) --> 555'''
+    timestamp = pd.Timestamp(hh_mm)
+    return timestamp.hour * 60 + timestamp.minute
+
+
+def load_nse_holidays(holidays_json_path: str | Path) -> tuple[list[str], dict]:
+    '''
+    Read the NSE holiday metadata. Accepted layouts:
+    - ["2024-01-26", ...] or {"2024-01-26": "Republic Day", ...}
+    - {"holidays": <one of the above>, "special_sessions": {"2024-11-01": ["18:00", "19:00"], ...}}   (special session hours: open, close exclusive)
+    Returns (holiday dates, {date: (open "HH:MM", close "HH:MM")})
+    '''
+    with open(holidays_json_path, 'r') as f:
+        data = json.load(f)
+    special_sessions = {}
+    if isinstance(data, dict) and ("holidays" in data or "special_sessions" in data):
+        special_sessions = {str(pd.Timestamp(day).date()): tuple(hours) for day, hours in data.get("special_sessions", {}).items()}
+        data = data.get("holidays", [])
+    return [str(pd.Timestamp(day).date()) for day in data], special_sessions
+
+
+@dataclass
+class SessionCalendar:
+    '''
+    Trading sessions as integer arrays indexed by day offset (days since epoch - first_day), so every query is O(1) integer arithmetic on Timestamp.value.
+    - open_minute / close_minute : minute of day of the first bar / one past the last bar (-1 on closed days)
+    - is_holiday, is_expiry      : exchange holiday (weekday without a session) / an expiry of the ticker falls on the day
+    - next_session               : day offset of the first session strictly after the day (-1 after the last session)
+    Built by DBConnector.calendar from the NSE holiday metadata (constants.NSE_HOLIDAYS_JSON_PATH) or, without it, from the days present in the spot data.
+    '''
+    first_day: int
+    open_minute: np.ndarray
+    close_minute: np.ndarray
+    is_holiday: np.ndarray
+    is_expiry: np.ndarray
+    next_session: np.ndarray
+
+    @classmethod
+    def build(cls, first_date, last_date, holidays: list[str] | None = None, special_sessions: dict | None = None, session_days=None, expiries: list[str] = (),
+              session_open: str = NSE_SESSION_OPEN, session_minutes: int = NSE_SESSION_MINUTES) -> "SessionCalendar":
+        '''
+        Sessions between first_date and last_date: every weekday that is not a holiday (or exactly session_days, when given), plus special_sessions
+        ({date: (open, close)}, also on weekends). Regular sessions run session_minutes bars from session_open.
+        '''
+        first_day = int(np.datetime64(pd.Timestamp(first_date).date(), 'D').astype(np.int64))
+        last_day = int(np.datetime64(pd.Timestamp(last_date).date(), 'D').astype(np.int64))
+        assert last_day >= first_day, f"Empty calendar: {first_date} > {last_date}"
+        days = np.arange(first_day, last_day + 1)
+        regular_open = minute_of_day(session_open)
+
+        def offsets(dates) -> np.ndarray:
+            day_numbers = np.array([np.datetime64(pd.Timestamp(d).date(), 'D').astype(np.int64) for d in dates], dtype=np.int64)
+            return day_numbers[(day_numbers >= first_day) & (day_numbers <= last_day)] - first_day
+
+        is_weekday = ((days + 3) % 7) < 5     # 1970-01-01 was a Thursday
+        is_holiday = np.zeros(len(days), dtype=bool)
+        is_holiday[offsets(holidays or [])] = True
+        is_holiday &= is_weekday
+        if session_days is not None:
+            is_session = np.zeros(len(days), dtype=bool)
+            is_session[offsets(session_days)] = True
+        else:
+            is_session = is_weekday & ~is_holiday
+
+        open_minute = np.where(is_session, regular_open, -1).astype(np.int16)
+        close_minute = np.where(is_session, regular_open + session_minutes, -1).astype(np.int16)
+        for day, (open_hh_mm, close_hh_mm) in (special_sessions or {}).items():
+            for offset in offsets([day]):
+                open_minute[offset], close_minute[offset] = minute_of_day(open_hh_mm), minute_of_day(close_hh_mm)
+
+        is_expiry = np.zeros(len(days), dtype=bool)
+        is_expiry[offsets(expiries)] = True
+
+        # next_session[d] = first session day offset > d
+        session_offsets = np.flatnonzero(open_minute >= 0)
+        positions = np.searchsorted(session_offsets, np.arange(len(days)), side='right')
+        next_session = np.where(positions < len(session_offsets), session_offsets[np.minimum(positions, len(session_offsets) - 1)], -1).astype(np.int32)
+        return cls(first_day=first_day, open_minute=open_minute, close_minute=close_minute, is_holiday=is_holiday, is_expiry=is_expiry, next_session=next_session)
+
+    @classmethod
+    def from_spot(cls, df_spot: pd.DataFrame, holidays_json_path: str | Path | None = None, expiries: list[str] = ()) -> "SessionCalendar":
+        '''Calendar covering the spot data: from the holiday metadata if the file exists, else the days present in df_spot are the sessions'''
+        days = df_spot.index.normalize().unique()
+        if holidays_json_path is not None and os.path.exists(holidays_json_path):
+            holidays, special_sessions = load_nse_holidays(holidays_json_path)
+            return cls.build(days.min(), days.max(), holidays=holidays, special_sessions=special_sessions, expiries=expiries)
+        return cls.build(days.min(), days.max(), session_days=days, expiries=expiries)
+
+    def _offset(self, timestamp: pd.Timestamp) -> int:
+        '''Day offset of timestamp, -1 outside the calendar'''
+        offset = timestamp.value // NS_PER_DAY - self.first_day
+        return offset if 0 <= offset < len(self.open_minute) else -1
+
+    @staticmethod
+    def time_of_day(timestamp: pd.Timestamp) -> int:
+        '''Nanoseconds since midnight: time_of_day(a) == time_of_day(b) exactly when a.time() == b.time(), without building datetime.time objects'''
+        return timestamp.value % NS_PER_DAY
+
+    def minute_of_session(self, timestamp: pd.Timestamp) -> int:
+        '''0 for the first bar of the session (09:15 on regular days), -1 outside a session'''
+        offset = self._offset(timestamp)
+        if offset < 0:
+            return -1
+        minute = (timestamp.value % NS_PER_DAY) // NS_PER_MINUTE
+        open_minute = int(self.open_minute[offset])
+        return minute - open_minute if open_minute <= minute < self.close_minute[offset] else -1
+
+    def is_session_day(self, timestamp: pd.Timestamp) -> bool:
+        offset = self._offset(timestamp)
+        return offset >= 0 and self.open_minute[offset] >= 0
+
+    def is_holiday_day(self, timestamp: pd.Timestamp) -> bool:
+        offset = self._offset(timestamp)
+        return offset >= 0 and bool(self.is_holiday[offset])
+
+    def is_expiry_day(self, timestamp: pd.Timestamp) -> bool:
+        offset = self._offset(timestamp)
+        return offset >= 0 and bool(self.is_expiry[offset])
+
+    def next_session_open(self, timestamp: pd.Timestamp) -> pd.Timestamp | None:
+        '''Open of the first session starting after timestamp (the same day's open if it is still ahead), None after the last session'''
+        offset = self._offset(timestamp)
+        if offset < 0:
+            return None
+        if self.open_minute[offset] >= 0 and (timestamp.value % NS_PER_DAY) < int(self.open_minute[offset]) * NS_PER_MINUTE:
+            day = offset
+        else:
+            day = int(self.next_session[offset])
+            if day < 0:
+                return None
+        return pd.Timestamp((self.first_day + day) * NS_PER_DAY + int(self.open_minute[day]) * NS_PER_MINUTE)
+
+    @staticmethod
+    def times_of_day(timestamps) -> np.ndarray:
+        '''Vectorised time_of_day(): int64 nanoseconds since midnight of every timestamp'''
+        return pd.DatetimeIndex(timestamps).as_unit("ns").asi8 % NS_PER_DAY
+
+    def minutes_of_session(self, timestamps) -> np.ndarray:
+        '''Vectorised minute_of_session(): -1 outside a session'''
+        offsets = self.day_offsets(timestamps)
+        minutes = self.times_of_day(timestamps) // NS_PER_MINUTE
+        open_minute = self.open_minute[np.where(offsets >= 0, offsets, 0)].astype(np.int64)
+        return np.where(self.in_session(timestamps), minutes - open_minute, -1)
+
+    def day_offsets(self, timestamps) -> np.ndarray:
+        '''Vectorised day offset of every timestamp (-1 outside the calendar)'''
+        offsets = pd.DatetimeIndex(timestamps).as_unit("ns").asi8 // NS_PER_DAY - self.first_day
+        return np.where((offsets >= 0) & (offsets < len(self.open_minute)), offsets, -1)
+
+    def in_session(self, timestamps) -> np.ndarray:
+        '''Vectorised: True for the timestamps that fall within a session (holidays, weekends and off-session bars are False)'''
+        ns = pd.DatetimeIndex(timestamps).as_unit("ns").asi8
+        offsets = self.day_offsets(timestamps)
+        inside = offsets >= 0
+        minutes = (ns % NS_PER_DAY) // NS_PER_MINUTE
+        safe = np.where(inside, offsets, 0)
+        return inside & (minutes >= self.open_minute[safe]) & (minutes < self.close_minute[safe]) & (self.open_minute[safe] >= 0)
+
+    def session_grid(self, start=None, end=None) -> pd.DatetimeIndex:
+        '''Every bar timestamp of every session within [start, end] (default: the whole calendar)'''
+        session_offsets = np.flatnonzero(self.open_minute >= 0)
+        if len(session_offsets) == 0:
+            return pd.DatetimeIndex([], dtype="datetime64[ns]")
+        lengths = (self.close_minute[session_offsets] - self.open_minute[session_offsets]).astype(np.int64)
+        day_starts = (self.first_day + session_offsets) * NS_PER_DAY + self.open_minute[session_offsets].astype(np.int64) * NS_PER_MINUTE
+        first_bar = np.repeat(np.cumsum(lengths) - lengths, lengths)
+        ns = np.repeat(day_starts, lengths) + (np.arange(lengths.sum()) - first_bar) * NS_PER_MINUTE
+        grid = pd.DatetimeIndex(ns.astype("datetime64[ns]"))
+        if start is not None or end is not None:
+            grid = grid[(grid >= pd.Timestamp(start) if start is not None else True) & (grid <= pd.Timestamp(end) if end is not None else True)]
+        return grid
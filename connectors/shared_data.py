@@ -0,0 +1,196 @@
+import sys
+import json
+import weakref
+from multiprocessing import shared_memory, resource_tracker
+import numpy as np
+import pandas as pd
+from connectors.contract import Contract
+from connectors.array_store import ContractArrays
+
+SHARED_DATA_VERSION = 1
+HEADER_LENGTH_BYTES = 8     # uint64 length of the json header at the start of the segment
+ALIGNMENT = 64              # Arrays start on cache-line boundaries
+
+
+def _aligned(offset: int) -> int:
+    return (offset + ALIGNMENT - 1) // ALIGNMENT * ALIGNMENT
+
+
+def _attach_segment(name: str) -> shared_memory.SharedMemory:
+    '''Open an existing segment without handing it to this process's resource tracker (only the creator may unlink it)'''
+    if sys.version_info >= (3, 13):
+        return shared_memory.SharedMemory(name=name, track=False)
+    # Before 3.13 attaching registers the segment too, and a worker's tracker would unlink it under the other processes' feet when the worker exits
+    register = resource_tracker.register
+    resource_tracker.register = lambda name, rtype: None if rtype == "shared_memory" else register(name, rtype)
+    try:
+        return shared_memory.SharedMemory(name=name)
+    finally:
+        resource_tracker.register = register
+
+
+def _release(shm: shared_memory.SharedMemory, owner: bool):
+    '''Close (and unlink, for the creator) a segment. Runs at most once, from close()/unlink(), garbage collection or interpreter exit.'''
+    try:
+        shm.close()
+    except BufferError:     # Views are still alive: each one references the mmap, which is unmapped when the last of them is freed
+        shm._mmap = None
+        shm.close()
+    if owner:
+        try:
+            shm.unlink()
+        except FileNotFoundError:
+            pass
+
+
+class SharedMarketData:
+    '''
+    Spot series and option contracts packed once into a multiprocessing.shared_memory segment, for backtests running in several processes.
+    The parent builds it with SharedMarketData.create(dbconnector, contracts) (or DBConnector.share_data), workers attach by name with
+    DBConnector(shared_data=<name>, ...): their df_spot and the shared contracts are read-only NumPy views of the segment, nothing is re-read or copied.
+    Layout: [uint64 header length][json header][arrays, 64-byte aligned]. The header lists every array as (offset, dtype, shape).
+    Lifecycle: only the creator unlinks the segment, on close()/unlink(), when the object is garbage collected, at interpreter exit,
+    or (after a crash) through the multiprocessing resource tracker. Workers only close their mapping.
+    '''
+    def __init__(self, shm: shared_memory.SharedMemory, owner: bool):
+        self._shm = shm
+        self.owner = owner
+        self._finalizer = weakref.finalize(self, _release, shm, owner)
+
+        header_length = int(np.frombuffer(shm.buf, dtype="<u8", count=1)[0])
+        self.header = json.loads(bytes(shm.buf[HEADER_LENGTH_BYTES:HEADER_LENGTH_BYTES + header_length]).decode("utf-8"))
+        assert self.header["version"] == SHARED_DATA_VERSION, f"Shared data version {self.header['version']} != {SHARED_DATA_VERSION}"
+
+        self.ticker_sources = {ticker: spot["sources"] for ticker, spot in self.header["spots"].items()}    # ticker --> add_ticker() kwargs
+        self.spots = {ticker: self._spot_frame(spot) for ticker, spot in self.header["spots"].items()}     # ticker --> minute spot DataFrame
+        self.contracts = {Contract(*entry["contract"]): self._contract_arrays(entry) for entry in self.header["contracts"]}
+
+    @property
+    def name(self) -> str:
+        return self._shm.name
+
+    @property
+    def nbytes(self) -> int:
+        return self._shm.size
+
+    def _array(self, spec: dict) -> np.ndarray:
+        # Views of the mmap itself (not of shm.buf): numpy then holds a buffer export, so the mapping cannot be closed under a live view
+        array = np.frombuffer(self._shm.buf.obj, dtype=np.dtype(spec["dtype"]), count=int(np.prod(spec["shape"])), offset=spec["offset"]).reshape(spec["shape"])
+        array.flags.writeable = False
+        return array
+
+    def _spot_frame(self, spot: dict) -> pd.DataFrame:
+        index = pd.DatetimeIndex(self._array(spot["index"]), name=spot["index_name"], copy=False)
+        return pd.DataFrame({column: self._array(spec) for column, spec in spot["columns"].items()}, index=index, copy=False)
+
+    def _contract_arrays(self, entry: dict) -> ContractArrays:
+        layout = {**entry["layout"], "columns": tuple(entry["layout"]["columns"]), "dtypes": tuple(entry["layout"]["dtypes"])}
+        return ContractArrays(**layout, values=self._array(entry["values"]), valid=self._array(entry["valid"]))
+
+    @classmethod
+    def create(cls, dbconnector, contracts=(), tickers: list[str] = None, name: str = None) -> "SharedMarketData":
+        '''
+        Pack the minute spot of tickers (default: the connector's own ticker) and the given contracts (as ContractArrays) into a new segment.
+        contracts are loaded through the connector, so they come from whatever storage engine (and Greeks) it uses.
+        '''
+        # Example :: SharedMarketData.create(db, [Contract("NIFTY", ot, strike, "2025-05-08") for ot in ("CE", "PE") for strike in db.get_strikes("2025-05-08")])
+        tickers = tickers if tickers else [dbconnector.ticker]
+        arrays = []     # (spec dict to fill with the offset, array) in layout order
+
+        def add(array: np.ndarray) -> dict:
+            spec = {"dtype": array.dtype.str, "shape": list(array.shape)}
+            arrays.append((spec, np.ascontiguousarray(array)))
+            return spec
+
+        spots = {}
+        for ticker in tickers:
+            df_spot = dbconnector.get_spot_df(ticker=ticker)
+            ticker_data = dbconnector.tickers[ticker]
+            spots[ticker] = {
+                "sources": {"spot_parquet_path": ticker_data.spot_parquet_path, "expiries_json_path": ticker_data.expiries_json_path,
+                            "strike_step": dbconnector.strike_steps.get(ticker)},
+                "index_name": df_spot.index.name,
+                "index": add(df_spot.index.values),
+                "columns": {str(column): add(df_spot[column].to_numpy()) for column in df_spot.columns},
+            }
+
+        entries = []
+        for contract in dict.fromkeys(contracts):
+            contract_data = dbconnector._load_contract(contract)
+            contract_arrays = contract_data if isinstance(contract_data, ContractArrays) else ContractArrays.from_frame(
+                contract_data if isinstance(contract_data, pd.DataFrame) else contract_data.to_frame())
+            entries.append({
+                "contract": [contract.ticker, contract.option_type, contract.strike, contract.expiry],
+                "layout": {"first_day": contract_arrays.first_day, "start_minute": contract_arrays.start_minute, "minutes_per_day": contract_arrays.minutes_per_day,
+                           "columns": list(contract_arrays.columns), "dtypes": list(contract_arrays.dtypes),
+                           "index_name": contract_arrays.index_name, "index_unit": contract_arrays.index_unit},
+                "values": add(np.asarray(contract_arrays.values, dtype=np.float64)),
+                "valid": add(np.asarray(contract_arrays.valid, dtype=bool)),
+            })
+
+        # Offsets depend on the header length and the header contains the offsets: size the header with placeholder offsets first
+        header = {"version": SHARED_DATA_VERSION, "spots": spots, "contracts": entries}
+        for spec, _ in arrays:
+            spec["offset"] = 2 ** 62
+        data_start = _aligned(HEADER_LENGTH_BYTES + len(json.dumps(header).encode("utf-8")))
+        offset = data_start
+        for spec, array in arrays:
+            spec["offset"] = offset
+            offset = _aligned(offset + array.nbytes)
+        header_bytes = json.dumps(header).encode("utf-8")
+        assert HEADER_LENGTH_BYTES + len(header_bytes) <= data_start
+
+        shm = shared_memory.SharedMemory(name=name, create=True, size=max(offset, 1))
+        try:
+            np.frombuffer(shm.buf, dtype="<u8", count=1)[0] = len(header_bytes)
+            shm.buf[HEADER_LENGTH_BYTES:HEADER_LENGTH_BYTES + len(header_bytes)] = header_bytes
+            for spec, array in arrays:
+                np.ndarray(array.shape, dtype=array.dtype, buffer=shm.buf, offset=spec["offset"])[...] = array
+        except BaseException:
+            shm.close()
+            shm.unlink()
+            raise
+        return cls(shm, owner=True)
+
+    @classmethod
+    def attach(cls, name: str) -> "SharedMarketData":
+        '''Read-only view of a segment created by another process'''
+        return cls(_attach_segment(name), owner=False)
+
+    def close(self):
+        '''Drop this process's views and mapping. For the creator this also unlinks the segment (attached workers keep their mappings).'''
+        self.spots, self.contracts = {}, {}
+        self._finalizer()
+
+    def unlink(self):
+        assert self.owner, "Only the process that created the segment may unlink it"
+        self.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def _worker_sum(args: tuple) -> float:
+    name, database_path = args
+    from connectors.dbconnector import DBConnector
+    db = DBConnector(database_path=database_path, storage="array", shared_data=name)
+    return float(np.nansum(db.get_prices(list(db.shared_data.contracts), db.df_spot.index[:375], fill_missing=True)))
+
+
+if __name__ == "__main__":
+
+    # Load the spot and one expiry's contracts once, then read them from 4 worker processes without copies
+    # Run from the project root :: python -m connectors.shared_data
+    from concurrent.futures import ProcessPoolExecutor
+    from constants import GLOBAL_DB_FOLDERPATH
+    from connectors.dbconnector import DBConnector
+    db = DBConnector(storage="array")
+    expiry = db.get_closest_expiry(db.df_spot.index[0])
+    contracts = [Contract(db.ticker, option_type, strike, expiry) for option_type in ("CE", "PE") for strike in db.get_strikes(expiry, option_type=option_type)]
+    with db.share_data(contracts) as shared:
+        print(f"Shared {len(shared.contracts)} contracts and the spot in {shared.name} ({shared.nbytes / 2**20:.1f} MiB)")
+        with ProcessPoolExecutor(max_workers=4) as executor:
+            print(list(executor.map(_worker_sum, [(shared.name, str(GLOBAL_DB_FOLDERPATH))] * 4)))
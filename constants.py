@@ -8,12 +8,37 @@ GLOBAL_DB_FOLDERPATH = PROJECT_ROOT / "database"
 EQUITY_FOLDERPATH = GLOBAL_DB_FOLDERPATH / "equity"
 INDICES_FOLDERPATH = GLOBAL_DB_FOLDERPATH / "indices"
 OPTIONS_FOLDERPATH = GLOBAL_DB_FOLDERPATH / "options"
+ARRAY_DB_FOLDERPATH = GLOBAL_DB_FOLDERPATH / "arrays"   # Memory-mapped .npy copies of the options tree (see connectors/array_store.py)
+MANIFEST_JSON_PATH = GLOBAL_DB_FOLDERPATH / "manifest.json"     # Per-contract coverage index (see connectors/manifest.py)
+CHAIN_DB_FOLDERPATH = GLOBAL_DB_FOLDERPATH / "chains"   # Per-expiry consolidated option chains (see connectors/option_chain.py)
+CONSOLIDATED_DB_FOLDERPATH = GLOBAL_DB_FOLDERPATH / "consolidated"  # One parquet file per (ticker, expiry) (see utils/consolidate_database.py)
+GREEKS_DB_FOLDERPATH = GLOBAL_DB_FOLDERPATH / "greeks"  # Precomputed IV / Greeks per contract (see connectors/greeks_store.py)
+TIMEFRAMES_DB_FOLDERPATH = GLOBAL_DB_FOLDERPATH / "timeframes"  # Resampled copies of the minute files, one tree per timeframe (see utils/build_timeframes.py)
 
 BACKTEST_RESULTS_FOLDERPATH = PROJECT_ROOT / "backtest_results"
 
+# NSE cash session: 1-minute bars from 09:15 to 15:29 (375 bars)
+NSE_SESSION_OPEN = "09:15"
+NSE_SESSION_MINUTES = 375
+
+# Bar timeframes --> minutes per bar. 1m is the stored data, the others are precomputed by utils/build_timeframes.py
+TIMEFRAME_MINUTES = {"1m": 1, "5m": 5, "15m": 15, "1h": 60, "1d": 24 * 60}
+PYRAMID_TIMEFRAMES = ("5m", "15m", "1h", "1d")
+
+# Annualised, continuously compounded rate used for implied volatility and Greeks (approx. 91-day T-bill yield)
+RISK_FREE_RATE = 0.065
+
+# Distance between adjacent listed strikes, used to round spot to the ATM strike
+STRIKE_STEPS = {"NIFTY": 50, "BANKNIFTY": 100, "FINNIFTY": 50, "MIDCPNIFTY": 25, "SENSEX": 100}
+
 # Nifty Specific Paths
 NIFTY_PARQUET_PATH = GLOBAL_DB_FOLDERPATH / "indices" / "NIFTY_50_1min.parquet"
 NIFTY_EXPIRIES_JSON_PATH = PROJECT_ROOT / "datamanager" / "metadata" / "nse" / "nifty_expiries.json"
 NSE_HOLIDAYS_JSON_PATH = PROJECT_ROOT / "datamanager" / "metadata" / "nse" / "nse_holidays.json"
 
+# Spot series and expiry calendar of every ticker a DBConnector serves (add BANKNIFTY, FINNIFTY, ... here once their files are in the database)
+TICKER_SOURCES = {
+    "NIFTY": {"spot_parquet_path": NIFTY_PARQUET_PATH, "expiries_json_path": NIFTY_EXPIRIES_JSON_PATH},
+}
+
 
@@ -6,6 +6,7 @@ from typing import Union, Dict, Any
 import datetime as dt
 import pandas as pd
 from connectors.dbconnector import DBConnector
+from strategy.position_book import PositionBook
 from rich import print
 
 
@@ -122,6 +123,23 @@ class Action:
                     pass
         return cls(**data)
 
+@dataclass(frozen=True)
+class WakeUpSchedule:
+    '''
+    Minutes at which a strategy's action() can return something, declared by Strategy.wake_up_schedule(). The BackTester skips every other minute.
+    - times                : times of day ("09:20", pd.Timestamp("15:20"), ...) checked every session
+    - while_positions_open : also every minute while the strategy has open positions (exits driven by PnL, targets, ...)
+    - every_n_minutes      : also every N minutes of the session (minute_of_session % N == 0, i.e. from 09:15)
+    The BackTester adds its own wake-ups on top: every minute while orders are outstanding or stop-loss positions are open.
+    '''
+    times: tuple = ()
+    while_positions_open: bool = False
+    every_n_minutes: int | None = None
+
+    def __post_init__(self):
+        assert self.every_n_minutes is None or (isinstance(self.every_n_minutes, int) and self.every_n_minutes > 0), "every_n_minutes must be a positive integer"
+
+
 class Strategy(ABC):
     """Base class for all trading strategies."""
 
@@ -129,13 +147,44 @@ class Strategy(ABC):
         """Initialize strategy with config and database connector."""
         self.config = config
         self.dbconnector = dbconnector
+        self.position = PositionBook(ticker=dbconnector.ticker)  # Open (filled, not yet squared-off) positions keyed by hash
+        self.position_tally = {}        # hash --> {'opened': fill stats, 'closed': fill stats of the square-off (None while open)}
+        self.outstanding_orders = ()    # Snapshot of the BackTester's unfilled orders after the last step (read-only)
+        self.calendar = dbconnector.calendar    # Session calendar: integer time-of-day / minute-of-session queries instead of Timestamp.time() comparisons
 
     @abstractmethod
     def action(self, timestamp: pd.Timestamp) -> Union[list[Action], None]:
         """Execute trade action based on rules."""
         raise NotImplementedError("Subclasses must implement action()")
 
-    @abstractmethod
-    def on_trade_execution(self, timestamp: pd.Timestamp, metadata: list[dict]):
-        """Handle trade execution event."""
-        raise NotImplementedError("Subclasses must implement on_trade_execution()")
+    def wake_up_schedule(self) -> WakeUpSchedule | None:
+        """Minutes at which action() needs to be called (see WakeUpSchedule). None (the default) means every minute."""
+        return None
+
+    def on_trade_execution(self, metadata: list[dict], outstanding_orders: list):
+        """
+        Called by the BackTester after every step with the stats of the orders filled at this step (metadata) and the orders still pending.
+        Opens / squares off positions in self.position and self.position_tally, then calls the on_position_opened / on_position_closed hooks.
+        outstanding_orders is kept as a tuple snapshot (the Order objects are shared with the BackTester, not copied), rebuilt only when there is something to hold.
+        """
+        if outstanding_orders or self.outstanding_orders:
+            self.outstanding_orders = tuple(outstanding_orders)
+
+        for filled_position in metadata:
+            square_off_id = filled_position['action'].square_off_id
+            if square_off_id:   # Square-off of an open position
+                assert square_off_id in self.position, f"INVALID SQUARE-OFF. A filled position does not exist in {self.position}."
+                self.position_tally[square_off_id]['closed'] = filled_position
+                self.on_position_closed(self.position.remove(square_off_id), filled_position)
+            else:               # New position
+                self.position.add(filled_position)
+                self.position_tally[filled_position['hash']] = {'opened': filled_position, 'closed': None}
+                self.on_position_opened(filled_position)
+
+    def on_position_opened(self, position: dict):
+        """Hook: a new position was filled (position is the BackTester's fill stats: 'hash', 'action', 'price', 'timestamp', ...)"""
+        pass
+
+    def on_position_closed(self, position: dict, closing: dict):
+        """Hook: position was squared off by the fill closing"""
+        pass
@@ -1,8 +1,8 @@
 from typing import Union
-from strategy import Strategy, Action
+from strategy import Strategy, Action, WakeUpSchedule
 from connectors.dbconnector import DBConnector
+from connectors.contract import Contract
 import pandas as pd
-import copy
 
 class BaselineStraddle(Strategy):
     def __init__(self, 
@@ -22,11 +22,8 @@ class BaselineStraddle(Strategy):
         self.strike = None  # Will be set at the time of action
         self.entry_timestamp = entry_timestamp
         self.exit_timestamp = exit_timestamp
-
-        # Params common to all strategies
-        self.position = [] # will contain orders that are 'filled'
-        self.outstanding_orders = None # will change later according to orders other than filled
-        self.position_tally = {}    # Will contain the tally of each filled --> squared of position
+        self.entry_time = self.calendar.time_of_day(entry_timestamp)     # Integer time of day, compared against every bar
+        self.exit_time = self.calendar.time_of_day(exit_timestamp)
 
     def square_off_actions(self, square_off_ids: list[int] | None = None) -> list[Action]:
         '''Return all the actions required to square off the open positions at market order'''
@@ -43,11 +40,13 @@ class BaselineStraddle(Strategy):
     def pnl_at_timestamp(self, timestamp: pd.Timestamp) -> float:
         '''Cumulative PnL for all positions at a specific timestamp'''
         pnl = 0.0
-        for position_dict in self.position:
+        if not self.position:
+            return pnl
+        current_prices = self.dbconnector.get_prices([Contract.from_action(position_dict['action'], ticker=self.dbconnector.ticker) for position_dict in self.position], [timestamp], field='close')[:, 0]    # All legs in one gather
+        for position_dict, current_price in zip(self.position, current_prices):
             assert position_dict['timestamp'] <= timestamp, f"Position timestamp {position_dict['timestamp']} is greater than query timestamp {timestamp}."
             action = position_dict['action'] 
             filling_price = position_dict['price']
-            current_price = self.dbconnector.get_option_price(strike=action.strike, option_type=action.option_type, expiry_date=action.expiry, timestamp=timestamp)
             position_pnl = current_price - filling_price
             position_pnl = -position_pnl if action.trade_type == "short" else position_pnl 
             pnl += position_pnl
@@ -63,7 +62,7 @@ class BaselineStraddle(Strategy):
     def action(self, timestamp: pd.Timestamp) -> list[Action] | None:
 
         actions = None
-        if timestamp.time() == self.entry_timestamp.time(): 
+        if self.calendar.time_of_day(timestamp) == self.entry_time: 
             self.strike = self.dbconnector.get_ATM_strike(timestamp)
             closest_expiry = self.dbconnector.get_closest_expiry(timestamp)    
             if self.long_or_short == "short":
@@ -75,36 +74,13 @@ class BaselineStraddle(Strategy):
                 long_atm_put = Action(option_type="PE", strike=self.strike, expiry=closest_expiry, num_lots=1, trade_type="long", order_type="market")
                 actions = [long_atm_call, long_atm_put]
 
-        elif timestamp.time() == self.exit_timestamp.time() or self._has_stoploss_or_target_hit(timestamp):
+        elif self.calendar.time_of_day(timestamp) == self.exit_time or self._has_stoploss_or_target_hit(timestamp):
             actions = self.square_off_actions()
 
         return actions
-    
-    def on_trade_execution(self, metadata: list[dict], outstanding_orders: list):
-        '''
-        metadata: List of `filled` orders.
-        outstanding_orders: `unfulfilled` orders
-        '''
-        self.outstanding_orders = copy.deepcopy(outstanding_orders)
 
-        for filled_position in metadata:
-            # 1. If this is a square_off order, clear from self.position
-            if filled_position['action'].square_off_id:
-                position_to_remove = None
-                for our_position in self.position:
-                    if our_position['hash'] == filled_position['action'].square_off_id:
-                        position_to_remove = our_position
-                        break
-                
-                assert position_to_remove, f"INVALID SQUARE-OFF. A filled position does not exist in {self.position}."
-                self.position_tally[filled_position['action'].square_off_id]['closed'] = filled_position 
-                self.position.remove(position_to_remove)
-            # 2. Else, simply add to self.position
-            else:
-                self.position.append(filled_position)
-                self.position_tally[filled_position['hash']] = {}   
-                self.position_tally[filled_position['hash']]['opened'] = filled_position 
-                self.position_tally[filled_position['hash']]['closed'] = None 
+    def wake_up_schedule(self) -> WakeUpSchedule:
+        return WakeUpSchedule(times=(self.entry_timestamp, self.exit_timestamp), while_positions_open=True)    # Stoploss / target is checked on every bar of an open position
 
     def about(self) -> str:
         
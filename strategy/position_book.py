@@ -0,0 +1,84 @@
+from typing import Hashable, Iterable, Iterator
+from connectors.contract import Contract
+
+
+class PositionBook:
+    '''
+    Open (filled, not yet squared-off) positions of a strategy, keyed by position hash.
+    A position is the order-stats dict the BackTester reports on a fill ('hash', 'action', 'price', 'stoploss_price_level', ...), stored as is.
+    Lookup, insertion and removal by hash are O(1). Secondary indexes give the positions of one contract or order type without a scan.
+    Iterating the book yields the positions in fill order (like the list it replaces), so everything derived from that order is unchanged.
+    '''
+    def __init__(self, ticker: str, positions: Iterable[dict] = ()):
+        self.ticker = ticker                                # Underlying of every position (an Action carries no ticker), for the Contract keys
+        self._positions: dict[Hashable, dict] = {}          # hash --> position, in fill order
+        self._sequence: dict[Hashable, int] = {}            # hash --> fill sequence number, to merge index results back into fill order
+        self._by_contract: dict[Contract, dict] = {}        # Contract --> {hash: position}
+        self._by_order_type: dict[str, dict] = {}           # Action.order_type --> {hash: position}
+        self._next_sequence = 0
+        for position in positions:
+            self.add(position)
+
+    def __len__(self) -> int:
+        return len(self._positions)
+
+    def __bool__(self) -> bool:
+        return bool(self._positions)
+
+    def __iter__(self) -> Iterator[dict]:
+        return iter(list(self._positions.values()))     # Snapshot: callers may square off while iterating
+
+    def __contains__(self, hash: Hashable) -> bool:
+        return hash in self._positions
+
+    def __repr__(self) -> str:
+        return f"PositionBook({[position['action'].key for position in self._positions.values()]})"
+
+    def add(self, position: dict):
+        '''Register a filled position under position['hash']'''
+        hash = position['hash']
+        assert hash not in self._positions, f"Position {hash} is already open"
+        action = position['action']
+        self._positions[hash] = position
+        self._sequence[hash] = self._next_sequence
+        self._next_sequence += 1
+        self._by_contract.setdefault(Contract.from_action(action, ticker=self.ticker), {})[hash] = position
+        self._by_order_type.setdefault(action.order_type, {})[hash] = position
+
+    def remove(self, hash: Hashable) -> dict:
+        '''Drop a squared-off position and return it. KeyError if no open position has this hash.'''
+        position = self._positions.pop(hash)
+        del self._sequence[hash]
+        action = position['action']
+        for index, key in ((self._by_contract, Contract.from_action(action, ticker=self.ticker)), (self._by_order_type, action.order_type)):
+            del index[key][hash]
+            if not index[key]:
+                del index[key]
+        return position
+
+    def get(self, hash: Hashable, default: dict | None = None) -> dict | None:
+        return self._positions.get(hash, default)
+
+    def hashes(self) -> list:
+        return list(self._positions)
+
+    def _in_fill_order(self, positions: Iterable[dict]) -> list[dict]:
+        return sorted(positions, key=lambda position: self._sequence[position['hash']])
+
+    def select(self, hashes: Iterable[Hashable]) -> list[dict]:
+        '''Open positions among hashes (unknown hashes are ignored), in fill order'''
+        return self._in_fill_order(self._positions[hash] for hash in set(hashes) if hash in self._positions)
+
+    def by_contract(self, contract: Contract) -> list[dict]:
+        '''Open positions on one contract, in fill order'''
+        return list(self._by_contract.get(contract, {}).values())
+
+    def has_order_type(self, *order_types: str) -> bool:
+        '''True if any open position has one of order_types (O(1), no list is built)'''
+        return any(order_type in self._by_order_type for order_type in order_types)
+
+    def by_order_type(self, *order_types: str) -> list[dict]:
+        '''Open positions whose action has one of order_types, in fill order'''
+        if len(order_types) == 1:
+            return list(self._by_order_type.get(order_types[0], {}).values())
+        return self._in_fill_order(position for order_type in order_types for position in self._by_order_type.get(order_type, {}).values())
@@ -1,13 +1,14 @@
 from typing import Union
-from strategy import Strategy, Action
+from strategy import Strategy, Action, WakeUpSchedule
 from connectors.dbconnector import DBConnector
 import pandas as pd
-import copy
 from rich import print
 
 class Straddle(Strategy):
     def __init__(self, config, dbconnector: DBConnector):
         super().__init__(config, dbconnector)
+        self.entry_time = self.calendar.time_of_day(self.config.entry_timestamp)     # Integer time of day, compared against every bar
+        self.exit_time = self.calendar.time_of_day(self.config.exit_timestamp)
 
         assert self.config.long_or_short in ["long", "short"], f"Position must be either 'long' or 'short'. Given {self.config.long_or_short}"
         assert self.config.call_risk > 0, f"call_risk must be positive. Given {self.config.call_risk}"
@@ -17,11 +18,6 @@ class Straddle(Strategy):
         self.name = self.__class__.__name__
         self.strike = None  # Will be set at the time of action
 
-        # Params common to all strategies
-        self.position = [] # will contain orders that are 'filled'
-        self.outstanding_orders = None # will change later according to orders other than filled
-        self.position_tally = {}    # Will contain the tally of each filled --> squared of position
-
     def square_off_actions(self, square_off_ids: set[int] | None = None) -> list[Action]:
         '''Return all the actions required to square off the open positions at market order'''
         
@@ -32,11 +28,10 @@ class Straddle(Strategy):
                 opposite_action.square_off_id = pos['hash']
                 actions.append(opposite_action)
         elif square_off_ids and len(square_off_ids) > 0:
-            for pos in self.position:
-                if pos['hash'] in square_off_ids:
-                    opposite_action = pos['action'].opposite_action()
-                    opposite_action.square_off_id = pos['hash']
-                    actions.append(opposite_action)
+            for pos in self.position.select(square_off_ids):     # Looked up by hash, in fill order
+                opposite_action = pos['action'].opposite_action()
+                opposite_action.square_off_id = pos['hash']
+                actions.append(opposite_action)
 
         return actions
     
@@ -62,7 +57,7 @@ class Straddle(Strategy):
     def action(self, timestamp: pd.Timestamp) -> list[Action] | None:
 
         actions = None
-        if timestamp.time() == self.config.entry_timestamp.time(): 
+        if self.calendar.time_of_day(timestamp) == self.entry_time: 
             
             self.strike = self.dbconnector.get_ATM_strike(timestamp)
             closest_expiry = self.dbconnector.get_closest_expiry(timestamp)
@@ -78,7 +73,7 @@ class Straddle(Strategy):
             
             actions = [atm_call_action, atm_put_action]
 
-        elif timestamp.time() == self.config.exit_timestamp.time(): 
+        elif self.calendar.time_of_day(timestamp) == self.exit_time: 
             actions = self.square_off_actions()
         # else:
         #     pass
@@ -92,32 +87,9 @@ class Straddle(Strategy):
             #     actions = self.square_off_actions(square_off_ids)
 
         return actions
-    
-    def on_trade_execution(self, metadata: list[dict], outstanding_orders: list):
-        '''
-        metadata: List of `filled` orders.
-        outstanding_orders: `unfulfilled` orders
-        '''
-        self.outstanding_orders = copy.deepcopy(outstanding_orders)
-
-        for filled_position in metadata:
-            # 1. If this is a square_off order, clear from self.position
-            if filled_position['action'].square_off_id:
-                position_to_remove = None
-                for our_position in self.position:
-                    if our_position['hash'] == filled_position['action'].square_off_id:
-                        position_to_remove = our_position
-                        break
-                
-                assert position_to_remove, f"INVALID SQUARE-OFF. A filled position does not exist in {self.position}."
-                self.position_tally[filled_position['action'].square_off_id]['closed'] = filled_position 
-                self.position.remove(position_to_remove)
-            # 2. Else, simply add to self.position
-            else:
-                self.position.append(filled_position)
-                self.position_tally[filled_position['hash']] = {}   
-                self.position_tally[filled_position['hash']]['opened'] = filled_position 
-                self.position_tally[filled_position['hash']]['closed'] = None 
+
+    def wake_up_schedule(self) -> WakeUpSchedule:
+        return WakeUpSchedule(times=(self.config.entry_timestamp, self.config.exit_timestamp))     # Leg stops are run by the BackTester
 
     def about(self) -> str:
         
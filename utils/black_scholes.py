@@ -0,0 +1,121 @@
+import numpy as np
+import pandas as pd
+
+NS_PER_YEAR = 365 * 24 * 60 * 60 * 10**9
+SQRT_2PI = np.sqrt(2 * np.pi)
+GREEK_FIELDS = ("iv", "delta", "gamma", "vega", "theta")
+IV_BOUNDS = (1e-4, 5.0)     # Implied volatility search interval (0.01% to 500% annualised)
+EXPIRY_TIME = "15:30"       # Options expire at the close of the expiry session
+
+
+def norm_pdf(x):
+    x = np.asarray(x, dtype=np.float64)
+    return np.exp(-0.5 * x * x) / SQRT_2PI
+
+
+def norm_cdf(x):
+    '''Standard normal CDF to double precision without scipy (Hart 1968, as given by West 2005 "Better approximations to cumulative normal functions")'''
+    x = np.asarray(x, dtype=np.float64)
+    a = np.abs(x)
+    exponential = np.exp(-0.5 * a * a)
+    numerator = ((((((3.52624965998911e-02 * a + 0.700383064443688) * a + 6.37396220353165) * a + 33.912866078383) * a
+                  + 112.079291497871) * a + 221.213596169931) * a + 220.206867912376)
+    denominator = (((((((8.83883476483184e-02 * a + 1.75566716318264) * a + 16.064177579207) * a + 86.7807322029461) * a
+                     + 296.564248779674) * a + 637.333633378831) * a + 793.826512519948) * a + 440.413735824752)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        continued_fraction = exponential / (a + 1 / (a + 2 / (a + 3 / (a + 4 / (a + 0.65))))) / 2.506628274631
+    tail = np.where(a < 7.07106781186547, exponential * numerator / denominator, continued_fraction)
+    tail = np.where(a > 37, 0.0, tail)
+    return np.where(x > 0, 1 - tail, tail)
+
+
+def time_to_expiry(timestamps, expiry: str) -> np.ndarray:
+    '''Years (365 days) from every timestamp to the expiry close, floored at 0'''
+    expiry_ns = pd.Timestamp(f"{expiry} {EXPIRY_TIME}").as_unit("ns").value
+    ns = pd.DatetimeIndex(timestamps).as_unit("ns").asi8
+    return np.maximum(expiry_ns - ns, 0) / NS_PER_YEAR
+
+
+def _d1_d2(spot, strike, tau, sigma, rate):
+    with np.errstate(divide='ignore', invalid='ignore'):
+        sigma_sqrt_tau = sigma * np.sqrt(tau)
+        d1 = (np.log(spot / strike) + (rate + 0.5 * sigma * sigma) * tau) / sigma_sqrt_tau
+    return d1, d1 - sigma_sqrt_tau
+
+
+def bs_price(spot, strike, tau, sigma, rate, is_call):
+    '''European Black-Scholes price, every argument broadcasts (is_call: bool array, True for CE)'''
+    spot, strike, tau, sigma = (np.asarray(v, dtype=np.float64) for v in (spot, strike, tau, sigma))
+    d1, d2 = _d1_d2(spot, strike, tau, sigma, rate)
+    discounted_strike = strike * np.exp(-rate * tau)
+    call = spot * norm_cdf(d1) - discounted_strike * norm_cdf(d2)
+    put = discounted_strike * norm_cdf(-d2) - spot * norm_cdf(-d1)
+    return np.where(is_call, call, put)
+
+
+def implied_volatility(price, spot, strike, tau, rate, is_call, tol: float = 1e-6, max_iter: int = 100) -> np.ndarray:
+    '''
+    Batched implied volatility: Newton steps on every element at once, falling back to bisection whenever a step leaves the bracket
+    (so it converges even for deep OTM options where vega ~ 0). NaN where tau <= 0 or price is outside the no-arbitrage bounds.
+    '''
+    price, spot, strike, tau = np.broadcast_arrays(*(np.asarray(v, dtype=np.float64) for v in (price, spot, strike, tau)))
+    is_call = np.broadcast_to(is_call, price.shape)
+    discounted_strike = strike * np.exp(-rate * tau)
+    lower_bound = np.where(is_call, np.maximum(spot - discounted_strike, 0.0), np.maximum(discounted_strike - spot, 0.0))
+    upper_bound = np.where(is_call, spot, discounted_strike)
+    solvable = (tau > 0) & (price > lower_bound) & (price < upper_bound) & np.isfinite(price) & np.isfinite(spot)
+
+    low = np.full(price.shape, IV_BOUNDS[0])
+    high = np.full(price.shape, IV_BOUNDS[1])
+    sigma = np.full(price.shape, 0.2)
+    active = solvable.copy()
+    for _ in range(max_iter):
+        if not active.any():
+            break
+        p, s, k, t, c, v = price[active], spot[active], strike[active], tau[active], is_call[active], sigma[active]
+        diff = bs_price(s, k, t, v, rate, c) - p
+        d1, _ = _d1_d2(s, k, t, v, rate)
+        vega = s * norm_pdf(d1) * np.sqrt(t)
+
+        lo, hi = low[active], high[active]
+        lo, hi = np.where(diff < 0, v, lo), np.where(diff > 0, v, hi)    # Price is increasing in sigma
+        with np.errstate(divide='ignore', invalid='ignore', over='ignore'):
+            newton = v - diff / vega
+        next_v = np.where((newton > lo) & (newton < hi) & np.isfinite(newton), newton, 0.5 * (lo + hi))
+
+        done = (np.abs(diff) < tol * np.maximum(p, 1.0)) | (hi - lo < tol)
+        low[active], high[active], sigma[active] = lo, hi, np.where(done, v, next_v)
+        active[np.flatnonzero(active)[done]] = False
+
+    return np.where(solvable, sigma, np.nan)
+
+
+def greeks(spot, strike, tau, sigma, rate, is_call) -> dict:
+    '''
+    Black-Scholes Greeks, every argument broadcasts.
+    delta, gamma per 1 point of spot, vega per 1% (0.01) of volatility, theta per calendar day.
+    '''
+    spot, strike, tau, sigma = (np.asarray(v, dtype=np.float64) for v in (spot, strike, tau, sigma))
+    d1, d2 = _d1_d2(spot, strike, tau, sigma, rate)
+    pdf_d1 = norm_pdf(d1)
+    sqrt_tau = np.sqrt(tau)
+    discounted_strike = strike * np.exp(-rate * tau)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        gamma = pdf_d1 / (spot * sigma * sqrt_tau)
+        theta_common = -spot * pdf_d1 * sigma / (2 * sqrt_tau)
+    return {
+        'delta': np.where(is_call, norm_cdf(d1), norm_cdf(d1) - 1.0),
+        'gamma': gamma,
+        'vega': spot * pdf_d1 * sqrt_tau / 100,
+        'theta': np.where(is_call, theta_common - rate * discounted_strike * norm_cdf(d2), theta_common + rate * discounted_strike * norm_cdf(-d2)) / 365,
+    }
+
+
+def option_greeks_frame(df_option: pd.DataFrame, spot: pd.Series, option_type: str, strike: int | float, expiry: str, rate: float, price_field: str = 'close') -> pd.DataFrame:
+    '''GREEK_FIELDS columns for every row of an option dataframe, using spot (e.g. df_spot['close']) at the same timestamps. NaN where spot or IV is unavailable.'''
+    assert option_type in ["CE", "PE"], "Option type must be 'CE' or 'PE'"
+    spot_price = spot.reindex(df_option.index).to_numpy(dtype=np.float64)
+    tau = time_to_expiry(df_option.index, expiry)
+    is_call = option_type == "CE"
+    iv = implied_volatility(df_option[price_field].to_numpy(dtype=np.float64), spot_price, float(strike), tau, rate, is_call)
+    return pd.DataFrame({'iv': iv, **greeks(spot_price, float(strike), tau, iv, rate, is_call)}, index=df_option.index)
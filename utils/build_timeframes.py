@@ -0,0 +1,66 @@
+import os
+import sys
+import json
+import argparse
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from constants import GLOBAL_DB_FOLDERPATH, TIMEFRAMES_DB_FOLDERPATH, TIMEFRAME_MINUTES, PYRAMID_TIMEFRAMES
+from utils.data_utils import read_parquet_data, resample_ohlcv, timeframe_path, source_signature, read_timeframe_data, TIMEFRAME_METADATA_KEY
+from utils.compact_database import iter_database_files
+
+
+def build_file_timeframes(source_path: str | Path, database_path: str | Path = GLOBAL_DB_FOLDERPATH, timeframes_root: str | Path = TIMEFRAMES_DB_FOLDERPATH,
+                          timeframes: tuple = PYRAMID_TIMEFRAMES, force: bool = False) -> int:
+    """Write the timeframe bars of one minute file (session-aligned, see resample_ohlcv). Returns the number of timeframes written (up to date ones are skipped)."""
+    stale = [tf for tf in timeframes if force or read_timeframe_data(source_path, tf, database_path, timeframes_root) is None]
+    if not stale:
+        return 0
+
+    df = read_parquet_data(source_path)   # Read the minute data once for every timeframe
+    signature = source_signature(source_path)
+    for timeframe in stale:
+        df_resampled = resample_ohlcv(df, interval=TIMEFRAME_MINUTES[timeframe], origin="session")
+        table = pa.Table.from_pandas(df_resampled, preserve_index=True)
+        marker = json.dumps({'timeframe': timeframe, **signature}).encode("utf-8")
+        table = table.replace_schema_metadata({**(table.schema.metadata or {}), TIMEFRAME_METADATA_KEY: marker})
+
+        file_path = timeframe_path(source_path, timeframe, database_path, timeframes_root)
+        file_path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = file_path.with_name(file_path.name + ".tmp")
+        pq.write_table(table, tmp_path, compression='zstd')
+        os.replace(tmp_path, file_path)
+    return len(stale)
+
+
+def _build_one(args: tuple) -> int:
+    return build_file_timeframes(*args)
+
+
+def build_timeframes(database_path: str | Path = GLOBAL_DB_FOLDERPATH, timeframes_root: str | Path = TIMEFRAMES_DB_FOLDERPATH, timeframes: tuple = PYRAMID_TIMEFRAMES,
+                     force: bool = False, max_workers: int = None) -> dict:
+    """Build the timeframe pyramid of every spot index and option file of the database tree in parallel"""
+    for timeframe in timeframes:
+        assert timeframe in TIMEFRAME_MINUTES and timeframe != "1m", f"Unknown timeframe {timeframe}. Choose from {[tf for tf in TIMEFRAME_MINUTES if tf != '1m']}"
+    file_paths = [str(p) for p in iter_database_files(database_path)]
+    with ProcessPoolExecutor(max_workers=max_workers) as executor:
+        written = list(executor.map(_build_one, [(p, database_path, timeframes_root, tuple(timeframes), force) for p in file_paths], chunksize=16))
+    return {'files': len(file_paths), 'rebuilt_files': sum(1 for w in written if w), 'written': sum(written)}
+
+
+if __name__ == "__main__":
+    '''Precompute 5m/15m/1h/1d bars (re-runnable, only changed files are rebuilt) :: python utils/build_timeframes.py [--database_path ./database]'''
+    parser = argparse.ArgumentParser(description="Resample every minute file of the database into the timeframe pyramid")
+    parser.add_argument("--database_path", type=str, default=str(GLOBAL_DB_FOLDERPATH), help="Root of the database tree (contains indices/ and options/)")
+    parser.add_argument("--timeframes_root", type=str, default=None, help="Output root (default: <database_path>/timeframes)")
+    parser.add_argument("--timeframes", type=str, nargs="+", default=list(PYRAMID_TIMEFRAMES), help="Timeframes to build")
+    parser.add_argument("--force", action="store_true", help="Rebuild files that are already up to date")
+    parser.add_argument("--max_workers", type=int, default=None, help="Worker processes (default: number of CPUs)")
+    args = parser.parse_args()
+
+    timeframes_root = args.timeframes_root or os.path.join(args.database_path, "timeframes")
+    summary = build_timeframes(args.database_path, timeframes_root, tuple(args.timeframes), force=args.force, max_workers=args.max_workers)
+    print(f"Timeframes {args.timeframes}: rebuilt {summary['rebuilt_files']} / {summary['files']} files ({summary['written']} timeframe files written) into {timeframes_root}")
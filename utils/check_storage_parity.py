@@ -0,0 +1,108 @@
+import os
+import sys
+import argparse
+import numpy as np
+import pandas as pd
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from constants import GLOBAL_DB_FOLDERPATH, NIFTY_EXPIRIES_JSON_PATH, NIFTY_PARQUET_PATH
+from connectors.array_store import ArrayOptionStore
+from connectors.dbconnector import DBConnector, STORAGE_ENGINES
+from utils.consolidate_database import outdated_expiries
+
+
+def _outcome(call):
+    '''Result of call(), or the exception type it raised (both engines must raise the same way, e.g. KeyError for a missing bar)'''
+    try:
+        return call()
+    except (KeyError, AssertionError) as e:
+        return type(e)
+
+
+def _same(a, b) -> bool:
+    if isinstance(a, type) or isinstance(b, type):
+        return a is b
+    if isinstance(a, pd.DataFrame):
+        try:
+            pd.testing.assert_frame_equal(a.sort_index(), b.sort_index(), check_freq=False)    # Row order is engine specific (array rows are sorted)
+            return True
+        except AssertionError:
+            return False
+    if isinstance(a, np.void):  # BAR_DTYPE record, compare bit for bit (NaN fields included)
+        return a.dtype == b.dtype and a.tobytes() == b.tobytes()
+    if isinstance(a, np.ndarray):
+        return a.shape == b.shape and np.array_equal(a, b, equal_nan=True)
+    return a == b or (a != a and b != b)
+
+
+def check_storage_parity(reference: DBConnector, candidate: DBConnector, ticker: str = None, max_contracts: int | None = 50, samples: int = 20, seed: int = 0) -> dict:
+    """
+    Compare every accessor of two connectors (usually storage="parquet" against another engine) on the contracts of the database tree:
+    get_option_df (full and projected/time-sliced), get_option_price for every OHLC field, get_option_bar, get_prices and get_bar_fields, at bars that exist
+    and at timestamps that do not (both must raise KeyError). Returns the counts and the first mismatches.
+    """
+    ticker = ticker if ticker else reference.ticker
+    rng = np.random.default_rng(seed)
+    contracts = list(ArrayOptionStore(reference.database_path).iter_source_contracts(ticker))
+    if max_contracts is not None and len(contracts) > max_contracts:
+        contracts = [contracts[i] for i in sorted(rng.choice(len(contracts), max_contracts, replace=False))]
+
+    checks, mismatches = 0, []
+
+    def compare(what: str, call_reference, call_candidate):
+        nonlocal checks
+        checks += 1
+        expected, given = _outcome(call_reference), _outcome(call_candidate)
+        if not _same(expected, given):
+            mismatches.append(what)
+
+    for contract in contracts:
+        args = dict(option_type=contract.option_type, strike=contract.strike, expiry_date=contract.expiry, ticker=contract.ticker)
+        df_option = reference.get_option_df(**args)
+        compare(f"{contract} get_option_df", lambda: reference.get_option_df(**args), lambda: candidate.get_option_df(**args))
+        if df_option.empty:
+            continue
+
+        index = df_option.index.sort_values()
+        start, end = index[len(index) // 4], index[3 * len(index) // 4]
+        compare(f"{contract} get_option_df(columns, start, end)", lambda: reference.get_option_df(**args, columns=['close', 'high'], start=start, end=end),
+                lambda: candidate.get_option_df(**args, columns=['close', 'high'], start=start, end=end))
+
+        timestamps = list(index[rng.integers(0, len(index), samples)])
+        timestamps += [index[0] - pd.Timedelta(days=1), index[-1] + pd.Timedelta(minutes=1), index[0] + pd.Timedelta(seconds=30)]   # No bar there
+        for timestamp in timestamps:
+            for field in ("open", "high", "low", "close"):
+                compare(f"{contract} get_option_price({timestamp}, {field})", lambda: reference.get_option_price(timestamp=timestamp, field=field, **args),
+                        lambda: candidate.get_option_price(timestamp=timestamp, field=field, **args))
+            compare(f"{contract} get_option_bar({timestamp})", lambda: reference.get_option_bar(contract, timestamp), lambda: candidate.get_option_bar(contract, timestamp))
+        compare(f"{contract} get_prices", lambda: reference.get_prices([contract], timestamps, fill_missing=True), lambda: candidate.get_prices([contract], timestamps, fill_missing=True))
+        compare(f"{contract} get_bar_fields", lambda: np.vstack(reference.get_bar_fields(contract, timestamps)), lambda: np.vstack(candidate.get_bar_fields(contract, timestamps)))
+
+    return {'contracts': len(contracts), 'checks': checks, 'mismatches': len(mismatches), 'first_mismatches': mismatches[:20]}
+
+
+if __name__ == "__main__":
+    '''Check that a storage engine serves exactly what the pandas/parquet path serves :: python utils/check_storage_parity.py --storage arrow'''
+    parser = argparse.ArgumentParser(description="Compare the accessors of a DBConnector storage engine against storage='parquet'")
+    parser.add_argument("--storage", type=str, default="arrow", choices=[s for s in STORAGE_ENGINES if s != "parquet"], help="Engine to check")
+    parser.add_argument("--database_path", type=str, default=str(GLOBAL_DB_FOLDERPATH), help="Root of the database tree (contains indices/ and options/)")
+    parser.add_argument("--expiries_json_path", type=str, default=str(NIFTY_EXPIRIES_JSON_PATH), help="Expiry calendar")
+    parser.add_argument("--spot_parquet_path", type=str, default=str(NIFTY_PARQUET_PATH), help="Spot minute data")
+    parser.add_argument("--max_contracts", type=int, default=50, help="Contracts sampled from the options tree (0: all)")
+    parser.add_argument("--samples", type=int, default=20, help="Timestamps checked per contract")
+    args = parser.parse_args()
+
+    if args.storage == "consolidated":
+        # The consolidated dataset is an explicit build step: compare against a stale or missing one and every contract of it would mismatch (or not open)
+        outdated = outdated_expiries(args.database_path, os.path.join(args.database_path, "consolidated"))
+        if outdated:
+            print(f"{len(outdated)} expiries are not consolidated or out of date (e.g. {outdated[:3]}), run first :: python utils/consolidate_database.py --database_path {args.database_path}")
+            sys.exit(2)
+
+    paths = dict(database_path=args.database_path, expiries_json_path=args.expiries_json_path, spot_parquet_path=args.spot_parquet_path)
+    summary = check_storage_parity(DBConnector(**paths, storage="parquet"), DBConnector(**paths, storage=args.storage),
+                                   max_contracts=args.max_contracts or None, samples=args.samples)
+    print(f"{args.storage} vs parquet: {summary['checks']} checks on {summary['contracts']} contracts, {summary['mismatches']} mismatches")
+    for mismatch in summary['first_mismatches']:
+        print(f"  {mismatch}")
+    sys.exit(1 if summary['mismatches'] else 0)
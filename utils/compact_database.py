@@ -0,0 +1,101 @@
+import os
+import sys
+import json
+import argparse
+from pathlib import Path
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from constants import GLOBAL_DB_FOLDERPATH
+from utils.data_utils import COMPACTED_METADATA_KEY
+
+COMPACTION_VERSION = 2     # 2: price columns stay float64 (version 1 stored them as float32 when exact, which changed float64 PnL arithmetic)
+DEFAULT_ROW_GROUP_SIZE = 16_384     # ~44 sessions of 1-minute bars per row group, small enough for time-range pruning
+
+
+def narrow_dtypes(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Downcast integer columns to the narrowest dtype that holds every value (never below int32). Float columns are left as they are:
+    a float32 price column is exact on storage but the backtester's float64 arithmetic on it (stop levels, diff/cumsum of PnL) is not.
+    """
+    df = df.copy()
+    for column in df.columns:
+        series = df[column]
+        if pd.api.types.is_integer_dtype(series) and not pd.api.types.is_bool_dtype(series):
+            narrowed = pd.to_numeric(series, downcast='integer')
+            df[column] = narrowed if narrowed.dtype.itemsize >= 4 else narrowed.astype(np.int32)  # Not below int32 so that sums (volume, oi) cannot overflow
+    return df
+
+
+def compaction_version(file_path: str | Path) -> int | None:
+    """COMPACTION_VERSION the file was compacted with, None if it was never compacted. Only reads the footer."""
+    marker = (pq.read_schema(file_path).metadata or {}).get(COMPACTED_METADATA_KEY)
+    return None if marker is None else json.loads(marker).get('version', 1)
+
+
+def compact_parquet_file(file_path: str | Path, row_group_size: int = DEFAULT_ROW_GROUP_SIZE, force: bool = False) -> dict:
+    """
+    Rewrite one parquet file in place: duplicate indices dropped (keep='first', same as read_parquet_data), sorted by index,
+    narrow dtypes, row groups of row_group_size rows, and COMPACTED_METADATA_KEY in the file metadata.
+    """
+    file_path = Path(file_path)
+    bytes_before = file_path.stat().st_size
+    version = compaction_version(file_path)
+    if not force and version is not None and version >= COMPACTION_VERSION:
+        return {'file': str(file_path), 'skipped': True, 'bytes_before': bytes_before, 'bytes_after': bytes_before}
+
+    df = pd.read_parquet(file_path)
+    if version is not None and version < 2:
+        df = df.astype({column: np.float64 for column in df.columns if df[column].dtype == np.float32})    # Undo version 1's float32 narrowing (lossless)
+    rows_before = len(df)
+    df = df[~df.index.duplicated(keep='first')]
+    df = df.sort_index(kind='stable')
+    df = narrow_dtypes(df)
+
+    table = pa.Table.from_pandas(df, preserve_index=True)
+    marker = json.dumps({'version': COMPACTION_VERSION, 'rows_before': rows_before, 'duplicates_dropped': rows_before - len(df)}).encode("utf-8")
+    table = table.replace_schema_metadata({**(table.schema.metadata or {}), COMPACTED_METADATA_KEY: marker})
+
+    # Write next to the original and rename so that an interrupted run never leaves a truncated file
+    tmp_path = file_path.with_name(file_path.name + ".tmp")
+    pq.write_table(table, tmp_path, row_group_size=row_group_size, compression='zstd')
+    os.replace(tmp_path, file_path)
+
+    return {'file': str(file_path), 'skipped': False, 'rows_before': rows_before, 'rows_after': len(df),
+            'bytes_before': bytes_before, 'bytes_after': file_path.stat().st_size}
+
+
+def iter_database_files(database_path: str | Path):
+    """Every parquet file of the options tree and of database/indices"""
+    database_path = Path(database_path)
+    yield from sorted((database_path / "indices").glob("*.parquet"))
+    yield from sorted((database_path / "options").glob("*/*/expiry__*/strike__*.parquet"))
+
+
+def compact_database(database_path: str | Path = GLOBAL_DB_FOLDERPATH, row_group_size: int = DEFAULT_ROW_GROUP_SIZE, force: bool = False) -> dict:
+    """Compact every file of the database tree. Files already compacted with the current COMPACTION_VERSION are skipped unless force=True."""
+    summary = {'files': 0, 'compacted': 0, 'skipped': 0, 'duplicates_dropped': 0, 'bytes_before': 0, 'bytes_after': 0}
+    for file_path in iter_database_files(database_path):
+        result = compact_parquet_file(file_path, row_group_size=row_group_size, force=force)
+        summary['files'] += 1
+        summary['skipped' if result['skipped'] else 'compacted'] += 1
+        summary['duplicates_dropped'] += result.get('rows_before', 0) - result.get('rows_after', 0)
+        summary['bytes_before'] += result['bytes_before']
+        summary['bytes_after'] += result['bytes_after']
+    return summary
+
+
+if __name__ == "__main__":
+    '''One-shot (re-runnable) compaction of the database tree :: python utils/compact_database.py [--database_path ./database]'''
+    parser = argparse.ArgumentParser(description="Sort, de-duplicate and re-encode the parquet files of the database")
+    parser.add_argument("--database_path", type=str, default=str(GLOBAL_DB_FOLDERPATH), help="Root of the database tree (contains indices/ and options/)")
+    parser.add_argument("--row_group_size", type=int, default=DEFAULT_ROW_GROUP_SIZE, help="Rows per parquet row group")
+    parser.add_argument("--force", action="store_true", help="Rewrite files that are already compacted with the current version")
+    args = parser.parse_args()
+
+    summary = compact_database(args.database_path, row_group_size=args.row_group_size, force=args.force)
+    print(f"Compacted {summary['compacted']} / {summary['files']} files ({summary['skipped']} already compacted), "
+          f"dropped {summary['duplicates_dropped']} duplicate rows, {summary['bytes_before'] / 1e6:.1f} MB --> {summary['bytes_after'] / 1e6:.1f} MB")
@@ -0,0 +1,183 @@
+import os
+import sys
+import json
+import time
+import argparse
+from pathlib import Path
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from constants import GLOBAL_DB_FOLDERPATH, CONSOLIDATED_DB_FOLDERPATH
+from utils.data_utils import read_option_data, consolidated_expiry_path, parquet_index_column, parquet_index_name, CONSOLIDATED_METADATA_KEY
+
+CONSOLIDATION_VERSION = 3     # 2: the marker keeps the per-strike index name (None if unnamed) apart from the timestamp column name. 3: strikes of one expiry may differ in columns / dtypes
+DEFAULT_ROW_GROUP_SIZE = 16_384     # Same as utils/compact_database.py. Every contract starts a new row group, so one contract is never split across fewer reads than needed
+
+
+def _expiry_sources(database_path: Path, ticker: str, expiry: str) -> dict:
+    """"<option_type>/<strike>" --> [size, mtime_ns] of every per-strike file of the expiry"""
+    sources = {}
+    for option_type in ("CE", "PE"):
+        expiry_dir = database_path / "options" / ticker / option_type / f"expiry__{expiry}"
+        for strike_path in sorted(expiry_dir.glob("strike__*.parquet")):
+            stat = strike_path.stat()
+            sources[f"{option_type}/{int(strike_path.stem.split('__', 1)[1])}"] = [stat.st_size, stat.st_mtime_ns]
+    return sources
+
+
+def _source_schema(file_path: Path) -> tuple[pa.Schema, str | None]:
+    """(index column + value columns, index name) of a per-strike file, from its footer only. The index column is named as in the consolidated file ("timestamp" if unnamed)."""
+    schema = pq.read_schema(file_path)
+    metadata = schema.metadata or {}
+    index_column = parquet_index_column(metadata)
+    assert index_column is not None, f"No named index column in {file_path}"
+    index_name = parquet_index_name(metadata, index_column)
+    fields = [field for field in schema if field.name != index_column]
+    return pa.schema([schema.field(index_column).with_name(index_name or "timestamp"), *fields]), index_name
+
+
+def is_up_to_date(file_path: str | Path, sources: dict) -> bool:
+    """True if the consolidated expiry file exists, was written by this CONSOLIDATION_VERSION and from exactly these per-strike files"""
+    if not os.path.exists(file_path):
+        return False
+    metadata = pq.read_schema(file_path).metadata or {}
+    if CONSOLIDATED_METADATA_KEY not in metadata:
+        return False
+    marker = json.loads(metadata[CONSOLIDATED_METADATA_KEY])
+    return marker.get("version") == CONSOLIDATION_VERSION and marker.get("sources") == sources
+
+
+def outdated_expiries(database_path: str | Path, consolidated_path: str | Path = CONSOLIDATED_DB_FOLDERPATH, ticker: str = "NIFTY") -> list[str]:
+    """Expiries of the per-strike tree whose consolidated file is missing or out of date (consolidate_database would rewrite them)"""
+    database_path = Path(database_path)
+    return [expiry for expiry in iter_expiries(database_path, ticker)
+            if not is_up_to_date(consolidated_expiry_path(expiry, consolidated_path, ticker), _expiry_sources(database_path, ticker, expiry))]
+
+
+def consolidate_expiry(database_path: str | Path, ticker: str, expiry: str, consolidated_path: str | Path = CONSOLIDATED_DB_FOLDERPATH,
+                       row_group_size: int = DEFAULT_ROW_GROUP_SIZE, force: bool = False) -> dict:
+    """
+    Write every contract of (ticker, expiry) into one parquet file with option_type, strike and timestamp columns, sorted by (option_type, strike, timestamp).
+    Contracts are de-duplicated (keep='first', same as read_option_data) and each starts a new row group, so the row-group statistics
+    locate a contract exactly. Skipped when the file is up to date with its sources unless force=True.
+    The file schema unifies the footers of every strike (int32 / int64 widen to int64, missing columns are null). A strike whose own columns differ
+    from it keeps them in the marker's "column_types", so reads return what read_option_data would.
+    """
+    database_path = Path(database_path)
+    file_path = Path(consolidated_expiry_path(expiry, consolidated_path, ticker))
+    sources = _expiry_sources(database_path, ticker, expiry)
+    assert sources, f"No option files for {ticker} expiry {expiry} in {database_path}"
+
+    if not force and is_up_to_date(file_path, sources):
+        return {'expiry': expiry, 'skipped': True, 'contracts': len(sources), 'rows': 0}
+
+    keys = sorted(sources, key=lambda k: (k.split("/")[0], int(k.split("/")[1])))
+    source_schemas, index_names = {}, set()
+    for key in keys:
+        option_type, strike = key.split("/")
+        source_schemas[key], index_name = _source_schema(database_path / "options" / ticker / option_type / f"expiry__{expiry}" / f"strike__{strike}.parquet")
+        index_names.add(index_name)
+    assert len(index_names) == 1, f"Strikes of {ticker} expiry {expiry} have different index names {index_names}"
+    index_name = index_names.pop()
+    index_column = index_name or "timestamp"
+    value_schema = pa.unify_schemas(list(source_schemas.values()), promote_options="permissive")   # Widens int32 + int64 to int64, int + float to float
+    column_types = {key: {field.name: str(field.type) for field in source_schema if field.name != index_column}     # Strikes that differ from the file schema
+                    for key, source_schema in source_schemas.items() if not source_schema.equals(value_schema)}
+    marker = json.dumps({'version': CONSOLIDATION_VERSION, 'index_column': index_column, 'index_name': index_name, 'sources': sources,
+                         'column_types': column_types}).encode("utf-8")
+    schema = pa.schema([pa.field("option_type", pa.string()), pa.field("strike", pa.int32()), *value_schema], metadata={CONSOLIDATED_METADATA_KEY: marker})
+
+    file_path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = file_path.with_name(file_path.name + ".tmp")
+    rows = 0
+    try:
+        with pq.ParquetWriter(tmp_path, schema, compression='zstd') as writer:
+            for key in keys:
+                option_type, strike = key.split("/")
+                df = read_option_data(option_type=option_type, strike=int(strike), expiry_date=expiry, db_folderpath=database_path, ticker=ticker)
+                df = df.sort_index(kind='stable')
+                table = pa.Table.from_pandas(df.rename_axis(index_column).reset_index(), preserve_index=False)
+                columns = {"option_type": pa.array([option_type] * len(df), type=pa.string()), "strike": pa.array([int(strike)] * len(df), type=pa.int32())}
+                for field in value_schema:      # Columns this strike does not have are written as nulls
+                    columns[field.name] = table.column(field.name) if field.name in table.column_names else pa.nulls(len(df), type=field.type)
+                writer.write_table(pa.table(columns).cast(schema), row_group_size=row_group_size)
+                rows += len(df)
+    except BaseException:
+        tmp_path.unlink(missing_ok=True)    # Never leave a partial expiry behind
+        raise
+    os.replace(tmp_path, file_path)     # Readers never see a half written expiry
+    return {'expiry': expiry, 'skipped': False, 'contracts': len(sources), 'rows': rows}
+
+
+def iter_expiries(database_path: str | Path, ticker: str = "NIFTY"):
+    """Every expiry of the per-strike options tree of a ticker"""
+    database_path = Path(database_path)
+    expiries = set()
+    for option_type in ("CE", "PE"):
+        expiries.update(p.name.split("__", 1)[1] for p in (database_path / "options" / ticker / option_type).glob("expiry__*"))
+    yield from sorted(expiries)
+
+
+def consolidate_database(database_path: str | Path = GLOBAL_DB_FOLDERPATH, consolidated_path: str | Path = CONSOLIDATED_DB_FOLDERPATH, ticker: str = "NIFTY",
+                         row_group_size: int = DEFAULT_ROW_GROUP_SIZE, force: bool = False) -> dict:
+    """Consolidate every expiry of a ticker. Expiries whose files did not change since the last run are skipped unless force=True."""
+    summary = {'expiries': 0, 'consolidated': 0, 'skipped': 0, 'contracts': 0, 'rows': 0}
+    for expiry in iter_expiries(database_path, ticker):
+        result = consolidate_expiry(database_path, ticker, expiry, consolidated_path, row_group_size=row_group_size, force=force)
+        summary['expiries'] += 1
+        summary['skipped' if result['skipped'] else 'consolidated'] += 1
+        summary['contracts'] += result['contracts']
+        summary['rows'] += result['rows']
+    return summary
+
+
+def benchmark_expiry(database_path: str | Path, consolidated_path: str | Path, ticker: str, expiry: str) -> dict:
+    """Seconds to open and read every contract of an expiry from the per-strike tree vs the consolidated file (cold connector objects, warm OS cache)"""
+    from connectors.contract import Contract
+    from connectors.consolidated_store import ConsolidatedOptionStore
+
+    database_path = Path(database_path)
+    contracts = [Contract(ticker=ticker, option_type=key.split("/")[0], strike=int(key.split("/")[1]), expiry=expiry) for key in _expiry_sources(database_path, ticker, expiry)]
+
+    start = time.perf_counter()
+    for c in contracts:
+        read_option_data(option_type=c.option_type, strike=c.strike, expiry_date=c.expiry, db_folderpath=database_path, ticker=c.ticker)
+    per_strike_seconds = time.perf_counter() - start
+
+    start = time.perf_counter()
+    store = ConsolidatedOptionStore(consolidated_path)
+    for c in contracts:
+        store.load(c)
+    consolidated_seconds = time.perf_counter() - start
+
+    start = time.perf_counter()
+    pq.read_table(consolidated_expiry_path(expiry, consolidated_path, ticker))
+    whole_expiry_seconds = time.perf_counter() - start
+
+    return {'expiry': expiry, 'contracts': len(contracts), 'per_strike_seconds': per_strike_seconds,
+            'consolidated_seconds': consolidated_seconds, 'whole_expiry_seconds': whole_expiry_seconds}
+
+
+if __name__ == "__main__":
+    '''Build (or refresh) the per-expiry consolidated dataset :: python utils/consolidate_database.py [--database_path ./database] [--benchmark]'''
+    parser = argparse.ArgumentParser(description="Consolidate the one-file-per-strike options tree into one parquet file per (ticker, expiry)")
+    parser.add_argument("--database_path", type=str, default=str(GLOBAL_DB_FOLDERPATH), help="Root of the database tree (contains options/)")
+    parser.add_argument("--consolidated_path", type=str, default=None, help="Output root (default: <database_path>/consolidated)")
+    parser.add_argument("--ticker", type=str, default="NIFTY")
+    parser.add_argument("--row_group_size", type=int, default=DEFAULT_ROW_GROUP_SIZE, help="Max rows per parquet row group")
+    parser.add_argument("--force", action="store_true", help="Rewrite expiries that are already up to date")
+    parser.add_argument("--benchmark", action="store_true", help="After converting, time per-strike vs consolidated reads of every expiry")
+    args = parser.parse_args()
+    consolidated_path = args.consolidated_path or os.path.join(args.database_path, "consolidated")
+
+    summary = consolidate_database(args.database_path, consolidated_path, ticker=args.ticker, row_group_size=args.row_group_size, force=args.force)
+    print(f"Consolidated {summary['consolidated']} / {summary['expiries']} expiries ({summary['skipped']} up to date), "
+          f"{summary['contracts']} contracts, {summary['rows']} rows written")
+
+    if args.benchmark:
+        results = pd.DataFrame([benchmark_expiry(args.database_path, consolidated_path, args.ticker, expiry) for expiry in iter_expiries(args.database_path, args.ticker)])
+        print(results.to_string(index=False))
+        print(f"Total :: per-strike files {results['per_strike_seconds'].sum():.2f}s | consolidated {results['consolidated_seconds'].sum():.2f}s "
+              f"| speedup x{results['per_strike_seconds'].sum() / results['consolidated_seconds'].sum():.1f}")
@@ -1,35 +1,285 @@
 import os
 import sys
+import json
+import time
+import threading
+from typing import Iterator
+import numpy as np
 import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
 from pathlib import Path
 
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
-from constants import GLOBAL_DB_FOLDERPATH
+from constants import GLOBAL_DB_FOLDERPATH, CONSOLIDATED_DB_FOLDERPATH, TIMEFRAMES_DB_FOLDERPATH, NSE_SESSION_OPEN
 
-def read_parquet_data(file_path: str | Path, drop_duplicate_indices: bool = True) -> pd.DataFrame:
-    """Read a Parquet file into a DataFrame, optionally removing duplicate indices."""
-    df = pd.read_parquet(file_path)
-    if drop_duplicate_indices:
+COMPACTED_METADATA_KEY = b"optilab.compacted"   # Parquet key-value metadata written by utils/compact_database.py
+CONSOLIDATED_METADATA_KEY = b"optilab.consolidated"     # Parquet key-value metadata written by utils/consolidate_database.py
+CONSOLIDATED_KEY_COLUMNS = ("option_type", "strike")    # Leading columns of a consolidated expiry file, rows are sorted by (option_type, strike, timestamp)
+DEFAULT_BATCH_SIZE = 65_536     # Rows per streamed batch (~18 hours of 1-second bars, ~170 sessions of 1-minute bars)
+
+class IOStats:
+    """
+    Process-wide counters of the data files read through this module and the option stores (thread-safe, prefetch threads read too).
+    - files_opened : parquet files read (and .npy files memory-mapped)
+    - bytes_read   : compressed bytes of the parquet column chunks decoded (see chunk_bytes)
+    - bytes_mapped : size of the memory-mapped arrays (paged in lazily, so an upper bound of what is actually read)
+    - rows_read / rows_deduped : rows decoded / dropped as duplicate timestamps
+    - read_seconds : wall time spent reading and decoding
+    DBConnector.stats() reports them relative to the connector's last reset_stats().
+    """
+    FIELDS = ('files_opened', 'bytes_read', 'bytes_mapped', 'rows_read', 'rows_deduped', 'read_seconds')
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counters = dict.fromkeys(self.FIELDS, 0)
+        self._counters['read_seconds'] = 0.0
+
+    def record(self, **amounts):
+        with self._lock:
+            for counter, amount in amounts.items():
+                self._counters[counter] += amount
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return dict(self._counters)
+
+IO_STATS = IOStats()
+
+def chunk_bytes(metadata: pq.FileMetaData, row_groups: list[int] | None = None, columns: list[str] | None = None) -> int:
+    """Compressed bytes of the column chunks of row_groups (default all) and columns (default all), i.e. what reading them fetches from disk"""
+    row_groups = range(metadata.num_row_groups) if row_groups is None else row_groups
+    total = 0
+    for i in row_groups:
+        row_group = metadata.row_group(i)
+        for j in range(row_group.num_columns):
+            chunk = row_group.column(j)
+            if columns is None or chunk.path_in_schema in columns:
+                total += chunk.total_compressed_size
+    return total
+
+def is_compacted(file_path: str | Path) -> bool:
+    """True if the file was rewritten by utils/compact_database.py (sorted, no duplicate indices). Only reads the footer."""
+    metadata = pq.read_schema(file_path).metadata or {}
+    return COMPACTED_METADATA_KEY in metadata
+
+def parquet_index_column(metadata: dict) -> str | None:
+    """Name of the stored index column from the pandas metadata of a parquet schema (None for a RangeIndex / no pandas metadata)"""
+    if b"pandas" not in metadata:
+        return None
+    index_columns = json.loads(metadata[b"pandas"]).get("index_columns", [])
+    return index_columns[0] if len(index_columns) == 1 and isinstance(index_columns[0], str) else None
+
+def parquet_index_name(metadata: dict, index_column: str) -> str | None:
+    """Name pandas gives the stored index column index_column: None for an unnamed index (stored under the __index_level_N__ placeholder), else the column name"""
+    for column in json.loads(metadata[b"pandas"]).get("columns", []) if b"pandas" in metadata else []:
+        if column.get("field_name") == index_column:
+            return column.get("name")
+    return index_column
+
+def read_parquet_data(
+    file_path: str | Path,
+    drop_duplicate_indices: bool = True,
+    columns: list[str] | None = None,
+    start: pd.Timestamp | str | None = None,
+    end: pd.Timestamp | str | None = None
+) -> pd.DataFrame:
+    """
+    Read a Parquet file into a DataFrame, optionally removing duplicate indices (skipped for compacted files, they have none).
+    columns : only read these columns (the index is always read)
+    start, end : only keep rows with start <= index <= end. Pushed down to pyarrow, so row groups outside the range are never decoded
+                 (compacted files are sorted with small row groups, see utils/compact_database.py).
+    """
+    read_start = time.perf_counter()
+    parquet_metadata = pq.read_metadata(file_path)
+    metadata = parquet_metadata.metadata or {}
+    index_column = parquet_index_column(metadata)
+    filters, row_groups = None, None
+    if start is not None or end is not None:
+        assert index_column is not None, f"start/end need a named index column in {file_path}"
+        filters = []
+        if start is not None:
+            filters.append((index_column, ">=", pd.Timestamp(start)))
+        if end is not None:
+            filters.append((index_column, "<=", pd.Timestamp(end)))
+        row_groups = row_groups_in_range(parquet_metadata, index_column, start, end)
+
+    df = pd.read_parquet(file_path, columns=columns, filters=filters)
+    rows_read = len(df)
+    if drop_duplicate_indices and COMPACTED_METADATA_KEY not in metadata:
         df = df[~df.index.duplicated(keep='first')]
+    IO_STATS.record(files_opened=1, bytes_read=chunk_bytes(parquet_metadata, row_groups, None if columns is None else [*columns, index_column]),
+                    rows_read=rows_read, rows_deduped=rows_read - len(df), read_seconds=time.perf_counter() - read_start)
     return df
 
+def row_groups_in_range(metadata: pq.FileMetaData, column: str, start: pd.Timestamp | str | None = None, end: pd.Timestamp | str | None = None,
+                        row_groups: list[int] | None = None) -> list[int]:
+    """Row groups (of row_groups, default all) whose min/max statistics of column overlap [start, end]. Groups without statistics are kept."""
+    row_groups = list(range(metadata.num_row_groups)) if row_groups is None else row_groups
+    if start is None and end is None:
+        return row_groups
+    names = [metadata.schema.column(j).name for j in range(metadata.num_columns)]
+    column_idx = names.index(column)
+    start = pd.Timestamp(start) if start is not None else None
+    end = pd.Timestamp(end) if end is not None else None
+
+    kept = []
+    for i in row_groups:
+        stats = metadata.row_group(i).column(column_idx).statistics
+        if stats is not None and stats.has_min_max and ((start is not None and pd.Timestamp(stats.max) < start) or (end is not None and pd.Timestamp(stats.min) > end)):
+            continue
+        kept.append(i)
+    return kept
+
+def frames_from_batches(batches, drop_duplicate_indices: bool, start, end, to_frame=lambda batch: batch.to_pandas()) -> Iterator[pd.DataFrame]:
+    """Range filter and cross-batch de-duplication (keep='first') of streamed record batches. Only the timestamps seen so far are remembered."""
+    start_ns = pd.Timestamp(start).as_unit("ns").value if start is not None else None
+    end_ns = pd.Timestamp(end).as_unit("ns").value if end is not None else None
+    seen = set()
+    batches = iter(batches)
+    while True:
+        read_start = time.perf_counter()    # Batches are decoded lazily, by next()
+        batch = next(batches, None)
+        if batch is None:
+            break
+        df = to_frame(batch)
+        ns = df.index.as_unit("ns").asi8
+        keep = np.ones(len(df), dtype=bool)
+        if start_ns is not None:
+            keep &= ns >= start_ns
+        if end_ns is not None:
+            keep &= ns <= end_ns
+        in_range = int(np.count_nonzero(keep))
+        if drop_duplicate_indices:
+            keep &= ~df.index.duplicated(keep='first')
+            keep &= np.fromiter((t not in seen for t in ns.tolist()), dtype=bool, count=len(ns))
+            seen.update(ns[keep].tolist())
+        IO_STATS.record(rows_read=len(df), rows_deduped=in_range - int(np.count_nonzero(keep)), read_seconds=time.perf_counter() - read_start)
+        if keep.any():
+            yield df if keep.all() else df[keep]
+
+def iter_parquet_data(
+    file_path: str | Path,
+    batch_size: int = DEFAULT_BATCH_SIZE,
+    drop_duplicate_indices: bool = True,
+    columns: list[str] | None = None,
+    start: pd.Timestamp | str | None = None,
+    end: pd.Timestamp | str | None = None
+) -> Iterator[pd.DataFrame]:
+    """
+    Streaming counterpart of read_parquet_data for data that does not fit in one DataFrame (1-second bars, ticks).
+    Yields DataFrames of at most batch_size rows, in file order, that concatenate to read_parquet_data(file_path, drop_duplicate_indices, columns, start, end).
+    Row groups outside [start, end] are skipped from their statistics and only one batch is decoded at a time.
+    Memory is bounded by batch_size for compacted files (sorted, no duplicates). Other files also keep the set of timestamps seen so far, to drop duplicates across batches.
+    """
+    assert batch_size > 0, "batch_size must be positive"
+    with pq.ParquetFile(file_path) as parquet_file:
+        metadata = parquet_file.schema_arrow.metadata or {}
+        index_column = parquet_index_column(metadata)
+        row_groups = None
+        if start is not None or end is not None:
+            assert index_column is not None, f"start/end need a named index column in {file_path}"
+            row_groups = row_groups_in_range(parquet_file.metadata, index_column, start, end)
+        IO_STATS.record(files_opened=1, bytes_read=chunk_bytes(parquet_file.metadata, row_groups, None if columns is None else [*columns, index_column]))
+        batches = parquet_file.iter_batches(batch_size=batch_size, row_groups=row_groups, columns=columns, use_pandas_metadata=True)
+        yield from frames_from_batches(batches, drop_duplicate_indices and COMPACTED_METADATA_KEY not in metadata, start, end)
+
 def read_option_data(
     option_type: str,
     strike: int | float,
     expiry_date: str,
     db_folderpath: str | Path = GLOBAL_DB_FOLDERPATH,
     ticker: str = "NIFTY",
-    drop_duplicate_indices: bool = True
+    drop_duplicate_indices: bool = True,
+    check_exists: bool = True,
+    columns: list[str] | None = None,
+    start: pd.Timestamp | str | None = None,
+    end: pd.Timestamp | str | None = None
 ) -> pd.DataFrame:
     
     assert option_type in ["CE", "PE"], " Option type must be 'CE' or 'PE' "
 
     file_path = os.path.join(db_folderpath, "options", ticker, option_type, f"expiry__{expiry_date}/strike__{int(strike)}.parquet")
-    assert os.path.exists(file_path), f"File not found: {file_path}"
+    if check_exists:    # Callers holding a manifest (DBConnector) already know the file exists
+        assert os.path.exists(file_path), f"File not found: {file_path}"
 
-    df_option = read_parquet_data(file_path, drop_duplicate_indices)
+    df_option = read_parquet_data(file_path, drop_duplicate_indices, columns=columns, start=start, end=end)
     return df_option
 
+def iter_option_data(
+    option_type: str,
+    strike: int | float,
+    expiry_date: str,
+    db_folderpath: str | Path = GLOBAL_DB_FOLDERPATH,
+    ticker: str = "NIFTY",
+    batch_size: int = DEFAULT_BATCH_SIZE,
+    drop_duplicate_indices: bool = True,
+    columns: list[str] | None = None,
+    start: pd.Timestamp | str | None = None,
+    end: pd.Timestamp | str | None = None
+) -> Iterator[pd.DataFrame]:
+    """Streaming counterpart of read_option_data, see iter_parquet_data"""
+    assert option_type in ["CE", "PE"], " Option type must be 'CE' or 'PE' "
+
+    file_path = os.path.join(db_folderpath, "options", ticker, option_type, f"expiry__{expiry_date}/strike__{int(strike)}.parquet")
+    assert os.path.exists(file_path), f"File not found: {file_path}"
+    yield from iter_parquet_data(file_path, batch_size, drop_duplicate_indices, columns=columns, start=start, end=end)
+
+def consolidated_expiry_path(expiry_date: str, consolidated_folderpath: str | Path = CONSOLIDATED_DB_FOLDERPATH, ticker: str = "NIFTY") -> str:
+    """One parquet file holds every contract of a (ticker, expiry), see utils/consolidate_database.py"""
+    return os.path.join(consolidated_folderpath, "options", ticker, f"expiry__{expiry_date}.parquet")
+
+def consolidated_index_column(metadata: dict) -> str:
+    """Name of the timestamp column of a consolidated expiry file (the index of the per-strike files it was built from, "timestamp" if that was unnamed)"""
+    marker = json.loads(metadata[CONSOLIDATED_METADATA_KEY])
+    return marker.get("index_column", marker["index_name"])     # Version 1 markers only stored the column name, as "index_name"
+
+def consolidated_index_name(metadata: dict) -> str | None:
+    """Index name of the per-strike files a consolidated expiry file was built from (None if unnamed), restored on read"""
+    return json.loads(metadata[CONSOLIDATED_METADATA_KEY])["index_name"]
+
+def consolidated_column_types(metadata: dict) -> dict:
+    """(option_type, strike) --> {column: arrow type} of the contracts whose per-strike file differs from the consolidated file schema (other columns / narrower types)"""
+    column_types = json.loads(metadata[CONSOLIDATED_METADATA_KEY]).get("column_types", {})     # Absent before version 3
+    return {(key.split("/")[0], int(key.split("/")[1])): types for key, types in column_types.items()}
+
+def consolidated_table_to_frame(table: pa.Table, index_column: str, index_name: str | None, column_types: dict | None = None) -> pd.DataFrame:
+    """
+    Rows of one contract read from a consolidated expiry file --> the DataFrame read_option_data would return (sorted, no duplicates, same index name).
+    column_types (see consolidated_column_types) drops the columns the contract's own file does not have and casts the rest back to its types.
+    """
+    table = table.drop_columns([c for c in CONSOLIDATED_KEY_COLUMNS if c in table.column_names])
+    if column_types is not None:
+        fields = [table.schema.field(index_column), *(pa.field(c, pa.type_for_alias(t)) for c, t in column_types.items() if c in table.column_names)]
+        table = table.select([field.name for field in fields]).cast(pa.schema(fields))
+    return table.to_pandas().set_index(index_column).rename_axis(index_name)
+
+def read_consolidated_option_data(
+    option_type: str,
+    strike: int | float,
+    expiry_date: str,
+    consolidated_folderpath: str | Path = CONSOLIDATED_DB_FOLDERPATH,
+    ticker: str = "NIFTY",
+    columns: list[str] | None = None,
+    start: pd.Timestamp | str | None = None,
+    end: pd.Timestamp | str | None = None
+) -> pd.DataFrame:
+    """Same result as read_option_data, read from the consolidated expiry file. The contract and time range are pushed down as row-group filters."""
+    assert option_type in ["CE", "PE"], " Option type must be 'CE' or 'PE' "
+
+    file_path = consolidated_expiry_path(expiry_date, consolidated_folderpath, ticker)
+    assert os.path.exists(file_path), f"File not found: {file_path}"
+    metadata = pq.read_schema(file_path).metadata
+    index_column = consolidated_index_column(metadata)
+
+    filters = [("option_type", "==", option_type), ("strike", "==", int(strike))]
+    if start is not None:
+        filters.append((index_column, ">=", pd.Timestamp(start)))
+    if end is not None:
+        filters.append((index_column, "<=", pd.Timestamp(end)))
+    table = pq.read_table(file_path, columns=None if columns is None else [index_column, *columns], filters=filters)
+    return consolidated_table_to_frame(table, index_column, consolidated_index_name(metadata), consolidated_column_types(metadata).get((option_type, int(strike))))
+
 def read_stock_data(csv_path, drop_duplicate_indices=True, timestamp_colname='timestamp'):
     df = pd.read_csv(csv_path, parse_dates=[timestamp_colname], index_col=timestamp_colname)
     
@@ -38,22 +288,74 @@ def read_stock_data(csv_path, drop_duplicate_indices=True, timestamp_colname='ti
     
     return df
 
+OHLCV_AGGREGATION = {'open': 'first', 'high': 'max', 'low': 'min', 'close': 'last', 'volume': 'sum', 'oi': 'last'}
+NS_PER_MINUTE = 60 * 10**9
+NS_PER_DAY = 24 * 60 * NS_PER_MINUTE
+
+def resample_ohlcv(df: pd.DataFrame, interval: int = 5, origin: str = "session", fill_empty: bool = False, aggregation: dict | None = None) -> pd.DataFrame:
+    """
+    Vectorised, session-aware resampling of minute bars (one groupby, no loop over days).
+    Bins of interval minutes never cross midnight and start at origin="session" (NSE_SESSION_OPEN of every day, so every contract and the spot share bin labels)
+    or origin="first" (the first bar of every day). Bars are labelled with the start of their bin.
+    fill_empty=True also emits the bins without bars between the first and last bin of each day (NaN prices, 0 for summed columns).
+    aggregation : column --> 'first' | 'max' | 'min' | 'last' | 'sum' (default OHLCV_AGGREGATION, restricted to the columns of df)
+    """
+    assert origin in ("session", "first"), f"origin must be 'session' or 'first'. Given {origin}"
+    aggregation = {column: how for column, how in (aggregation or OHLCV_AGGREGATION).items() if column in df.columns}
+    step = int(interval) * NS_PER_MINUTE
+    if not df.index.is_monotonic_increasing:    # 'first' / 'last' are in time order
+        df = df.sort_index(kind='stable')
+
+    ns = pd.DatetimeIndex(df.index).as_unit("ns").asi8
+    day_start = ns - ns % NS_PER_DAY
+    if origin == "session":
+        session_open = pd.Timestamp(NSE_SESSION_OPEN)
+        origin_ns = day_start + (session_open.hour * 60 + session_open.minute) * NS_PER_MINUTE
+    else:
+        origin_ns = pd.Series(ns).groupby(day_start).transform("min").to_numpy()
+    labels = np.maximum(origin_ns + (ns - origin_ns) // step * step, day_start)    # Pre-open bars fold into the first bin of their own day
+
+    df_resampled = df[list(aggregation)].groupby(labels, sort=True).agg(aggregation)
+    label_ns = df_resampled.index.to_numpy(dtype=np.int64)
+
+    if fill_empty and len(label_ns):
+        day_firsts = np.unique(label_ns - label_ns % NS_PER_DAY, return_index=True)[1]
+        day_lasts = np.r_[day_firsts[1:], len(label_ns)] - 1
+        n_bins = (label_ns[day_lasts] - label_ns[day_firsts]) // step + 1
+        offsets = np.arange(n_bins.sum()) - np.repeat(np.cumsum(n_bins) - n_bins, n_bins)
+        label_ns = np.repeat(label_ns[day_firsts], n_bins) + offsets * step
+        df_resampled = df_resampled.reindex(label_ns)
+        for column, how in aggregation.items():
+            if how == 'sum':
+                df_resampled[column] = df_resampled[column].fillna(0).astype(df[column].dtype)
+
+    df_resampled.index = pd.DatetimeIndex(label_ns.astype("datetime64[ns]"), name=df.index.name).as_unit(pd.DatetimeIndex(df.index).unit)
+    return df_resampled
+
 def resample_stock_data(df: pd.DataFrame, interval: int = 5) -> pd.DataFrame:
+    """interval-minute OHLCV bars of every day, bins starting at the day's first bar (empty bins kept, as pandas resample does)"""
+    aggregation = {'open': 'first', 'high': 'max', 'low': 'min', 'close': 'last', 'volume': 'sum'}
+    return resample_ohlcv(df, interval=interval, origin="first", fill_empty=True, aggregation=aggregation)
 
-    interval_str = f'{interval}min'  # Convert integer to resampling string format
-    
-    return df.groupby(df.index.date, group_keys=False).apply(
-        lambda x: x.resample(interval_str, origin=x.index.min()).agg({
-            'open': 'first',
-            'high': 'max',
-            'low': 'min',
-            'close': 'last',
-            'volume': 'sum'
-        })
-    )
+TIMEFRAME_METADATA_KEY = b"optilab.timeframe"     # Parquet key-value metadata written by utils/build_timeframes.py
 
-import json
-import os
+def timeframe_path(source_path: str | Path, timeframe: str, database_path: str | Path = GLOBAL_DB_FOLDERPATH, timeframes_root: str | Path = TIMEFRAMES_DB_FOLDERPATH) -> Path:
+    """Precomputed bars of a minute file live at <timeframes_root>/<timeframe>/<source_path relative to database_path>"""
+    return Path(timeframes_root) / timeframe / os.path.relpath(os.path.abspath(source_path), os.path.abspath(database_path))
+
+def source_signature(source_path: str | Path) -> dict:
+    stat = os.stat(source_path)
+    return {'source_size': stat.st_size, 'source_mtime_ns': stat.st_mtime_ns}
+
+def read_timeframe_data(source_path: str | Path, timeframe: str, database_path: str | Path = GLOBAL_DB_FOLDERPATH, timeframes_root: str | Path = TIMEFRAMES_DB_FOLDERPATH) -> pd.DataFrame | None:
+    """Precomputed timeframe bars of a minute file, None if they were never built or the minute file changed since"""
+    file_path = timeframe_path(source_path, timeframe, database_path, timeframes_root)
+    if not file_path.exists():
+        return None
+    metadata = pq.read_schema(file_path).metadata or {}
+    if TIMEFRAME_METADATA_KEY not in metadata or json.loads(metadata[TIMEFRAME_METADATA_KEY]) != {'timeframe': timeframe, **source_signature(source_path)}:
+        return None
+    return read_parquet_data(file_path, drop_duplicate_indices=False)
 
 def update_json_and_save(json_filepath, key, value):
     """Update a key in a JSON file (insert key:value if missing, overwrite key:value if exists)."""